@@ -20,7 +20,7 @@ import { Text } from 'react-native';
 import { useRouter, useLocalSearchParams } from 'expo-router';
 import { Lightbulb, Send, X, PenLine } from 'lucide-react-native';
 
-import { databases, functions, account } from '../../lib/appwrite';
+import { databases, functions, account, executeFunction, newIdempotencyKey } from '../../lib/appwrite';
 import { useChallengeStore } from '../../stores/useChallengeStore';
 import { useUserStore } from '../../stores/useUserStore';
 import { ThinkingTimer } from '../../components/challenge/ThinkingTimer';
@@ -75,6 +75,9 @@ export default function ChallengePlayer() {
     responseText: string;
     thinkingTime: number;
   }>>([]); 
+
+  // The submission in flight or last failed, replayed with its key on retry
+  const pendingSubmission = useRef<{ challengeId: string; responseText: string; payload: any } | null>(null);
   
   // Ref for TextInput to handle keyboard dismissal
   const textInputRef = useRef<TextInput>(null);
@@ -134,68 +137,29 @@ export default function ChallengePlayer() {
         return;
       }
       
-      // Otherwise, get a recommended challenge from the function
-      const execution = await functions.createExecution(
-        'getChallengeForUser',
-        JSON.stringify({ userId: user.$id, mode: 'recommended' })
-      );
-
-      // Check if function execution failed
-      if (execution.status === 'failed') {
-        throw new Error(
-          'Function execution failed.\n\n' +
-          'Possible causes:\n' +
-          '• Missing environment variables (API keys)\n' +
-          '• Function not deployed\n' +
-          '• Database permissions issue\n\n' +
-          'Please check Appwrite Console → Functions → Get Challenge For User → Executions for detailed logs.'
-        );
-      }
-
-      // Check for empty response
-      if (!execution.responseBody || execution.responseBody.trim() === '') {
-        throw new Error(
-          'Function returned empty response.\n\n' +
-          'This usually means:\n' +
-          '• Function is missing environment variables\n' +
-          '• Function timed out (check timeout settings)\n' +
-          '• Python dependencies not installed\n\n' +
-          'Check: Appwrite Console → Functions → Get Challenge For User → Settings → Variables\n' +
-          'Required: APPWRITE_DATABASES_API_KEY, GEMINI_API_KEY'
-        );
-      }
-
-      // Try to parse JSON
-      let result;
-      try {
-        result = JSON.parse(execution.responseBody);
-      } catch (parseError) {
-        throw new Error(`Failed to parse response: ${execution.responseBody.substring(0, 100)}...`);
-      }
-
-      if (result.success) {
-        const challengeData: Challenge = {
-          id: result.data.id,
-          title: result.data.title || result.data.topic,
-          questions: result.data.questions || [],
-          topic: result.data.topic,
-          topicID: result.data.topicID,
-          estimatedTime: result.data.estimatedTime || 8,
-          difficulty: result.data.difficulty || 1,
-          archetype: result.data.archetype,
-          mutator: result.data.mutator,
-          source: result.data.source,
-          mode: result.data.mode,
-        };
-        
-        setCurrentChallenge(challengeData);
-        setAllQuestions(result.data.questions || []);
-        setCurrentQuestionIndex(0);
-        setQuestionStartTime(Date.now());
-        setCollectedResponses([]);
-      } else {
-        throw new Error(result.error || 'Failed to load challenge');
-      }
+      // Otherwise, get a recommended challenge from the function. Serving one records
+      // history; executeFunction keeps one key for this load across its retries
+      const data = await executeFunction('getChallengeForUser', { userId: user.$id, mode: 'recommended' });
+
+      const challengeData: Challenge = {
+        id: data.id,
+        title: data.title || data.topic,
+        questions: data.questions || [],
+        topic: data.topic,
+        topicID: data.topicID,
+        estimatedTime: data.estimatedTime || 8,
+        difficulty: data.difficulty || 1,
+        archetype: data.archetype,
+        mutator: data.mutator,
+        source: data.source,
+        mode: data.mode,
+      };
+      
+      setCurrentChallenge(challengeData);
+      setAllQuestions(data.questions || []);
+      setCurrentQuestionIndex(0);
+      setQuestionStartTime(Date.now());
+      setCollectedResponses([]);
     } catch (error: any) {
       let errorMessage = 'Failed to load challenge. Please try again.';
       if (error.message) {
@@ -275,62 +239,52 @@ export default function ChallengePlayer() {
       try {
         const totalThinkingTime = updatedResponses.reduce((sum, r) => sum + r.thinkingTime, 0);
         
-        const payload = {
-          userId: user.$id,
-          challengeId: currentChallenge.id,
-          responses: updatedResponses,
-          totalThinkingTime: totalThinkingTime,
-        };
+        // One key per submission: a double tap or a retry after an error resends the
+        // same payload under the same key, so the backend records it only once
+        const pending = pendingSubmission.current;
+        const payload = pending && pending.challengeId === currentChallenge.id && pending.responseText === responseText
+          ? pending.payload
+          : {
+              userId: user.$id,
+              challengeId: currentChallenge.id,
+              responses: updatedResponses,
+              totalThinkingTime: totalThinkingTime,
+              idempotencyKey: newIdempotencyKey(),
+            };
+        pendingSubmission.current = { challengeId: currentChallenge.id, responseText, payload };
         
-        const execution = await functions.createExecution(
-          'submit-challenge',
-          JSON.stringify(payload)
-        );
-
-        if (execution.status === 'failed') {
-          throw new Error('Function execution failed. Check Appwrite console for logs.');
-        }
-
-        if (!execution.responseBody || execution.responseBody.trim() === '') {
-          throw new Error('Function returned empty response. Check environment variables.');
-        }
-
-        const result = JSON.parse(execution.responseBody);
-
-        if (result.success) {
-          const { data } = result;
-          
-          // Challenge completed - show total results
-          Alert.alert(
-            '🎉 Challenge Complete!',
-            `Amazing work! You earned ${data.totalXpEarned} XP!\n\n` +
-            `Questions answered: ${data.questionsAnswered}/${data.totalQuestions}\n` +
-            `Level: ${data.level}\n` +
-            `Streak: ${data.streak} 🔥`,
-            [
-              {
-                text: 'Next Challenge',
-                onPress: () => {
-                  resetChallengeSession();
-                  setResponseText('');
-                  setCurrentQuestionIndex(0);
-                  setAllQuestions([]);
-                  setCollectedResponses([]);
-                  loadChallenge();
-                },
-              },
-              {
-                text: 'Go Home',
-                onPress: () => router.push('/home'),
-                style: 'cancel',
+        const { idempotencyKey, ...submission } = payload;
+        const data = await executeFunction('submit-challenge', submission, { idempotencyKey, retries: 2 });
+        pendingSubmission.current = null;
+
+        // Challenge completed - show total results
+        Alert.alert(
+          '🎉 Challenge Complete!',
+          `Amazing work! You earned ${data.totalXpEarned} XP!\n\n` +
+          `Questions answered: ${data.questionsAnswered}/${data.totalQuestions}` +
+          // Async submissions report no level or streak: the worker applies them later
+          (data.level == null
+            ? ''
+            : `\nLevel: ${data.level}\nStreak: ${data.streak} 🔥`),
+          [
+            {
+              text: 'Next Challenge',
+              onPress: () => {
+                resetChallengeSession();
+                setResponseText('');
+                setCurrentQuestionIndex(0);
+                setAllQuestions([]);
+                setCollectedResponses([]);
+                loadChallenge();
               },
-            ]
-          );
-        } else {
-          // Remove the failed response from collected
-          setCollectedResponses(collectedResponses);
-          throw new Error(result.error || 'Failed to submit challenge');
-        }
+            },
+            {
+              text: 'Go Home',
+              onPress: () => router.push('/home'),
+              style: 'cancel',
+            },
+          ]
+        );
       } catch (error: any) {
         let errorMessage = 'Failed to submit your challenge. Please try again.';
         if (error.message) {
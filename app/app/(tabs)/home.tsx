@@ -3,7 +3,7 @@ import { StyleSheet, Text, View, ActivityIndicator } from 'react-native';
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { useUserStore } from '../../stores/useUserStore';
 import { useRouter } from 'expo-router';
-import { databases, functions } from '../../lib/appwrite';
+import { databases, executeFunction } from '../../lib/appwrite';
 import { Query } from 'react-native-appwrite';
 import { Compass } from 'lucide-react-native';
 
@@ -86,44 +86,32 @@ export default function HomeScreen() {
 
       // Fetch recommended challenge from function
       try {
-        const execution = await functions.createExecution(
-          'getChallengeForUser',
-          JSON.stringify({ userId: user?.$id, mode: 'recommended' })
-        );
-        
-        if (!execution.responseBody || execution.responseBody.trim() === '') {
-          throw new Error('Empty response');
-        }
+        // executeFunction keeps one idempotency key for this load across its retries
+        const data = await executeFunction('getChallengeForUser', { userId: user?.$id, mode: 'recommended' });
         
-        const result = JSON.parse(execution.responseBody);
+        const challengeData = {
+          $id: data.id,
+          title: data.title,
+          promptText: data.promptText,
+          topicName: data.topic,
+          topicID: data.topicID,
+          xpReward: data.xpReward || 15,
+          estimatedTime: data.estimatedTime,
+          difficulty: data.difficulty,
+        };
+        setDailyProvocation(challengeData);
         
-        if (result.success) {
-          const challengeData = {
-            $id: result.data.id,
-            title: result.data.title,
-            promptText: result.data.promptText,
-            topicName: result.data.topic,
-            topicID: result.data.topicID,
-            xpReward: result.data.xpReward || 15,
-            estimatedTime: result.data.estimatedTime,
-            difficulty: result.data.difficulty,
-          };
-          setDailyProvocation(challengeData);
-          
-          // Check if user has already completed this challenge
-          try {
-            const responseDoc = await databases.getDocument(
-              'synapse',
-              'responses',
-              `${user?.$id}_${result.data.id}`
-            );
-            setIsCompleted(true);
-          } catch {
-            // Not completed
-            setIsCompleted(false);
-          }
-        } else {
-          throw new Error(result.error);
+        // Check if user has already completed this challenge
+        try {
+          const responseDoc = await databases.getDocument(
+            'synapse',
+            'responses',
+            `${user?.$id}_${data.id}`
+          );
+          setIsCompleted(true);
+        } catch {
+          // Not completed
+          setIsCompleted(false);
         }
       } catch (err) {
         // Fallback: fetch a random challenge directly from database
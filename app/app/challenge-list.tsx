@@ -1,72 +1,107 @@
-import React from 'react';
-import { View, Text, FlatList, TouchableOpacity, StyleSheet } from 'react-native';
+import React, { useCallback, useEffect, useRef, useState } from 'react';
+import { View, Text, FlatList, TouchableOpacity, StyleSheet, ActivityIndicator } from 'react-native';
 import { useRouter } from 'expo-router';
 import { COLORS, FONTS } from '../theme';
+import { executeFunction } from '../lib/appwrite';
 
-interface Challenge {
+// Summary card from getChallengeForUser's "list" mode; the full body is loaded by the player
+interface ChallengeSummary {
   id: string;
-  type: 'quest' | 'pop';
   title: string;
   topic: string;
-  subcategory?: string;
+  topicID: string;
   difficulty: number;
+  estimatedTime: number;
   xpReward: number;
 }
 
-// Mock data for testing
-const mockChallenges: Challenge[] = [
-  {
-    id: '1',
-    type: 'quest',
-    title: 'Philosophy Quest: The Meaning of Life',
-    topic: 'Philosophy',
-    subcategory: 'Ethics',
-    difficulty: 3,
-    xpReward: 100,
-  },
-  {
-    id: '2',
-    type: 'pop',
-    title: 'Quick Pop: Consciousness',
-    topic: 'Philosophy',
-    subcategory: 'Neuroscience',
-    difficulty: 2,
-    xpReward: 50,
-  },
-];
+const PAGE_SIZE = 20;
 
 export default function ChallengeList() {
   const router = useRouter();
+  const [challenges, setChallenges] = useState<ChallengeSummary[]>([]);
+  const [nextPageToken, setNextPageToken] = useState<string | null>(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  // onEndReached can fire repeatedly while a page is in flight
+  const fetching = useRef(false);
+
+  const loadPage = useCallback(async (pageToken: string | null) => {
+    if (fetching.current) return;
+    fetching.current = true;
+    if (pageToken) setLoadingMore(true);
+    try {
+      const data = await executeFunction('getChallengeForUser', {
+        mode: 'list',
+        pageSize: PAGE_SIZE,
+        ...(pageToken ? { pageToken } : {}),
+      });
+      setChallenges(prev => (pageToken ? [...prev, ...data.items] : data.items));
+      setNextPageToken(data.nextPageToken);
+      setError(null);
+    } catch (err: any) {
+      setError(err?.message || 'Could not load challenges');
+    } finally {
+      fetching.current = false;
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  }, []);
+
+  useEffect(() => {
+    loadPage(null);
+  }, [loadPage]);
 
-  const renderChallenge = ({ item }: { item: Challenge }) => (
+  const loadMore = () => {
+    if (nextPageToken) {
+      loadPage(nextPageToken);
+    }
+  };
+
+  const renderChallenge = ({ item }: { item: ChallengeSummary }) => (
     <TouchableOpacity
       style={styles.challengeCard}
-      onPress={() => router.push(`/challenge-player?id=${item.id}`)}
+      onPress={() => router.push(`/challenge-player?challengeId=${item.id}`)}
     >
       <View style={styles.challengeHeader}>
-        <Text style={styles.challengeType}>{item.type.toUpperCase()}</Text>
+        <Text style={styles.challengeType}>{item.estimatedTime} MIN</Text>
         <Text style={styles.xpBadge}>+{item.xpReward} XP</Text>
       </View>
       <Text style={styles.challengeTitle}>{item.title}</Text>
-      <Text style={styles.challengeTopic}>
-        {item.topic} {item.subcategory && `• ${item.subcategory}`}
-      </Text>
+      <Text style={styles.challengeTopic}>{item.topic}</Text>
       <Text style={styles.difficulty}>
         {'⭐'.repeat(item.difficulty)} Difficulty: {item.difficulty}/5
       </Text>
     </TouchableOpacity>
   );
 
+  if (loading) {
+    return (
+      <View style={[styles.container, styles.centered]}>
+        <ActivityIndicator size="large" color={COLORS.accent.primary} />
+      </View>
+    );
+  }
+
   return (
     <View style={styles.container}>
       <View style={styles.content}>
         <Text style={styles.heading}>Challenges</Text>
         <Text style={styles.subtitle}>Select a challenge to begin</Text>
+        {error && (
+          <TouchableOpacity onPress={() => loadPage(challenges.length ? nextPageToken : null)}>
+            <Text style={styles.error}>{error} - tap to retry</Text>
+          </TouchableOpacity>
+        )}
         <FlatList
-          data={mockChallenges}
+          data={challenges}
           renderItem={renderChallenge}
           keyExtractor={(item) => item.id}
           contentContainerStyle={styles.listContent}
+          onEndReached={loadMore}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={loadingMore ? <ActivityIndicator color={COLORS.accent.primary} /> : null}
         />
       </View>
     </View>
@@ -78,6 +113,10 @@ const styles = StyleSheet.create({
     flex: 1,
     backgroundColor: COLORS.background.primary,
   },
+  centered: {
+    justifyContent: 'center',
+    alignItems: 'center',
+  },
   content: {
     flex: 1,
     paddingHorizontal: 20,
@@ -95,6 +134,11 @@ const styles = StyleSheet.create({
     color: COLORS.text.secondary,
     marginBottom: 4,
   },
+  error: {
+    fontSize: 14,
+    fontFamily: FONTS.body,
+    color: COLORS.semantic.error,
+  },
   listContent: {
     paddingVertical: 8,
     gap: 16,
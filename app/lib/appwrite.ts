@@ -1,4 +1,4 @@
-import { Client, Account, Databases, Functions, ExecutionMethod, AppwriteException } from 'react-native-appwrite'
+import { Client, Account, Databases, Functions, ExecutionMethod, AppwriteException, ID } from 'react-native-appwrite'
 import 'react-native-url-polyfill/auto' // Required for React Native
 
 const client = new Client()
@@ -75,35 +75,55 @@ export const safeDatabaseOperation = async <T>(
   }
 }
 
+/**
+ * Create one idempotency key per logical action (a submit press, a screen load)
+ * and pass it to every executeFunction call for that action
+ */
+export const newIdempotencyKey = () => ID.unique();
+
 /**
  * Helper function to execute Appwrite functions with error handling and retries
  */
 export const executeFunction = async (
   functionId: string,
   data: any = {},
-  options: { timeout?: number; retries?: number } = {}
+  options: { timeout?: number; retries?: number; idempotencyKey?: string } = {}
 ) => {
-  const { timeout = 30000, retries = 1 } = options;
+  const { timeout = 30000, retries = 1, idempotencyKey = newIdempotencyKey() } = options;
+  // One key for every attempt, so a retry after a timeout can't repeat the writes
+  const body = JSON.stringify({ ...data, idempotencyKey });
 
   for (let attempt = 0; attempt <= retries; attempt++) {
+    let retryable = true;
     try {
       const execution = await functions.createExecution(
         functionId,
-        JSON.stringify(data),
+        body,
         false,
         '/',
         ExecutionMethod.POST
       );
 
+      if (execution.status === 'failed') {
+        throw new Error('Function execution failed. Check Appwrite console for logs.');
+      }
+      if (!execution.responseBody || execution.responseBody.trim() === '') {
+        throw new Error('Function returned empty response. Check environment variables.');
+      }
+
       const result = JSON.parse(execution.responseBody);
       
       if (!result.success) {
+        // Client errors are final (and replayed as-is under the same key);
+        // 409 means the original attempt is still running, so wait and ask again
+        const status = execution.responseStatusCode;
+        retryable = !status || status >= 500 || status === 409;
         throw new Error(result.error || 'Function execution failed');
       }
 
       return result.data;
     } catch (error) {
-      if (attempt === retries) {
+      if (attempt === retries || !retryable) {
         throw error;
       }
       await new Promise(resolve => setTimeout(resolve, 1000 * Math.pow(2, attempt)));
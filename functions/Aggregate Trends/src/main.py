@@ -0,0 +1,348 @@
+import os
+import json
+from datetime import datetime, timedelta, timezone
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+
+PAGE_SIZE = 100
+MAX_DOCUMENTS_PER_RUN = 10000
+TREND_WINDOW_DAYS = 7
+DAILY_HISTORY_DAYS = 28
+TRENDING_LIMIT = 20
+EPOCH = "1970-01-01T00:00:00.000+00:00"
+
+
+def main(context):
+    """
+    Aggregate Trends - scheduled global aggregation
+    Folds responses and user_challenge_history documents created since the
+    stored watermark into counters, so nothing has to scan responses per request:
+    - topic_stats: attempts, completions and XP per topic
+    - challenge_stats: serves, attempts, completions (and their rate) and daily
+      attempt counts per challenge
+    - global_trends/weekly: most-attempted topics and trending challenges this week
+
+    Counters are applied before the watermark is advanced, so a run that dies
+    midway may count some documents twice on the next run (at-least-once).
+
+    The watermark follows $createdAt. A revisit rewrites the user's existing
+    response instead of creating one, so each user is counted once per
+    challenge, as of their first attempt; completion rates are per user, not
+    per try. ($updatedAt would also pick up backfills and the worker's own
+    writes.) Responses from before totalQuestions was stored are measured
+    against their challenge's question count; if the challenge is gone too,
+    the response is skipped.
+    """
+    try:
+        required_vars = [
+            "APPWRITE_FUNCTION_API_ENDPOINT",
+            "APPWRITE_DATABASE_ID",
+            "APPWRITE_DATABASES_API_KEY"
+        ]
+        missing_vars = [var for var in required_vars if not os.environ.get(var)]
+        if missing_vars:
+            return context.res.json({
+                "success": False,
+                "error": f"Missing required environment variables: {', '.join(missing_vars)}"
+            }, 500)
+
+        # Initialize Appwrite client (APPWRITE_FUNCTION_PROJECT_ID is automatically provided)
+        client = Client()
+        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        client.set_project(os.environ.get("APPWRITE_FUNCTION_PROJECT_ID"))
+        client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+
+        databases = Databases(client)
+        database_id = os.environ.get("APPWRITE_DATABASE_ID")
+
+        topic_deltas = {}
+        challenge_deltas = {}
+
+        def challenge_delta(challenge_id):
+            return challenge_deltas.setdefault(challenge_id, {"served": 0, "attempts": 0, "completions": 0, "daily": {}})
+
+        # New submissions -> attempts, completions, XP and daily counts
+        responses, responses_mark = collect_since(databases, database_id, "responses")
+        question_counts = load_question_counts(databases, database_id, responses)
+        skipped = 0
+        for response in responses:
+            challenge_id = response.get("challengeID")
+            if not challenge_id:
+                continue
+            total_questions = response.get("totalQuestions") or question_counts.get(challenge_id)
+            if not total_questions:
+                skipped += 1
+                continue
+            completed = len(response.get("responses") or []) >= total_questions
+            day = (response.get("$createdAt") or "")[:10]
+
+            delta = challenge_delta(challenge_id)
+            delta["attempts"] += 1
+            delta["completions"] += 1 if completed else 0
+            delta["daily"][day] = delta["daily"].get(day, 0) + 1
+
+            topic_id = response.get("topicID")
+            if topic_id:
+                topic = topic_deltas.setdefault(topic_id, {"attempts": 0, "completions": 0, "totalXp": 0})
+                topic["attempts"] += 1
+                topic["completions"] += 1 if completed else 0
+                topic["totalXp"] += response.get("totalXpEarned", 0)
+
+        # Served recommendations (only recommended mode records these, so they
+        # are a popularity signal, not a completion-rate denominator)
+        history, history_mark = collect_since(databases, database_id, "user_challenge_history")
+        for entry in history:
+            if entry.get("challengeId"):
+                challenge_delta(entry["challengeId"])["served"] += 1
+
+        today = datetime.now(timezone.utc).date()
+        apply_challenge_deltas(databases, database_id, challenge_deltas, today)
+        apply_topic_deltas(databases, database_id, topic_deltas)
+
+        save_watermark(databases, database_id, "responses", responses_mark)
+        save_watermark(databases, database_id, "user_challenge_history", history_mark)
+
+        trends = rebuild_trends(databases, database_id, today)
+
+        context.log(
+            f"Aggregated {len(responses)} responses and {len(history)} history entries "
+            f"into {len(topic_deltas)} topics and {len(challenge_deltas)} challenges"
+        )
+        if skipped:
+            context.log(f"Skipped {skipped} responses whose question count is unknown")
+        return context.res.json({
+            "success": True,
+            "data": {
+                "responses": len(responses),
+                "historyEntries": len(history),
+                "topicsUpdated": len(topic_deltas),
+                "challengesUpdated": len(challenge_deltas),
+                "responsesSkipped": skipped,
+                "trending": len(trends["trendingChallenges"])
+            }
+        })
+
+    except Exception as err:
+        context.error(f"Error in aggregate-trends: {str(err)}")
+        return context.res.json({"success": False, "error": str(err)}, 500)
+
+
+def load_watermark(databases, database_id, collection_id):
+    """Return (createdAt, ids already seen at exactly that timestamp)."""
+    try:
+        state = databases.get_document(
+            database_id=database_id,
+            collection_id="aggregation_state",
+            document_id=collection_id
+        )
+        return state.get("watermark") or EPOCH, set(state.get("watermarkIds") or [])
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        return EPOCH, set()
+
+
+def collect_since(databases, database_id, collection_id):
+    """Documents created at or after the watermark, minus ones already counted at its exact timestamp."""
+    watermark, seen_ids = load_watermark(databases, database_id, collection_id)
+    documents = []
+    cursor = None
+
+    while len(documents) < MAX_DOCUMENTS_PER_RUN:
+        queries = [
+            Query.greater_than_equal("$createdAt", watermark),
+            Query.order_asc("$createdAt"),
+            Query.limit(PAGE_SIZE)
+        ]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id=collection_id,
+            queries=queries
+        )
+        batch = page["documents"]
+        documents.extend(d for d in batch if not (d.get("$createdAt") == watermark and d["$id"] in seen_ids))
+        if len(batch) < PAGE_SIZE:
+            break
+        cursor = batch[-1]["$id"]
+
+    if not documents:
+        return documents, (watermark, seen_ids)
+
+    # Advance to the newest timestamp, remembering every id that shares it
+    newest = documents[-1]["$createdAt"]
+    newest_ids = {d["$id"] for d in documents if d["$createdAt"] == newest}
+    if newest == watermark:
+        newest_ids |= seen_ids
+    return documents, (newest, newest_ids)
+
+
+def save_watermark(databases, database_id, collection_id, mark):
+    watermark, ids = mark
+    data = {"watermark": watermark, "watermarkIds": sorted(ids)}
+    try:
+        databases.update_document(
+            database_id=database_id,
+            collection_id="aggregation_state",
+            document_id=collection_id,
+            data=data
+        )
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        databases.create_document(
+            database_id=database_id,
+            collection_id="aggregation_state",
+            document_id=collection_id,
+            data=data
+        )
+
+
+def load_by_ids(databases, database_id, collection_id, ids):
+    existing = {}
+    ids = sorted(ids)
+    for start in range(0, len(ids), PAGE_SIZE):
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id=collection_id,
+            queries=[
+                Query.equal("$id", ids[start:start + PAGE_SIZE]),
+                Query.limit(PAGE_SIZE)
+            ]
+        )
+        for doc in page["documents"]:
+            existing[doc["$id"]] = doc
+    return existing
+
+
+def load_question_counts(databases, database_id, responses):
+    """Question counts of the challenges behind responses that don't record totalQuestions."""
+    ids = {r["challengeID"] for r in responses if r.get("challengeID") and not r.get("totalQuestions")}
+    challenges = load_by_ids(databases, database_id, "challenges", ids)
+    return {challenge_id: len(doc.get("questions") or []) for challenge_id, doc in challenges.items()}
+
+
+def upsert(databases, database_id, collection_id, document_id, data, exists):
+    if exists:
+        databases.update_document(
+            database_id=database_id,
+            collection_id=collection_id,
+            document_id=document_id,
+            data=data
+        )
+    else:
+        databases.create_document(
+            database_id=database_id,
+            collection_id=collection_id,
+            document_id=document_id,
+            data=data,
+            permissions=['read("any")']
+        )
+
+
+def apply_topic_deltas(databases, database_id, topic_deltas):
+    existing = load_by_ids(databases, database_id, "topic_stats", topic_deltas.keys())
+    for topic_id, delta in topic_deltas.items():
+        doc = existing.get(topic_id, {})
+        attempts = doc.get("attempts", 0) + delta["attempts"]
+        completions = doc.get("completions", 0) + delta["completions"]
+        upsert(databases, database_id, "topic_stats", topic_id, {
+            "topicID": topic_id,
+            "attempts": attempts,
+            "completions": completions,
+            "totalXp": doc.get("totalXp", 0) + delta["totalXp"],
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }, topic_id in existing)
+
+
+def apply_challenge_deltas(databases, database_id, challenge_deltas, today):
+    existing = load_by_ids(databases, database_id, "challenge_stats", challenge_deltas.keys())
+    oldest_day = (today - timedelta(days=DAILY_HISTORY_DAYS)).isoformat()
+
+    for challenge_id, delta in challenge_deltas.items():
+        doc = existing.get(challenge_id, {})
+        daily = json.loads(doc.get("dailyAttempts") or "{}")
+        for day, count in delta["daily"].items():
+            daily[day] = daily.get(day, 0) + count
+        daily = {day: count for day, count in daily.items() if day >= oldest_day}
+
+        served = doc.get("served", 0) + delta["served"]
+        attempts = doc.get("attempts", 0) + delta["attempts"]
+        completions = doc.get("completions", 0) + delta["completions"]
+        upsert(databases, database_id, "challenge_stats", challenge_id, {
+            "challengeID": challenge_id,
+            "served": served,
+            "attempts": attempts,
+            "completions": completions,
+            # Every response is an attempt, whichever screen it was started from
+            "completionRate": round(completions / attempts, 4) if attempts else None,
+            "dailyAttempts": json.dumps(daily, separators=(",", ":"), sort_keys=True),
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }, challenge_id in existing)
+
+
+def window_total(daily, today, start_days_ago, days):
+    start = today - timedelta(days=start_days_ago + days - 1)
+    end = today - timedelta(days=start_days_ago)
+    return sum(count for day, count in daily.items() if start.isoformat() <= day <= end.isoformat())
+
+
+def rebuild_trends(databases, database_id, today):
+    """Recompute the global trend document from all challenge and topic counters."""
+    trending = []
+    cursor = None
+    while True:
+        queries = [Query.order_asc("$id"), Query.limit(PAGE_SIZE)]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+        page = databases.list_documents(database_id=database_id, collection_id="challenge_stats", queries=queries)
+        for doc in page["documents"]:
+            daily = json.loads(doc.get("dailyAttempts") or "{}")
+            this_week = window_total(daily, today, 0, TREND_WINDOW_DAYS)
+            last_week = window_total(daily, today, TREND_WINDOW_DAYS, TREND_WINDOW_DAYS)
+            if this_week:
+                trending.append({
+                    "challengeID": doc["$id"],
+                    "attemptsThisWeek": this_week,
+                    "attemptsLastWeek": last_week,
+                    "completionRate": doc.get("completionRate")
+                })
+        if len(page["documents"]) < PAGE_SIZE:
+            break
+        cursor = page["documents"][-1]["$id"]
+
+    # Rank by weekly attempts, breaking ties by week-over-week growth
+    trending.sort(key=lambda t: (t["attemptsThisWeek"], t["attemptsThisWeek"] - t["attemptsLastWeek"]), reverse=True)
+
+    topics = databases.list_documents(
+        database_id=database_id,
+        collection_id="topic_stats",
+        queries=[Query.order_desc("attempts"), Query.limit(TRENDING_LIMIT)]
+    )
+
+    trends = {
+        "trendingChallenges": trending[:TRENDING_LIMIT],
+        "popularTopics": [
+            {"topicID": t["$id"], "attempts": t.get("attempts", 0), "completions": t.get("completions", 0)}
+            for t in topics["documents"]
+        ]
+    }
+    upsert(databases, database_id, "global_trends", "weekly", {
+        "trendingChallenges": json.dumps(trends["trendingChallenges"], separators=(",", ":")),
+        "popularTopics": json.dumps(trends["popularTopics"], separators=(",", ":")),
+        "updatedAt": datetime.now(timezone.utc).isoformat()
+    }, trends_exist(databases, database_id))
+    return trends
+
+
+def trends_exist(databases, database_id):
+    try:
+        databases.get_document(database_id=database_id, collection_id="global_trends", document_id="weekly")
+        return True
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        return False
@@ -0,0 +1,290 @@
+import os
+import json
+import uuid
+from datetime import datetime, timezone
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+
+# Fixed bucket lower edges per metric; the last bucket is open-ended.
+# Edges are stored on each histogram document so readers never need this table.
+BUCKET_EDGES = {
+    "thinkingTime": [0, 30, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 3600],
+    "xp": [0, 5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 80, 100]
+}
+
+# Maps metric name -> field on a histogram_samples document
+SAMPLE_FIELDS = {
+    "thinkingTime": "thinkingTime",
+    "xp": "xpEarned"
+}
+
+PAGE_SIZE = 100
+MAX_SAMPLES_PER_RUN = 5000
+JOURNAL_ID = "current"  # histogram_compactions document for the run in progress
+
+
+def bucket_index(edges, value):
+    """Index of the bucket holding value (values below the first edge land in bucket 0)."""
+    index = 0
+    for i, edge in enumerate(edges):
+        if value >= edge:
+            index = i
+        else:
+            break
+    return index
+
+
+def cumulative(counts):
+    running = 0
+    result = []
+    for count in counts:
+        running += count
+        result.append(running)
+    return result
+
+
+def main(context):
+    """
+    Compact Histograms - scheduled cohort histogram compaction
+    Submissions append one histogram_samples document each. This job folds
+    pending samples into per-topic fixed-bucket histograms (cohort_histograms),
+    stores prefix sums so Get User Analytics can answer percentile queries in
+    constant time, and deletes the merged samples.
+
+    Each run is journaled so a run cut off partway never merges a sample twice:
+    the sample ids are recorded in histogram_compactions before any histogram
+    is written, and every histogram records the run that last changed it. The
+    next run finishes an interrupted one first - it merges into the histograms
+    that run hadn't reached yet, then deletes its samples - before starting its own.
+    """
+    try:
+        required_vars = [
+            "APPWRITE_FUNCTION_API_ENDPOINT",
+            "APPWRITE_DATABASE_ID",
+            "APPWRITE_DATABASES_API_KEY"
+        ]
+        missing_vars = [var for var in required_vars if not os.environ.get(var)]
+        if missing_vars:
+            return context.res.json({
+                "success": False,
+                "error": f"Missing required environment variables: {', '.join(missing_vars)}"
+            }, 500)
+
+        # Initialize Appwrite client (APPWRITE_FUNCTION_PROJECT_ID is automatically provided)
+        client = Client()
+        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        client.set_project(os.environ.get("APPWRITE_FUNCTION_PROJECT_ID"))
+        client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+
+        databases = Databases(client)
+        database_id = os.environ.get("APPWRITE_DATABASE_ID")
+
+        resumed = 0
+        journal = load_journal(databases, database_id)
+        if journal:
+            context.log(f"Finishing interrupted compaction run {journal['runId']}")
+            resumed = finish_run(context, databases, database_id, journal)
+
+        samples = collect_samples(databases, database_id)
+        if not samples:
+            context.log("No pending histogram samples")
+            return context.res.json({
+                "success": True,
+                "data": {"samplesMerged": 0, "histogramsUpdated": 0, "samplesResumed": resumed}
+            })
+
+        journal = {
+            "runId": uuid.uuid4().hex,
+            "sampleIds": json.dumps([sample["$id"] for sample in samples], separators=(",", ":")),
+            "status": "merging"
+        }
+        databases.create_document(
+            database_id=database_id,
+            collection_id="histogram_compactions",
+            document_id=JOURNAL_ID,
+            data=journal
+        )
+        histograms = merge_samples(context, databases, database_id, journal["runId"], samples)
+        finish_run(context, databases, database_id, journal, merged=True)
+
+        context.log(f"Merged {len(samples)} samples into {histograms} histograms")
+        return context.res.json({
+            "success": True,
+            "data": {
+                "samplesMerged": len(samples),
+                "histogramsUpdated": histograms,
+                "samplesResumed": resumed
+            }
+        })
+
+    except Exception as err:
+        context.error(f"Error in compact-histograms: {str(err)}")
+        return context.res.json({"success": False, "error": str(err)}, 500)
+
+
+def load_journal(databases, database_id):
+    try:
+        return databases.get_document(
+            database_id=database_id,
+            collection_id="histogram_compactions",
+            document_id=JOURNAL_ID
+        )
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        return None
+
+
+def collect_samples(databases, database_id):
+    """Up to MAX_SAMPLES_PER_RUN pending samples, in $id order."""
+    samples = []
+    cursor = None
+    while len(samples) < MAX_SAMPLES_PER_RUN:
+        queries = [Query.order_asc("$id"), Query.limit(PAGE_SIZE)]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id="histogram_samples",
+            queries=queries
+        )
+        documents = page["documents"]
+        samples.extend(documents)
+        if len(documents) < PAGE_SIZE:
+            break
+        cursor = documents[-1]["$id"]
+    return samples
+
+
+def bucket_samples(samples):
+    """Bucket counts per (topic, metric) for a batch of samples."""
+    deltas = {}
+    for sample in samples:
+        topic_id = sample.get("topicID")
+        if not topic_id:
+            continue
+        for metric, field in SAMPLE_FIELDS.items():
+            value = sample.get(field)
+            if value is None:
+                continue
+            edges = BUCKET_EDGES[metric]
+            counts = deltas.setdefault((topic_id, metric), [0] * len(edges))
+            counts[bucket_index(edges, value)] += 1
+    return deltas
+
+
+def merge_samples(context, databases, database_id, run_id, samples):
+    """
+    Add the samples into the stored histograms, skipping any histogram this run
+    already wrote. Returns the number of histograms written.
+    """
+    deltas = bucket_samples(samples)
+    topic_ids = sorted({topic_id for topic_id, _ in deltas})
+    existing = {}
+    for start in range(0, len(topic_ids), PAGE_SIZE):
+        stored = databases.list_documents(
+            database_id=database_id,
+            collection_id="cohort_histograms",
+            queries=[
+                Query.equal("topicID", topic_ids[start:start + PAGE_SIZE]),
+                Query.limit(PAGE_SIZE * len(BUCKET_EDGES))
+            ]
+        )
+        for doc in stored["documents"]:
+            existing[(doc.get("topicID"), doc.get("metric"))] = doc
+
+    now = datetime.now(timezone.utc).isoformat()
+    written = 0
+    for (topic_id, metric), delta in deltas.items():
+        edges = BUCKET_EDGES[metric]
+        doc = existing.get((topic_id, metric))
+        if doc and doc.get("lastRunId") == run_id:
+            continue
+
+        counts = list(doc.get("counts", [])) if doc else []
+        if doc and list(doc.get("edges", [])) != edges:
+            context.log(f"Bucket edges changed for {topic_id}/{metric}, resetting histogram")
+            counts = []
+        if len(counts) != len(edges):
+            counts = [0] * len(edges)
+
+        merged = [a + b for a, b in zip(counts, delta)]
+        data = {
+            "topicID": topic_id,
+            "metric": metric,
+            "edges": edges,
+            "counts": merged,
+            "cumulative": cumulative(merged),
+            "total": sum(merged),
+            "lastRunId": run_id,
+            "updatedAt": now
+        }
+
+        if doc:
+            databases.update_document(
+                database_id=database_id,
+                collection_id="cohort_histograms",
+                document_id=doc["$id"],
+                data=data
+            )
+        else:
+            databases.create_document(
+                database_id=database_id,
+                collection_id="cohort_histograms",
+                document_id="unique()",
+                data=data
+            )
+        written += 1
+    return written
+
+
+def load_samples(databases, database_id, sample_ids):
+    samples = []
+    for start in range(0, len(sample_ids), PAGE_SIZE):
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id="histogram_samples",
+            queries=[Query.equal("$id", sample_ids[start:start + PAGE_SIZE]), Query.limit(PAGE_SIZE)]
+        )
+        samples.extend(page["documents"])
+    return samples
+
+
+def finish_run(context, databases, database_id, journal, merged=False):
+    """
+    Complete a journaled run: merge whatever it hadn't (unless merged), then
+    delete its samples and the journal. Returns the number of samples in the run.
+    """
+    sample_ids = json.loads(journal.get("sampleIds") or "[]")
+    if not merged and journal.get("status") != "merged":
+        # No sample is deleted before the run is marked merged, so all of them are still here
+        samples = load_samples(databases, database_id, sample_ids)
+        merge_samples(context, databases, database_id, journal["runId"], samples)
+    if journal.get("status") != "merged":
+        databases.update_document(
+            database_id=database_id,
+            collection_id="histogram_compactions",
+            document_id=JOURNAL_ID,
+            data={"status": "merged"}
+        )
+
+    for sample_id in sample_ids:
+        try:
+            databases.delete_document(
+                database_id=database_id,
+                collection_id="histogram_samples",
+                document_id=sample_id
+            )
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 404:  # 404: deleted before the run was cut off
+                raise e
+
+    databases.delete_document(
+        database_id=database_id,
+        collection_id="histogram_compactions",
+        document_id=JOURNAL_ID
+    )
+    return len(sample_ids)
@@ -3,12 +3,17 @@ import json
 import google.generativeai as genai
 from appwrite.client import Client
 from appwrite.services.databases import Databases
+from .catalog import get_challenge_document
+from .trace import capture_trace
+
 
 def main(context):
     """
     Get AI Hint - MVP Version
     Generates Socratic hints using Gemini API without revealing the answer
     """
+    capture_trace(context, "get-ai-hint")
+
     try:
         # Validate required environment variables
         required_vars = [
@@ -43,11 +48,7 @@ def main(context):
             return context.res.json({"success": False, "error": "questionId required"}, 400)
 
         # Get challenge details from challenges collection
-        challenge = databases.get_document(
-            database_id=database_id,
-            collection_id="challenges",
-            document_id=challenge_id
-        )
+        challenge = get_challenge_document(databases, database_id, challenge_id)
 
         challenge_text = challenge.get("promptText", "")
         topic_name = challenge.get("topicName", "")
@@ -0,0 +1,71 @@
+"""
+Challenge catalog reads
+
+Challenges come from the read-only SQLite snapshot that
+scripts/build_catalog_snapshot.py bundles next to main.py, so catalog reads
+stay local to the container. Without a snapshot, or for an id it doesn't
+know, callers fall back to Appwrite.
+"""
+import os
+import json
+import sqlite3
+
+CATALOG_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.sqlite")
+_catalog = None
+
+
+def open_catalog():
+    """Open the bundled read-only catalog snapshot once per container; None if not bundled."""
+    global _catalog
+    if _catalog is None and os.path.exists(CATALOG_SNAPSHOT_PATH):
+        _catalog = sqlite3.connect(
+            f"file:{CATALOG_SNAPSHOT_PATH}?mode=ro&immutable=1",
+            uri=True,
+            check_same_thread=False
+        )
+    return _catalog
+
+
+def get_challenge_document(databases, database_id, challenge_id):
+    """Challenge from the bundled snapshot, falling back to a live read for unknown ids."""
+    catalog = open_catalog()
+    if catalog is not None:
+        row = catalog.execute("SELECT body FROM challenges WHERE id = ?", (challenge_id,)).fetchone()
+        if row:
+            return json.loads(row[0])
+    return databases.get_document(
+        database_id=database_id,
+        collection_id="challenges",
+        document_id=challenge_id
+    )
+
+
+def snapshot_challenges(topic_ids=None, difficulty=None, after=None, limit=None):
+    """
+    Challenges from the bundled snapshot, ordered by id, or None when no
+    snapshot is bundled and the caller must query Appwrite instead.
+    """
+    catalog = open_catalog()
+    if catalog is None:
+        return None
+
+    sql = "SELECT body FROM challenges"
+    clauses = []
+    params = []
+    if topic_ids is not None:
+        clauses.append(f"topic_id IN ({', '.join('?' for _ in topic_ids)})")
+        params.extend(topic_ids)
+    if difficulty is not None:
+        clauses.append("difficulty = ?")
+        params.append(difficulty)
+    if after is not None:
+        clauses.append("id > ?")
+        params.append(after)
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    return [json.loads(row[0]) for row in catalog.execute(sql, params)]
@@ -0,0 +1,102 @@
+"""
+Per-key leases, shared by Process Submission and Get Challenge For User
+
+A lease is a document whose $id is the key (a user id), created in a lock
+collection. Document creation is atomic, so only one writer holds a key's
+lease at a time; a lease left behind by a crashed runtime expires after
+LEASE_TTL_SECONDS. Each lease carries a random token, and a writer only
+deletes the lease if it still holds its own token, so a writer that overran
+its TTL can't free the next holder's.
+
+Used for read-modify-write updates that must not interleave: the revisit
+queue (revisit_queue_locks) and user stats (user_stats_locks).
+"""
+import time
+import secrets
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from appwrite.exception import AppwriteException
+
+LEASE_TTL_SECONDS = 10
+LEASE_POLL_SECONDS = 0.1
+
+
+class LeaseBusy(Exception):
+    """Another writer held the lease for the whole wait."""
+
+
+def acquire_lease(databases, database_id, collection_id, key, wait_seconds):
+    """Take the lease on key and return its token."""
+    deadline = time.monotonic() + wait_seconds
+    token = secrets.token_hex(16)
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            databases.create_document(
+                database_id=database_id,
+                collection_id=collection_id,
+                document_id=key,
+                data={
+                    "token": token,
+                    "expiresAt": (now + timedelta(seconds=LEASE_TTL_SECONDS)).isoformat()
+                }
+            )
+            return token
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 409:
+                raise e
+
+        try:
+            lease = databases.get_document(
+                database_id=database_id,
+                collection_id=collection_id,
+                document_id=key
+            )
+            if datetime.fromisoformat(lease["expiresAt"].replace("Z", "+00:00")) <= now:
+                release_lease(databases, database_id, collection_id, key, lease.get("token"))
+                continue
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 404:
+                raise e
+            continue  # released between our create and this read
+
+        if time.monotonic() >= deadline:
+            raise LeaseBusy(f"{collection_id}/{key} is locked")
+        time.sleep(LEASE_POLL_SECONDS)
+
+
+def release_lease(databases, database_id, collection_id, key, token):
+    """
+    Delete the lease if it still carries token. Appwrite has no conditional
+    delete, so this narrows the window to the read-then-delete gap.
+    """
+    try:
+        lease = databases.get_document(
+            database_id=database_id,
+            collection_id=collection_id,
+            document_id=key
+        )
+        if lease.get("token") != token:
+            return
+        databases.delete_document(
+            database_id=database_id,
+            collection_id=collection_id,
+            document_id=key
+        )
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+
+
+@contextmanager
+def lease(databases, database_id, collection_id, key, wait_seconds=5.0):
+    """Hold the lease on key for the duration of the with block."""
+    token = acquire_lease(databases, database_id, collection_id, key, wait_seconds)
+    try:
+        yield
+    finally:
+        try:
+            release_lease(databases, database_id, collection_id, key, token)
+        except AppwriteException:
+            # The work is done; a lease we failed to delete just expires after its TTL
+            pass
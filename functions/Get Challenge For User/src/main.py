@@ -1,18 +1,264 @@
 import os
 import json
+import time
+import base64
+import heapq
 import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.query import Query
+from appwrite.exception import AppwriteException
+from .idempotency import idempotent
+from .catalog import get_challenge_document, snapshot_challenges
+from .trace import capture_trace
+from .revisits import update_queue, QueueBusy
+
+# Independent backend reads within one invocation run on this pool. These
+# calls go to the SDK directly, without resilience.py deadlines, so a hung
+# request holds its worker until the SDK returns; with every worker hung, later
+# invocations queue behind them. One invocation submits at most 4 reads.
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fan-out")
+
+# A served revisit is pushed back by this much until the user completes it
+# (Process Submission then reschedules it with a real interval)
+REVISIT_SNOOZE_SECONDS = 86400
+
+# Library listing configuration
+LIST_DEFAULT_PAGE_SIZE = 20
+LIST_MAX_PAGE_SIZE = 50
+# Only the fields a library card needs - full bodies are fetched in "get" mode
+LIST_SUMMARY_FIELDS = ["title", "topicName", "topicID", "difficulty", "estimatedTime", "xpReward"]
+
+def load_catalog(databases, database_id, topic_id=None):
+    """Candidate challenges from the snapshot, or the first 100 from Appwrite without one."""
+    challenges = snapshot_challenges(topic_ids=[topic_id] if topic_id else None)
+    if challenges is None:
+        challenges = databases.list_documents(
+            database_id=database_id,
+            collection_id="challenges",
+            queries=[Query.limit(100)]
+        )["documents"]
+    return challenges
+
+
+def pop_due_revisit(context, databases, database_id, user_id, selected_topics):
+    """
+    Pop the next due challenge off the user's revisit queue (see revisits.py),
+    snoozing it so it isn't served again before it is completed.
+    Returns the challenge document, or None when nothing is due.
+    """
+    def mutate(heap):
+        now = time.time()
+        challenge = None
+        changed = False
+        off_topic = []
+
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            changed = True
+            try:
+                candidate = get_challenge_document(databases, database_id, entry[1])
+            except AppwriteException as e:
+                if getattr(e, "code", None) != 404:
+                    raise e
+                # Challenge no longer exists - drop it from the queue
+                continue
+            if candidate.get("topicID") not in selected_topics:
+                # Keep it due for when the user selects the topic again
+                off_topic.append(entry)
+                continue
+            # Completing it makes Process Submission reschedule it with a longer interval
+            heapq.heappush(heap, [now + REVISIT_SNOOZE_SECONDS, *entry[1:]])
+            challenge = candidate
+            break
+
+        for entry in off_topic:
+            heapq.heappush(heap, entry)
+        return changed, challenge
+
+    try:
+        return update_queue(databases, database_id, user_id, mutate, wait_seconds=2.0)
+    except (QueueBusy, AppwriteException) as e:
+        context.log(f"Skipping revisit: {str(e)}")
+        return None
+
+
+def encode_page_token(last_id):
+    """Wrap the last document id of a page into an opaque cursor token."""
+    raw = json.dumps({"after": last_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_token(token):
+    """Return the cursor document id from a page token, or None if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        after = payload.get("after")
+        return after if isinstance(after, str) and after else None
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def list_challenges(context, databases, database_id, data):
+    """
+    Library listing - one page of lightweight challenge summary cards.
+
+    Expected payload:
+    {
+        "mode": "list",
+        "pageSize": 20,            # optional, capped at LIST_MAX_PAGE_SIZE
+        "pageToken": "opaque",     # optional, nextPageToken from previous page
+        "topicFilter": "topic-id", # optional
+        "difficulty": 2            # optional
+    }
+    """
+    try:
+        page_size = int(data.get("pageSize", LIST_DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return context.res.json({"success": False, "error": "pageSize must be an integer"}, 400)
+    page_size = max(1, min(page_size, LIST_MAX_PAGE_SIZE))
+
+    queries = [
+        Query.select(LIST_SUMMARY_FIELDS),
+        Query.order_asc("$id"),
+        # Fetch one extra document to know whether another page exists
+        Query.limit(page_size + 1)
+    ]
+
+    topic_filter = data.get("topicFilter")
+    if topic_filter:
+        queries.append(Query.equal("topicID", [topic_filter]))
+
+    difficulty = data.get("difficulty")
+    if difficulty is not None:
+        try:
+            queries.append(Query.equal("difficulty", [int(difficulty)]))
+        except (TypeError, ValueError):
+            return context.res.json({"success": False, "error": "difficulty must be an integer"}, 400)
+
+    cursor = None
+    page_token = data.get("pageToken")
+    if page_token:
+        cursor = decode_page_token(page_token)
+        if not cursor:
+            return context.res.json({"success": False, "error": "Invalid pageToken"}, 400)
+        queries.append(Query.cursor_after(cursor))
+
+    documents = snapshot_challenges(
+        topic_ids=[topic_filter] if topic_filter else None,
+        difficulty=int(difficulty) if difficulty is not None else None,
+        after=cursor,
+        limit=page_size + 1
+    )
+    if documents is None:
+        challenges_response = databases.list_documents(
+            database_id=database_id,
+            collection_id="challenges",
+            queries=queries
+        )
+        documents = challenges_response["documents"]
+
+    has_more = len(documents) > page_size
+    documents = documents[:page_size]
+
+    items = [
+        {
+            "id": c["$id"],
+            "title": c.get("title", ""),
+            "topic": c.get("topicName", ""),
+            "topicID": c.get("topicID", ""),
+            "difficulty": c.get("difficulty", 1),
+            "estimatedTime": c.get("estimatedTime", 8),
+            "xpReward": c.get("xpReward", 15)
+        }
+        for c in documents
+    ]
+
+    return context.res.json({
+        "success": True,
+        "data": {
+            "items": items,
+            "nextPageToken": encode_page_token(documents[-1]["$id"]) if has_more and documents else None,
+            "mode": "list"
+        }
+    })
+
+
+def get_challenge(context, databases, database_id, data):
+    """Return the full body of a single challenge when it is opened from the library."""
+    challenge_id = data.get("challengeId")
+    if not challenge_id:
+        return context.res.json({"success": False, "error": "challengeId required"}, 400)
+
+    try:
+        challenge = get_challenge_document(databases, database_id, challenge_id)
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        context.log(f"Challenge lookup failed: {str(e)}")
+        return context.res.json({"success": False, "error": "Challenge not found"}, 404)
+
+    return context.res.json({
+        "success": True,
+        "data": {
+            "id": challenge["$id"],
+            "title": challenge.get("title", ""),
+            "questions": challenge.get("questions", []),
+            "promptText": challenge.get("promptText", ""),
+            "topic": challenge.get("topicName", ""),
+            "topicID": challenge.get("topicID", ""),
+            "xpReward": challenge.get("xpReward", 15),
+            "estimatedTime": challenge.get("estimatedTime", 8),
+            "difficulty": challenge.get("difficulty", 1),
+            "archetype": challenge.get("archetype", ""),
+            "mutator": challenge.get("mutator", ""),
+            "source": "get",
+            "mode": "get"
+        }
+    })
+
+
+def load_trending_counts(databases, database_id):
+    """This week's attempts per challenge from the Aggregate Trends rollup ({} if none yet)."""
+    try:
+        trends = databases.get_document(
+            database_id=database_id,
+            collection_id="global_trends",
+            document_id="weekly"
+        )
+    except AppwriteException:
+        return {}
+    return {
+        t["challengeID"]: t.get("attemptsThisWeek", 0)
+        for t in json.loads(trends.get("trendingChallenges") or "[]")
+    }
+
+
+def most_popular(challenges, attempts):
+    """Highest weekly attempts wins; ties (including no data) are broken at random."""
+    top = max(attempts.get(c["$id"], 0) for c in challenges)
+    return random.choice([c for c in challenges if attempts.get(c["$id"], 0) == top])
+
 
 def main(context):
     """
     Get Challenge For User - Manual Seeding Version
-    Supports two modes:
-    - "recommended": Challenges from user's selected topics (Home screen)
+    Supports four modes:
+    - "recommended": Challenges from user's selected topics (Home screen),
+      falling back to spaced-repetition revisits once every new one is seen
+      (pass "rank": "popular" to prefer this week's trending challenges)
     - "all": All available challenges (Library screen)
+    - "list": Paginated summary cards for browsing the library
+    - "get": Full body of one challenge, fetched when it is opened
     """
+    capture_trace(context, "getChallengeForUser")
+    return idempotent(context, "getChallengeForUser", handle_request)
+
+
+def handle_request(context):
     try:
         # Validate required environment variables
         required_vars = [
@@ -42,16 +288,48 @@ def main(context):
         user_id = data.get("userId")
         mode = data.get("mode", "recommended")  # "recommended" or "all"
         topic_filter = data.get("topicFilter")  # Optional: filter by specific topicID
+        rank = data.get("rank", "random")  # Optional: "popular" favours this week's trending challenges
+
+        # Library browsing doesn't depend on the user profile
+        if mode == "list":
+            return list_challenges(context, databases, database_id, data)
+        if mode == "get":
+            return get_challenge(context, databases, database_id, data)
 
         if not user_id:
             return context.res.json({"success": False, "error": "userId required"}, 400)
 
-        # Get user profile
-        user_doc = databases.get_document(
+        if mode not in ("recommended", "all"):
+            return context.res.json({"success": False, "error": "Invalid mode. Use 'recommended', 'all', 'list' or 'get'"}, 400)
+
+        # Profile, history and catalog reads don't depend on each other - issue them together
+        user_future = _pool.submit(
+            databases.get_document,
             database_id=database_id,
             collection_id="users",
             document_id=user_id
         )
+        # Challenge history is only needed to skip completed challenges in recommendations
+        history_future = _pool.submit(
+            databases.list_documents,
+            database_id=database_id,
+            collection_id="user_challenge_history",
+            queries=[Query.equal("userId", [user_id])]
+        ) if mode == "recommended" else None
+        trends_future = _pool.submit(
+            load_trending_counts,
+            databases,
+            database_id
+        ) if mode == "recommended" and rank == "popular" else None
+        catalog_future = _pool.submit(
+            load_catalog,
+            databases,
+            database_id,
+            topic_filter if mode == "all" else None
+        )
+
+        # Get user profile
+        user_doc = user_future.result()
 
         selected_topics = user_doc.get("selectedTopics", [])
         
@@ -59,40 +337,23 @@ def main(context):
         if mode == "recommended" and not selected_topics:
             return context.res.json({"success": False, "error": "No topics selected. Please select topics first."}, 400)
 
-        # Get challenge history to avoid showing completed challenges in recommendations
-        try:
-            history_response = databases.list_documents(
-                database_id=database_id,
-                collection_id="user_challenge_history",
-                queries=[Query.equal("userId", [user_id])]
-            )
-            seen_challenge_ids = [doc.get("challengeId") for doc in history_response["documents"] if doc.get("challengeId")]
-        except:
-            seen_challenge_ids = []
-
         # Build query based on mode
         if mode == "recommended":
             # HOME SCREEN RECOMMENDATION: Show only challenges in user's selected topics (exclude completed)
-            challenges_response = databases.list_documents(
-                database_id=database_id,
-                collection_id="challenges",
-                queries=[Query.limit(100)]
-            )
-            
+            try:
+                history_response = history_future.result()
+                seen_challenge_ids = [doc.get("challengeId") for doc in history_response["documents"] if doc.get("challengeId")]
+            except:
+                seen_challenge_ids = []
+
             # Filter by user's topics and exclude seen challenges
             available_challenges = [
-                c for c in challenges_response["documents"]
+                c for c in catalog_future.result()
                 if c.get("topicID") in selected_topics and c["$id"] not in seen_challenge_ids
             ]
-        elif mode == "all":
+        else:
             # TOPICS/LIBRARY SCREEN: Show ALL challenges (no filtering)
-            challenges_response = databases.list_documents(
-                database_id=database_id,
-                collection_id="challenges",
-                queries=[Query.limit(100)]
-            )
-            
-            available_challenges = challenges_response["documents"]
+            available_challenges = catalog_future.result()
             
             # If topicFilter is provided, filter by that specific topic
             if topic_filter:
@@ -100,15 +361,25 @@ def main(context):
                     c for c in available_challenges
                     if c.get("topicID") == topic_filter
                 ]
-        else:
-            return context.res.json({"success": False, "error": "Invalid mode. Use 'recommended' or 'all'"}, 400)
+
+        source = mode
+        if mode == "recommended" and not available_challenges:
+            # Every new challenge has been seen - bring back one that is due for a revisit
+            revisit = pop_due_revisit(context, databases, database_id, user_id, selected_topics)
+            if revisit:
+                available_challenges = [revisit]
+                source = "revisit"
 
         # If we have challenges available, use one
         if available_challenges:
-            challenge = random.choice(available_challenges)
+            if trends_future and source == "recommended":
+                challenge = most_popular(available_challenges, trends_future.result())
+            else:
+                challenge = random.choice(available_challenges)
             
             # For recommended mode, mark as used by creating history entry
-            if mode == "recommended":
+            # (revisits already have one from their first serving)
+            if source == "recommended":
                 try:
                     # Record in history (only for recommendations to track seen challenges)
                     databases.create_document(
@@ -142,7 +413,7 @@ def main(context):
                     "difficulty": challenge.get("difficulty", 1),
                     "archetype": challenge.get("archetype", ""),
                     "mutator": challenge.get("mutator", ""),
-                    "source": mode,
+                    "source": source,
                     "mode": mode
                 }
             })
@@ -4,12 +4,48 @@ from datetime import datetime, timedelta
 from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.query import Query
+from .resilience import Resilient, CircuitOpenError, DeadlineExceeded
+from .trace import capture_trace
+
+
+def histogram_percentile(histogram, value):
+    """
+    Share of the cohort (0-100) below value, from a compacted fixed-bucket histogram.
+    Uses the stored prefix sums, with linear interpolation inside the bucket.
+    """
+    edges = histogram.get("edges", [])
+    counts = histogram.get("counts", [])
+    cumulative = histogram.get("cumulative", [])
+    total = histogram.get("total", 0)
+    if not total or not edges or len(counts) != len(edges) or len(cumulative) != len(edges):
+        return None
+
+    # Bucket lookup over a fixed, small edge list
+    index = 0
+    for i, edge in enumerate(edges):
+        if value >= edge:
+            index = i
+        else:
+            break
+
+    below = cumulative[index - 1] if index > 0 else 0
+    if index + 1 < len(edges):
+        width = edges[index + 1] - edges[index]
+        fraction = min(max((value - edges[index]) / width, 0), 1) if width else 0
+    else:
+        # Open-ended last bucket: treat the value as mid-bucket
+        fraction = 0.5
+    return round(100 * (below + counts[index] * fraction) / total, 1)
+
 
 def main(context):
     """
     Get User Analytics - MVP Version
-    Computes streaks, trends, topic progress from user responses
+    Computes streaks, trends, topic progress from user responses,
+    plus per-topic cohort percentiles from precomputed histograms
     """
+    capture_trace(context, "get-user-analytics")
+
     try:
         # Validate required environment variables
         required_vars = [
@@ -34,6 +70,10 @@ def main(context):
         databases = Databases(client)
         database_id = os.environ.get("APPWRITE_DATABASE_ID")
 
+        # Deadlines, read retries and circuit breaker within the 15s function timeout.
+        # Analytics is read-only, so every read may fall back to its last good result.
+        calls = Resilient(context, budget_seconds=12)
+
         # Parse request body
         data = json.loads(context.req.body) if context.req.body else {}
         user_id = data.get("userId")
@@ -42,58 +82,95 @@ def main(context):
             return context.res.json({"success": False, "error": "userId required"}, 400)
 
         # Get user data
-        user = databases.get_document(
+        user = calls.read("get user", lambda: databases.get_document(
             database_id=database_id,
             collection_id="users",
             document_id=user_id
-        )
+        ), cache_key=f"user:{user_id}")
 
         # Get all user responses
-        responses = databases.list_documents(
+        responses = calls.read("list responses", lambda: databases.list_documents(
             database_id=database_id,
             collection_id="responses",
             queries=[
-                Query.equal("userId", user_id),
+                Query.equal("userID", [user_id]),
                 Query.order_desc("$createdAt"),
                 Query.limit(100)
             ]
-        )
+        ), cache_key=f"responses:{user_id}")
 
         total_responses = responses["total"]
         response_docs = responses["documents"]
 
         # Calculate average thinking time
-        times = [r.get("thinkingTime", 0) for r in response_docs if r.get("thinkingTime", 0) > 0]
+        times = [r.get("totalThinkingTime", 0) for r in response_docs if r.get("totalThinkingTime", 0) > 0]
         avg_thinking_time = sum(times) / len(times) if times else 0
         
         # Calculate quality metrics
         quality_bonuses = [r.get("thinkingQualityBonus", 0) for r in response_docs]
         avg_quality_bonus = sum(quality_bonuses) / len(quality_bonuses) if quality_bonuses else 0
 
-        # Topic progress
+        # Topic progress - submissions carry their topicID, so no per-response challenge reads
         topic_stats = {}
         for response in response_docs:
-            challenge_id = response.get("challengeId")
+            topic_id = response.get("topicID")
+            if not topic_id:
+                continue
+            if topic_id not in topic_stats:
+                topic_stats[topic_id] = {
+                    "topicName": "Unknown",
+                    "completed": 0,
+                    "totalXp": 0,
+                    "totalThinkingTime": 0
+                }
+            topic_stats[topic_id]["completed"] += 1
+            topic_stats[topic_id]["totalXp"] += response.get("totalXpEarned", 0)
+            topic_stats[topic_id]["totalThinkingTime"] += response.get("totalThinkingTime", 0)
+
+        # Topic names in one read for all topics
+        if topic_stats:
             try:
-                challenge = databases.get_document(
+                topics = calls.read("list topics", lambda: databases.list_documents(
                     database_id=database_id,
-                    collection_id="challenges",
-                    document_id=challenge_id
-                )
-                topic_id = challenge.get("topicID")
-                topic_name = challenge.get("topicName", "Unknown")
-                
-                if topic_id not in topic_stats:
-                    topic_stats[topic_id] = {
-                        "topicName": topic_name,
-                        "completed": 0,
-                        "totalXp": 0
+                    collection_id="topics",
+                    queries=[
+                        Query.equal("$id", sorted(topic_stats)),
+                        Query.limit(len(topic_stats))
+                    ]
+                ), cache_key="topics:" + ",".join(sorted(topic_stats)))
+                for topic in topics["documents"]:
+                    topic_stats[topic["$id"]]["topicName"] = topic.get("name", "Unknown")
+            except Exception as e:
+                context.log(f"Topic names unavailable: {str(e)}")
+
+        # Cohort comparison: percentile of the user's per-topic averages against
+        # the precomputed histograms maintained by Compact Histograms
+        topic_ids = [t for t in topic_stats if t]
+        if topic_ids:
+            try:
+                histograms = calls.read("list cohort histograms", lambda: databases.list_documents(
+                    database_id=database_id,
+                    collection_id="cohort_histograms",
+                    queries=[
+                        Query.equal("topicID", topic_ids),
+                        Query.limit(len(topic_ids) * 2)
+                    ]
+                ), cache_key="histograms:" + ",".join(sorted(topic_ids)))
+                by_topic = {}
+                for histogram in histograms["documents"]:
+                    by_topic.setdefault(histogram.get("topicID"), {})[histogram.get("metric")] = histogram
+
+                for topic_id in topic_ids:
+                    stats = topic_stats[topic_id]
+                    cohort = by_topic.get(topic_id, {})
+                    completed = stats["completed"]
+                    stats["cohort"] = {
+                        "thinkingTimePercentile": histogram_percentile(cohort["thinkingTime"], stats["totalThinkingTime"] / completed) if "thinkingTime" in cohort else None,
+                        "xpPercentile": histogram_percentile(cohort["xp"], stats["totalXp"] / completed) if "xp" in cohort else None,
+                        "cohortSize": cohort["xp"].get("total", 0) if "xp" in cohort else 0
                     }
-                
-                topic_stats[topic_id]["completed"] += 1
-                topic_stats[topic_id]["totalXp"] += response.get("xpEarned", 0)
-            except:
-                continue
+            except Exception as e:
+                context.log(f"Cohort histograms unavailable: {str(e)}")
 
         # Activity calendar (last 30 days)
         activity_calendar = {}
@@ -120,6 +197,8 @@ def main(context):
         
         trend = "up" if recent_count > previous_count else "down" if recent_count < previous_count else "stable"
 
+        calls.log_summary()
+
         return context.res.json({
             "success": True,
             "data": {
@@ -140,6 +219,14 @@ def main(context):
             }
         })
 
+    except CircuitOpenError as err:
+        context.error(f"Backend degraded in get-user-analytics: {str(err)}")
+        return context.res.json({"success": False, "error": "Service temporarily unavailable, please try again shortly"}, 503)
+
+    except DeadlineExceeded as err:
+        context.error(f"Backend timeout in get-user-analytics: {str(err)}")
+        return context.res.json({"success": False, "error": "Database request timed out"}, 504)
+
     except Exception as err:
         context.error(f"Error in get-user-analytics: {str(err)}")
         return context.res.json({"success": False, "error": str(err)}, 500)
@@ -0,0 +1,220 @@
+"""
+Resilience helpers for Appwrite SDK calls
+
+The SDK issues blocking HTTP requests with no timeout, so every call is run on
+a small worker pool and abandoned once its deadline passes. Idempotent reads
+are retried with jittered backoff inside the invocation's time budget; writes
+get a deadline but are never retried. A create whose outcome must be known
+(abandoning it could still let it land) can opt out of the deadline. A circuit breaker shared by all calls in
+the container fails fast while the backend is degraded, and reads that were
+given a cache key fall back to their last good result.
+
+An abandoned call can't be cancelled - its thread stays busy until the SDK
+returns. At most MAX_CALLS_IN_FLIGHT calls run at once, counting abandoned
+ones, and a call that finds every slot taken fails fast with
+DeadlineExceeded instead of queueing behind hung requests. Saturation isn't
+counted against the breaker, since the hung calls already were.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from appwrite.exception import AppwriteException
+
+RETRYABLE_CODES = {0, 408, 429, 500, 502, 503, 504}
+
+# Shared across warm invocations of the same container
+MAX_CALLS_IN_FLIGHT = 8
+_executor = ThreadPoolExecutor(max_workers=MAX_CALLS_IN_FLIGHT, thread_name_prefix="appwrite-call")
+_slots = threading.BoundedSemaphore(MAX_CALLS_IN_FLIGHT)
+_cache = {}
+_cache_lock = threading.Lock()
+CACHE_TTL_SECONDS = 600
+CACHE_MAX_ENTRIES = 1000
+
+
+class DeadlineExceeded(Exception):
+    """An Appwrite call did not finish within its deadline."""
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open and no cached result was available."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker: closed -> open -> half_open -> closed.
+    Half-open admits a single probe; other calls fail fast until it resolves.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def record_client_error(self):
+        """A 4xx says nothing about failures, but a probe that got one reached a live backend."""
+        with self._lock:
+            if self.probing:
+                self.failures = 0
+                self.opened_at = None
+                self.probing = False
+
+
+breaker = CircuitBreaker()
+
+
+def is_retryable(error):
+    if isinstance(error, DeadlineExceeded):
+        return True
+    if isinstance(error, AppwriteException):
+        return (getattr(error, "code", None) or 0) in RETRYABLE_CODES
+    # Connection errors from the HTTP layer
+    return isinstance(error, (ConnectionError, OSError))
+
+
+class Resilient:
+    """
+    Per-invocation wrapper. Usage:
+
+        calls = Resilient(context, budget_seconds=12)
+        user = calls.read("get user", lambda: databases.get_document(...), cache_key=f"user:{user_id}")
+        calls.write("update user", lambda: databases.update_document(...))
+        calls.log_summary()
+    """
+
+    def __init__(self, context, budget_seconds=12.0, call_timeout=4.0, max_retries=2):
+        self.context = context
+        self.deadline = time.monotonic() + budget_seconds
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.retries = 0
+        self.cache_hits = 0
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def _call(self, name, fn, deadline=True):
+        timeout = min(self.call_timeout, self.remaining())
+        if timeout <= 0:
+            raise DeadlineExceeded(f"{name}: invocation budget exhausted")
+        if not _slots.acquire(blocking=False):
+            raise DeadlineExceeded(f"{name}: {MAX_CALLS_IN_FLIGHT} calls already in flight")
+        if not breaker.allow():
+            _slots.release()
+            raise CircuitOpenError(f"{name}: circuit open")
+
+        def run():
+            try:
+                return fn()
+            finally:
+                _slots.release()
+
+        future = _executor.submit(run)
+        try:
+            result = future.result(timeout=timeout if deadline else None)
+        except FutureTimeout:
+            # The call keeps its thread and slot until the SDK returns
+            breaker.record_failure()
+            raise DeadlineExceeded(f"{name}: no response within {timeout:.1f}s")
+        except Exception as e:
+            # Client errors (404, 409, ...) say nothing about backend health
+            if is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.record_client_error()
+            raise
+        breaker.record_success()
+        return result
+
+    def read(self, name, fn, cache_key=None):
+        """Idempotent read: deadline, jittered retries, cached fallback when degraded."""
+        attempt = 0
+        while True:
+            try:
+                result = self._call(name, fn)
+                if cache_key is not None:
+                    with _cache_lock:
+                        # Re-insert so dict order tracks recency, then trim the oldest
+                        _cache.pop(cache_key, None)
+                        _cache[cache_key] = (time.monotonic(), result)
+                        while len(_cache) > CACHE_MAX_ENTRIES:
+                            _cache.pop(next(iter(_cache)))
+                return result
+            except CircuitOpenError:
+                return self._fallback(name, cache_key, CircuitOpenError(f"{name}: circuit open"))
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                if attempt >= self.max_retries:
+                    return self._fallback(name, cache_key, e)
+                backoff = min(0.2 * (2 ** attempt), 2.0) * random.uniform(0.5, 1.5)
+                if backoff >= self.remaining():
+                    return self._fallback(name, cache_key, e)
+                attempt += 1
+                self.retries += 1
+                self.context.log(
+                    f"[resilience] {name}: retry {attempt}/{self.max_retries} in {backoff:.2f}s "
+                    f"after {type(e).__name__}, breaker={breaker.state}"
+                )
+                time.sleep(backoff)
+
+    def write(self, name, fn, deadline=True):
+        """
+        Mutation: deadline and breaker only - never retried, never served from cache.
+        With deadline=False the call is waited on until it finishes, for writes
+        that are not safe to abandon.
+        """
+        return self._call(name, fn, deadline)
+
+    def _fallback(self, name, cache_key, error):
+        if cache_key is not None:
+            with _cache_lock:
+                cached = _cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] <= CACHE_TTL_SECONDS:
+                self.cache_hits += 1
+                self.context.log(f"[resilience] {name}: serving cached result, breaker={breaker.state}")
+                return cached[1]
+        self.context.error(f"[resilience] {name}: giving up after {type(error).__name__}, breaker={breaker.state}")
+        raise error
+
+    def log_summary(self):
+        self.context.log(
+            f"[resilience] retries={self.retries} cacheHits={self.cache_hits} "
+            f"breaker={breaker.state} failures={breaker.failures}"
+        )
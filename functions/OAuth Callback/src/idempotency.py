@@ -0,0 +1,269 @@
+"""
+Idempotent request handling
+
+Clients may send an "idempotencyKey" in the request body (or an
+X-Idempotency-Key header). The first request with a key runs normally and its
+response is kept; a repeat of the same request within the TTL gets that
+response back without the handler running again, so no write is repeated.
+
+Two tiers:
+- in-process: recent results plus requests still running, so a duplicate that
+  lands on the same warm runtime waits for the original instead of racing it
+- persistent: a claim document in idempotency_keys, created before the handler
+  runs. Document creation is atomic, so exactly one of several concurrent
+  duplicates across runtimes wins the claim; the others wait for its result.
+
+Server errors (5xx) are not kept: the claim is released and a retry runs again.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.exception import AppwriteException
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "900"))
+PENDING_TTL_SECONDS = 60  # a claim left behind by a crashed runtime frees up after this
+PENDING_WAIT_SECONDS = 8.0
+PENDING_POLL_SECONDS = 0.25
+LOCAL_MAX_ENTRIES = 1000
+COLLECTION_ID = "idempotency_keys"
+
+_lock = threading.Lock()
+_results = {}  # store id -> (monotonic expiry, fingerprint, body, status code)
+_in_flight = {}  # store id -> threading.Event set when the original finishes
+_databases = None
+
+
+class _RecordingResponse:
+    """Passes responses through to the runtime, remembering the last one."""
+
+    def __init__(self, res):
+        self._res = res
+        self.recorded = None
+
+    def json(self, data, status_code=200, headers=None):
+        self.recorded = (data, status_code)
+        if headers:
+            return self._res.json(data, status_code, headers)
+        return self._res.json(data, status_code)
+
+    def __getattr__(self, name):
+        return getattr(self._res, name)
+
+
+class _RecordingContext:
+    def __init__(self, context):
+        self._context = context
+        self.res = _RecordingResponse(context.res)
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+def persistent_store():
+    """Databases client for the persistent tier, or None when it isn't configured."""
+    global _databases
+    if _databases is None:
+        required_vars = ["APPWRITE_FUNCTION_API_ENDPOINT", "APPWRITE_DATABASES_API_KEY", "APPWRITE_DATABASE_ID"]
+        if not all(os.environ.get(var) for var in required_vars):
+            return None
+        client = Client()
+        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        client.set_project(os.environ.get("APPWRITE_FUNCTION_PROJECT_ID"))
+        client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+        _databases = Databases(client)
+    return _databases
+
+
+def request_key(context, body):
+    key = body.get("idempotencyKey")
+    if not key:
+        headers = getattr(context.req, "headers", None) or {}
+        key = headers.get("x-idempotency-key")
+    return str(key)[:255] if key else None
+
+
+def replay(context, data, status_code):
+    return context.res.json(data, status_code, {"x-idempotent-replay": "true"})
+
+
+def mismatch(context):
+    return context.res.json({
+        "success": False,
+        "error": "idempotencyKey was already used for a different request"
+    }, 422)
+
+
+def in_progress(context):
+    return context.res.json({
+        "success": False,
+        "error": "A request with this idempotencyKey is still being processed. Retry shortly."
+    }, 409)
+
+
+def local_result(store_id):
+    entry = _results.get(store_id)
+    if entry and entry[0] <= time.monotonic():
+        del _results[store_id]
+        return None
+    return entry
+
+
+def remember(store_id, fingerprint, data, status_code):
+    with _lock:
+        _results[store_id] = (time.monotonic() + IDEMPOTENCY_TTL_SECONDS, fingerprint, data, status_code)
+        while len(_results) > LOCAL_MAX_ENTRIES:
+            del _results[next(iter(_results))]
+
+
+def parse_expiry(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def claim(databases, database_id, store_id, fingerprint):
+    """
+    Try to own the key. Returns ("claimed", None), ("done", document) with the
+    stored result, or ("busy", None) if another runtime is still working on it.
+    """
+    deadline = time.monotonic() + PENDING_WAIT_SECONDS
+    while True:
+        now = datetime.now(timezone.utc)
+        try:
+            databases.create_document(
+                database_id=database_id,
+                collection_id=COLLECTION_ID,
+                document_id=store_id,
+                data={
+                    "fingerprint": fingerprint,
+                    "status": "pending",
+                    "expiresAt": (now + timedelta(seconds=PENDING_TTL_SECONDS)).isoformat()
+                }
+            )
+            return "claimed", None
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 409:
+                raise e
+
+        try:
+            doc = databases.get_document(database_id=database_id, collection_id=COLLECTION_ID, document_id=store_id)
+        except AppwriteException as e:
+            if getattr(e, "code", None) == 404:
+                continue  # released between our create and this read
+            raise e
+
+        if parse_expiry(doc["expiresAt"]) <= now:
+            release(databases, database_id, store_id)
+            continue
+        if doc.get("status") == "done":
+            return "done", doc
+        if time.monotonic() >= deadline:
+            return "busy", None
+        time.sleep(PENDING_POLL_SECONDS)
+
+
+def complete(databases, database_id, store_id, data, status_code):
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    databases.update_document(
+        database_id=database_id,
+        collection_id=COLLECTION_ID,
+        document_id=store_id,
+        data={
+            "status": "done",
+            "statusCode": status_code,
+            "response": json.dumps(data, separators=(",", ":")),
+            "expiresAt": expires_at.isoformat()
+        }
+    )
+
+
+def release(databases, database_id, store_id):
+    try:
+        databases.delete_document(database_id=database_id, collection_id=COLLECTION_ID, document_id=store_id)
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+
+
+def idempotent(context, function_id, handler):
+    """Run handler(context) at most once per idempotency key; without a key it just runs."""
+    try:
+        body = json.loads(context.req.body) if context.req.body else {}
+    except (TypeError, ValueError):
+        body = {}
+    key = request_key(context, body) if isinstance(body, dict) else None
+    if not key:
+        return handler(context)
+
+    # Keys are scoped per function and per user, and bound to the request they came with
+    request = {k: v for k, v in body.items() if k != "idempotencyKey"}
+    store_id = hashlib.sha256(f"{function_id}:{body.get('userId', '')}:{key}".encode("utf-8")).hexdigest()[:32]
+    fingerprint = hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+    # In-process tier: finished results and requests still running here
+    with _lock:
+        entry = local_result(store_id)
+        running = _in_flight.get(store_id) if not entry else None
+        if not entry and not running:
+            _in_flight[store_id] = threading.Event()
+    if running:
+        running.wait(PENDING_WAIT_SECONDS)
+        with _lock:
+            entry = local_result(store_id)
+        if not entry:
+            return in_progress(context)
+    if entry:
+        _, stored_fingerprint, data, status_code = entry
+        if stored_fingerprint != fingerprint:
+            return mismatch(context)
+        return replay(context, data, status_code)
+
+    try:
+        # Persistent tier: one claim document per key across all runtimes
+        databases = persistent_store()
+        database_id = os.environ.get("APPWRITE_DATABASE_ID")
+        outcome = "claimed"
+        if databases is not None:
+            try:
+                outcome, doc = claim(databases, database_id, store_id, fingerprint)
+            except AppwriteException as e:
+                # Dedupe store unavailable - serve the request rather than fail it
+                context.error(f"Idempotency store unavailable, running without it: {str(e)}")
+                databases = None
+
+        if outcome == "busy":
+            return in_progress(context)
+        if outcome == "done":
+            if doc.get("fingerprint") != fingerprint:
+                return mismatch(context)
+            data, status_code = json.loads(doc["response"]), doc.get("statusCode", 200)
+            remember(store_id, doc["fingerprint"], data, status_code)
+            return replay(context, data, status_code)
+
+        recorder = _RecordingContext(context)
+        try:
+            result = handler(recorder)
+        except Exception:
+            if databases is not None:
+                release(databases, database_id, store_id)
+            raise
+
+        recorded = recorder.res.recorded
+        if recorded and recorded[1] < 500:
+            remember(store_id, fingerprint, *recorded)
+            if databases is not None:
+                try:
+                    complete(databases, database_id, store_id, *recorded)
+                except AppwriteException as e:
+                    context.error(f"Failed to store idempotent result: {str(e)}")
+        elif databases is not None:
+            release(databases, database_id, store_id)
+        return result
+    finally:
+        with _lock:
+            running = _in_flight.pop(store_id, None)
+        if running:
+            running.set()
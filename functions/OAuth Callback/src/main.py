@@ -1,14 +1,98 @@
 import os
 import json
+import time
+import hashlib
 from appwrite.client import Client
 from appwrite.services.account import Account
 from appwrite.services.databases import Databases
+from appwrite.exception import AppwriteException
+from .idempotency import idempotent
+from .trace import capture_trace
+
+# Validated sessions are cached per warm container to absorb login storms
+SESSION_CACHE_TTL_SECONDS = int(os.environ.get("SESSION_CACHE_TTL_SECONDS", "60"))
+SESSION_CACHE_MAX_ENTRIES = 5000
+
+# Profile fields the app reads after login (see app/app/auth-callback.tsx)
+PROFILE_FIELDS = [
+    "email",
+    "username",
+    "selectedTopics",
+    "level",
+    "xp",
+    "currentStreak",
+    "longestStreak",
+    "totalChallengesCompleted",
+    "onboardingCompleted"
+]
+
+# session hash -> {"expiresAt", "userId", "email", "name", "profileExists"}
+_session_cache = {}
+_db_client = None
+
+
+def session_key(session):
+    """Cache key for a session - the raw session secret is never kept in memory."""
+    return hashlib.sha256(session.encode("utf-8")).hexdigest()
+
+
+def get_cached_session(session):
+    entry = _session_cache.get(session_key(session))
+    if not entry:
+        return None
+    if entry["expiresAt"] < time.monotonic():
+        _session_cache.pop(session_key(session), None)
+        return None
+    return entry
+
+
+def cache_session(session, user_account):
+    if len(_session_cache) >= SESSION_CACHE_MAX_ENTRIES:
+        now = time.monotonic()
+        for key in [k for k, v in _session_cache.items() if v["expiresAt"] < now]:
+            del _session_cache[key]
+        if len(_session_cache) >= SESSION_CACHE_MAX_ENTRIES:
+            _session_cache.clear()
+
+    entry = {
+        "expiresAt": time.monotonic() + SESSION_CACHE_TTL_SECONDS,
+        "userId": user_account.get("$id"),
+        "email": user_account.get("email", ""),
+        "name": user_account.get("name", "User"),
+        "profileExists": False
+    }
+    _session_cache[session_key(session)] = entry
+    return entry
+
+
+def get_databases(project_id):
+    """Reuse the API-key client across warm invocations."""
+    global _db_client
+    if _db_client is None:
+        _db_client = Client()
+        _db_client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        _db_client.set_project(project_id)
+        _db_client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+    return Databases(_db_client)
+
+
+def project_profile(document):
+    return {field: document.get(field) for field in PROFILE_FIELDS if field in document}
+
 
 def main(context):
     """
     OAuth Callback - MVP Version
     Handles OAuth callback and creates/updates user profile
+
+    The session is validated with account.get() at most once per TTL, and the
+    profile is upserted create-first: a 409 conflict means the profile exists.
     """
+    capture_trace(context, "oauth-callback")
+    return idempotent(context, "oauth-callback", handle_request)
+
+
+def handle_request(context):
     try:
         # Validate required environment variables
         required_vars = [
@@ -23,66 +107,73 @@ def main(context):
                 "error": f"Missing required environment variables: {', '.join(missing_vars)}"
             }, 500)
 
-        # Initialize Appwrite client (APPWRITE_FUNCTION_PROJECT_ID is automatically provided)
+        # APPWRITE_FUNCTION_PROJECT_ID is automatically provided
         project_id = os.environ.get("APPWRITE_FUNCTION_PROJECT_ID")
-        client = Client()
-        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
-        client.set_project(project_id)
-        
+
         # Parse request
         data = json.loads(context.req.body) if context.req.body else {}
         user_id = data.get("userId")
         session = data.get("session")
-        
+
         if not user_id:
             return context.res.json({"success": False, "error": "userId required"}, 400)
+        if not session:
+            return context.res.json({"success": False, "error": "Invalid session"}, 401)
 
-        # Set session for authenticated requests
-        if session:
+        cached = get_cached_session(session)
+        if cached is None:
+            client = Client()
+            client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+            client.set_project(project_id)
             client.set_session(session)
 
-        account = Account(client)
-        
-        # Get user account details
-        try:
-            user_account = account.get()
-        except:
-            return context.res.json({"success": False, "error": "Invalid session"}, 401)
+            try:
+                user_account = Account(client).get()
+            except AppwriteException as e:
+                context.log(f"Session validation failed: {str(e)}")
+                return context.res.json({"success": False, "error": "Invalid session"}, 401)
+
+            cached = cache_session(session, user_account)
+        else:
+            context.log("Session validated from cache")
+
+        if cached["userId"] != user_id:
+            return context.res.json({"success": False, "error": "Session does not belong to user"}, 403)
 
-        # Initialize database client with API key
-        db_client = Client()
-        db_client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
-        db_client.set_project(project_id)
-        db_client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
-        
-        databases = Databases(db_client)
+        databases = get_databases(project_id)
         database_id = os.environ.get("APPWRITE_DATABASE_ID")
 
-        # Check if user profile exists
+        # Profile already seen for this session - a plain read is a single round trip
+        if cached["profileExists"]:
+            try:
+                user_profile = databases.get_document(
+                    database_id=database_id,
+                    collection_id="users",
+                    document_id=user_id
+                )
+                return context.res.json({
+                    "success": True,
+                    "data": {
+                        "isNewUser": False,
+                        "userId": user_id,
+                        "profile": project_profile(user_profile)
+                    }
+                })
+            except AppwriteException as e:
+                if getattr(e, "code", None) != 404:
+                    raise e
+                cached["profileExists"] = False
+
+        # Create-first upsert: new users cost one write, a conflict means the profile exists
+        is_new_user = True
         try:
-            user_profile = databases.get_document(
-                database_id=database_id,
-                collection_id="users",
-                document_id=user_id
-            )
-            # User exists, return profile
-            return context.res.json({
-                "success": True,
-                "data": {
-                    "isNewUser": False,
-                    "userId": user_id,
-                    "profile": user_profile
-                }
-            })
-        except:
-            # User doesn't exist, create new profile
             user_profile = databases.create_document(
                 database_id=database_id,
                 collection_id="users",
                 document_id=user_id,
                 data={
-                    "email": user_account.get("email", ""),
-                    "username": user_account.get("name", "User"),
+                    "email": cached["email"],
+                    "username": cached["name"],
                     "xp": 0,
                     "level": 1,
                     "currentStreak": 0,
@@ -97,15 +188,26 @@ def main(context):
                     f"delete(\"user:{user_id}\")"
                 ]
             )
-            
-            return context.res.json({
-                "success": True,
-                "data": {
-                    "isNewUser": True,
-                    "userId": user_id,
-                    "profile": user_profile
-                }
-            })
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 409:
+                raise e
+            is_new_user = False
+            user_profile = databases.get_document(
+                database_id=database_id,
+                collection_id="users",
+                document_id=user_id
+            )
+
+        cached["profileExists"] = True
+
+        return context.res.json({
+            "success": True,
+            "data": {
+                "isNewUser": is_new_user,
+                "userId": user_id,
+                "profile": project_profile(user_profile)
+            }
+        })
 
     except Exception as err:
         context.error(f"Error in oauth-callback: {str(err)}")
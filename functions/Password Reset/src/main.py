@@ -2,12 +2,20 @@ import os
 import json
 from appwrite.client import Client
 from appwrite.services.account import Account
+from .idempotency import idempotent
+from .trace import capture_trace
+
 
 def main(context):
     """
     Password Reset - MVP Version
     Handles password reset requests
     """
+    capture_trace(context, "password-reset")
+    return idempotent(context, "password-reset", handle_request)
+
+
+def handle_request(context):
     try:
         # Validate required environment variables
         required_vars = [
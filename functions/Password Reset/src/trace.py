@@ -0,0 +1,78 @@
+"""
+Request trace capture for load-test replay
+
+With TRACE_CAPTURE=true each request body is logged as one "TRACE {...}" line,
+sanitized so it can be kept and shared: secrets are redacted, identities are
+pseudonymized and free text is replaced by filler of the same length.
+scripts/replay_traces.py replays these lines against local fakes.
+
+Pseudonyms are an HMAC keyed by TRACE_PSEUDONYM_KEY, so the same user maps to
+the same pseudonym across requests but ids and emails can't be recovered by
+hashing candidates. Without a key nothing is captured.
+"""
+import os
+import hmac
+import json
+import time
+import hashlib
+
+TRACE_CAPTURE = os.environ.get("TRACE_CAPTURE", "").lower() in ("1", "true", "yes")
+TRACE_PSEUDONYM_KEY = os.environ.get("TRACE_PSEUDONYM_KEY", "")
+TRACE_REDACTED_KEYS = {"secret", "password", "passwordConfirm", "token"}
+# Any other key containing one of these (case-insensitive) is redacted too
+TRACE_REDACTED_FRAGMENTS = ("password", "secret", "token")
+TRACE_PSEUDONYM_KEYS = {"userId", "email", "session"}
+TRACE_TEXT_KEYS = {"responseText", "questionText", "userQuery"}
+
+
+def is_redacted(key):
+    if key is None:
+        return False
+    lowered = key.lower()
+    return key in TRACE_REDACTED_KEYS or any(fragment in lowered for fragment in TRACE_REDACTED_FRAGMENTS)
+
+
+def pseudonymize(value):
+    """Keyed digest of an identity; None when no key is configured."""
+    if not TRACE_PSEUDONYM_KEY:
+        return None
+    return hmac.new(TRACE_PSEUDONYM_KEY.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+
+def sanitize_trace(value, key=None):
+    """Strip secrets, pseudonymize identities and blank out free text, keeping sizes."""
+    if is_redacted(key):
+        return "[redacted]"
+    if isinstance(value, dict):
+        return {k: sanitize_trace(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [sanitize_trace(v, key) for v in value]
+    if not isinstance(value, str):
+        return value
+    if key in TRACE_PSEUDONYM_KEYS:
+        digest = pseudonymize(value)
+        if digest is None:
+            return "[redacted]"
+        return f"{digest}@example.com" if key == "email" else f"t{digest}"
+    if key in TRACE_TEXT_KEYS:
+        return "x" * len(value)
+    return value
+
+
+def capture_trace(context, function_id):
+    """Log the sanitized request body as a TRACE line when TRACE_CAPTURE is on."""
+    if not TRACE_CAPTURE:
+        return
+    if not TRACE_PSEUDONYM_KEY:
+        context.error("TRACE_CAPTURE is on but TRACE_PSEUDONYM_KEY is not set; trace not captured")
+        return
+    try:
+        body = json.loads(context.req.body) if context.req.body else {}
+        context.log("TRACE " + json.dumps({
+            "ts": time.time(),
+            "function": function_id,
+            "body": sanitize_trace(body)
+        }))
+    except Exception:
+        # Capture must never affect the request
+        pass
@@ -0,0 +1,337 @@
+import os
+import json
+import heapq
+from datetime import datetime, timezone
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+from .revisits import update_queue, QueueBusy
+from .leases import lease
+
+XP_PER_LEVEL = 100
+STATS_LOCK_WAIT_SECONDS = 8.0
+
+# Spaced-repetition revisits: a completion's XP and thinking time set how long
+# until the challenge comes back into the recommendation pool
+REVISIT_XP_REFERENCE = 33  # full XP for a three-question challenge with all bonuses
+REVISIT_TIME_REFERENCE = 300  # seconds of thinking treated as full engagement
+REVISIT_MIN_INTERVAL_DAYS = 1
+REVISIT_MAX_INTERVAL_DAYS = 180
+
+
+def main(context):
+    """
+    Process Submission - event worker for Submit Challenge async mode
+    Triggered on responses document create and update. Applies the side effects
+    that Submit Challenge defers: user stats and streak, leaderboard entry, the
+    user_challenge_history rollup and the cohort histogram sample. Every
+    completion, including synchronous ones and revisits (which update the
+    existing response), is also put on the user's spaced-repetition revisit queue.
+
+    Update events only matter when Submit Challenge marked the update as a
+    resubmission (postProcessing "revisit"); the worker clears the mark once the
+    revisit is scheduled. Any other update - the worker's own writes, a quality
+    backfill - returns before touching the database.
+
+    Idempotency: before touching any stats the worker claims the response by
+    creating a processed_responses document whose $id is the response id. A
+    redelivered event hits a 409 on that create and is acknowledged as a no-op.
+    If processing fails the claim is released so a later delivery can retry.
+    Two submissions by the same user are processed concurrently, so the user
+    and leaderboard read-modify-write runs under the user's user_stats_locks
+    lease (see leases.py).
+    """
+    try:
+        required_vars = [
+            "APPWRITE_FUNCTION_API_ENDPOINT",
+            "APPWRITE_DATABASE_ID",
+            "APPWRITE_DATABASES_API_KEY"
+        ]
+        missing_vars = [var for var in required_vars if not os.environ.get(var)]
+        if missing_vars:
+            return context.res.json({
+                "success": False,
+                "error": f"Missing required environment variables: {', '.join(missing_vars)}"
+            }, 500)
+
+        # Initialize Appwrite client (APPWRITE_FUNCTION_PROJECT_ID is automatically provided)
+        client = Client()
+        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        client.set_project(os.environ.get("APPWRITE_FUNCTION_PROJECT_ID"))
+        client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+
+        databases = Databases(client)
+        database_id = os.environ.get("APPWRITE_DATABASE_ID")
+
+        # Event payload is the created or updated response document
+        response_doc = json.loads(context.req.body) if context.req.body else {}
+        response_id = response_doc.get("$id")
+        user_id = response_doc.get("userID")
+        challenge_id = response_doc.get("challengeID")
+
+        if not response_id or not user_id:
+            return context.res.json({"success": False, "error": "Event payload is not a response document"}, 400)
+
+        created = is_create_event(context, response_doc)
+        if not created and response_doc.get("postProcessing") != "revisit":
+            context.log(f"Response {response_id} updated without a new completion, skipping")
+            return context.res.json({"success": True, "data": {"skipped": True, "responseId": response_id}})
+
+        # Every completion (sync or async, first attempt or revisit) reschedules the
+        # challenge; scheduling is keyed on the completion, so redeliveries are no-ops
+        if challenge_id and response_doc.get("completedAt"):
+            try:
+                schedule_revisit(databases, database_id, user_id, challenge_id, response_doc)
+            except (AppwriteException, QueueBusy) as e:
+                context.error(f"Failed to schedule revisit: {str(e)}")
+
+        if not created:
+            # Resubmissions earn no stats; clearing the mark fires one more update event, which is skipped above
+            mark_processed(context, databases, database_id, response_id)
+            return context.res.json({"success": True, "data": {"revisit": True, "responseId": response_id}})
+
+        # Responses written by the synchronous path already had their stats applied
+        if response_doc.get("postProcessing") != "pending":
+            context.log(f"Response {response_id} not marked for post-processing, skipping")
+            return context.res.json({"success": True, "data": {"skipped": True, "responseId": response_id}})
+
+        # Claim the response - a conflict means another delivery already did the work
+        try:
+            databases.create_document(
+                database_id=database_id,
+                collection_id="processed_responses",
+                document_id=response_id,
+                data={
+                    "responseId": response_id,
+                    "userId": user_id,
+                    "processedAt": datetime.now(timezone.utc).isoformat()
+                }
+            )
+        except AppwriteException as e:
+            if getattr(e, "code", None) == 409:
+                context.log(f"Response {response_id} already processed, ignoring redelivery")
+                return context.res.json({"success": True, "data": {"duplicate": True, "responseId": response_id}})
+            raise e
+
+        try:
+            with lease(databases, database_id, "user_stats_locks", user_id, STATS_LOCK_WAIT_SECONDS):
+                stats = apply_user_stats(databases, database_id, user_id, response_doc)
+                # Leaderboard is derived data - log and carry on if it fails
+                try:
+                    upsert_leaderboard(databases, database_id, user_id, stats)
+                except AppwriteException as e:
+                    context.error(f"Failed to update leaderboard: {str(e)}")
+            context.log(f"User updated - XP: {stats['xp']}, Level: {stats['level']}, Streak: {stats['streak']}")
+        except Exception as err:
+            # Release the claim so the event can be retried
+            try:
+                databases.delete_document(
+                    database_id=database_id,
+                    collection_id="processed_responses",
+                    document_id=response_id
+                )
+            except AppwriteException as release_err:
+                context.error(f"Failed to release claim for {response_id}: {str(release_err)}")
+            raise err
+
+        # Histogram and history rollups are derived data - log and carry on if they fail
+        try:
+            record_histogram_sample(databases, database_id, response_doc)
+        except AppwriteException as e:
+            context.error(f"Failed to record histogram sample: {str(e)}")
+
+        try:
+            rollup_history(databases, database_id, user_id, challenge_id, response_doc)
+        except AppwriteException as e:
+            context.error(f"Failed to update challenge history: {str(e)}")
+
+        mark_processed(context, databases, database_id, response_id)
+
+        return context.res.json({
+            "success": True,
+            "data": {
+                "responseId": response_id,
+                **stats
+            }
+        })
+
+    except Exception as err:
+        context.error(f"Error in process-submission: {str(err)}")
+        return context.res.json({"success": False, "error": str(err)}, 500)
+
+
+def is_create_event(context, response_doc):
+    """
+    True for a responses create event. Appwrite names the event in the
+    x-appwrite-event header; without it, a document that was never updated
+    since it was created is a create.
+    """
+    headers = getattr(context.req, "headers", None) or {}
+    event = headers.get("x-appwrite-event")
+    if event:
+        return event.endswith(".create")
+    return response_doc.get("$updatedAt") == response_doc.get("$createdAt")
+
+
+def mark_processed(context, databases, database_id, response_id):
+    try:
+        databases.update_document(
+            database_id=database_id,
+            collection_id="responses",
+            document_id=response_id,
+            data={"postProcessing": "done"}
+        )
+    except AppwriteException as e:
+        context.log(f"Failed to mark response {response_id} as processed: {str(e)}")
+
+
+def apply_user_stats(databases, database_id, user_id, response_doc):
+    """Add the response's XP to the user and bump level, streak and completion count."""
+    user = databases.get_document(
+        database_id=database_id,
+        collection_id="users",
+        document_id=user_id
+    )
+
+    current_level = user.get("level", 1)
+    new_xp = user.get("xp", 0) + response_doc.get("totalXpEarned", 0)
+    new_level = (new_xp // XP_PER_LEVEL) + 1
+    new_streak = user.get("streak", 0) + 1
+    new_completed = user.get("completedChallenges", 0) + 1
+
+    databases.update_document(
+        database_id=database_id,
+        collection_id="users",
+        document_id=user_id,
+        data={
+            "xp": new_xp,
+            "level": new_level,
+            "streak": new_streak,
+            "completedChallenges": new_completed,
+            "lastActiveDate": datetime.now(timezone.utc).isoformat()
+        }
+    )
+
+    return {
+        "xp": new_xp,
+        "level": new_level,
+        "leveledUp": new_level > current_level,
+        "streak": new_streak,
+        "completedChallenges": new_completed
+    }
+
+
+def upsert_leaderboard(databases, database_id, user_id, stats):
+    """Mirror the user's totals into the leaderboard collection (document id = user id)."""
+    entry = {
+        "userId": user_id,
+        "xp": stats["xp"],
+        "level": stats["level"],
+        "streak": stats["streak"]
+    }
+    try:
+        databases.update_document(
+            database_id=database_id,
+            collection_id="leaderboard",
+            document_id=user_id,
+            data=entry
+        )
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise e
+        databases.create_document(
+            database_id=database_id,
+            collection_id="leaderboard",
+            document_id=user_id,
+            data=entry
+        )
+
+
+def record_histogram_sample(databases, database_id, response_doc):
+    """Append a cohort histogram sample; Compact Histograms merges it later."""
+    if not response_doc.get("topicID"):
+        return
+    databases.create_document(
+        database_id=database_id,
+        collection_id="histogram_samples",
+        document_id="unique()",
+        data={
+            "topicID": response_doc["topicID"],
+            "thinkingTime": response_doc.get("totalThinkingTime", 0),
+            "xpEarned": response_doc.get("totalXpEarned", 0),
+            "responseId": response_doc.get("$id")
+        }
+    )
+
+
+def rollup_history(databases, database_id, user_id, challenge_id, response_doc):
+    """Fill in completion time and XP on the history entry created when the challenge was served."""
+    if not challenge_id:
+        return
+
+    history = databases.list_documents(
+        database_id=database_id,
+        collection_id="user_challenge_history",
+        queries=[
+            Query.equal("userId", [user_id]),
+            Query.equal("challengeId", [challenge_id]),
+            Query.limit(1)
+        ]
+    )
+    if not history["documents"]:
+        return
+
+    databases.update_document(
+        database_id=database_id,
+        collection_id="user_challenge_history",
+        document_id=history["documents"][0]["$id"],
+        data={
+            "completionTime": response_doc.get("totalThinkingTime", 0),
+            "xpEarned": response_doc.get("totalXpEarned", 0),
+            "responseId": response_doc.get("$id")
+        }
+    )
+
+
+def revisit_interval(previous_interval, reps, xp, thinking_time):
+    """
+    Days until the next revisit. Quality in [0, 1] blends XP and thinking time;
+    the first interval grows with quality, later ones multiply the previous one.
+    """
+    quality = 0.6 * min(xp / REVISIT_XP_REFERENCE, 1.0) + 0.4 * min(thinking_time / REVISIT_TIME_REFERENCE, 1.0)
+    if reps == 0:
+        interval = 1 + 5 * quality
+    else:
+        interval = previous_interval * (1.3 + 1.2 * quality)
+    return max(REVISIT_MIN_INTERVAL_DAYS, min(interval, REVISIT_MAX_INTERVAL_DAYS))
+
+
+def schedule_revisit(databases, database_id, user_id, challenge_id, response_doc):
+    """
+    Upsert the challenge into the user's revisit queue (see revisits.py). The
+    entry records which completion scheduled it, so a redelivered event - or an
+    update event that didn't change completedAt - leaves the queue untouched.
+    Returns True if the queue changed.
+    """
+    completion = f"{response_doc['$id']}@{response_doc['completedAt']}"
+
+    def mutate(heap):
+        previous = next((entry for entry in heap if entry[1] == challenge_id), None)
+        if previous and previous[4:5] == [completion]:
+            return False, False
+        previous_interval, reps = (previous[2], previous[3]) if previous else (0, 0)
+        interval = revisit_interval(
+            previous_interval,
+            reps,
+            response_doc.get("totalXpEarned", 0),
+            response_doc.get("totalThinkingTime", 0)
+        )
+        due = datetime.now(timezone.utc).timestamp() + interval * 86400
+
+        heap[:] = [entry for entry in heap if entry[1] != challenge_id]
+        heap.append([due, challenge_id, round(interval, 2), reps + 1, completion])
+        heapq.heapify(heap)
+        return True, True
+
+    return update_queue(databases, database_id, user_id, mutate)
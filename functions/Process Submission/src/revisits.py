@@ -0,0 +1,64 @@
+"""
+Revisit queue storage, shared by Process Submission and Get Challenge For User
+
+Each user's queue is a binary heap of
+[dueTimestamp, challengeId, intervalDays, reps, completion] stored as JSON on
+one revisit_queues document, where completion identifies the submission that
+scheduled the entry. Both functions read-modify-write that document, so every
+change is made under the user's revisit_queue_locks lease (see leases.py).
+"""
+import json
+from datetime import datetime, timezone
+from appwrite.exception import AppwriteException
+from .leases import lease, LeaseBusy
+
+LOCK_COLLECTION = "revisit_queue_locks"
+
+# Raised when another writer held the user's queue for the whole wait
+QueueBusy = LeaseBusy
+
+
+def update_queue(databases, database_id, user_id, mutate, wait_seconds=5.0):
+    """
+    Apply mutate(heap) -> (changed, result) to the user's queue under the lease,
+    writing the heap back only when it changed. Returns mutate's result.
+    """
+    with lease(databases, database_id, LOCK_COLLECTION, user_id, wait_seconds):
+        try:
+            queue_doc = databases.get_document(
+                database_id=database_id,
+                collection_id="revisit_queues",
+                document_id=user_id
+            )
+            heap = json.loads(queue_doc.get("heap") or "[]")
+        except AppwriteException as e:
+            if getattr(e, "code", None) != 404:
+                raise e
+            queue_doc = None
+            heap = []
+
+        changed, result = mutate(heap)
+        if not changed:
+            return result
+
+        data = {
+            "userId": user_id,
+            "heap": json.dumps(heap, separators=(",", ":")),
+            "updatedAt": datetime.now(timezone.utc).isoformat()
+        }
+        if queue_doc:
+            databases.update_document(
+                database_id=database_id,
+                collection_id="revisit_queues",
+                document_id=user_id,
+                data=data
+            )
+        else:
+            databases.create_document(
+                database_id=database_id,
+                collection_id="revisit_queues",
+                document_id=user_id,
+                data=data,
+                permissions=[f'read("user:{user_id}")']
+            )
+        return result
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timezone
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+
+PAGE_SIZE = 100
+MAX_KEYS_PER_RUN = 5000
+
+
+def main(context):
+    """
+    Purge Idempotency Keys - scheduled cleanup
+    Mutating functions store one idempotency_keys document per client key
+    (see idempotency.py next to their main.py). A key that is retried after it
+    expires is reclaimed in place, but most never are; this job deletes the
+    expired ones so the collection only holds live keys.
+    """
+    try:
+        required_vars = [
+            "APPWRITE_FUNCTION_API_ENDPOINT",
+            "APPWRITE_DATABASE_ID",
+            "APPWRITE_DATABASES_API_KEY"
+        ]
+        missing_vars = [var for var in required_vars if not os.environ.get(var)]
+        if missing_vars:
+            return context.res.json({
+                "success": False,
+                "error": f"Missing required environment variables: {', '.join(missing_vars)}"
+            }, 500)
+
+        # Initialize Appwrite client (APPWRITE_FUNCTION_PROJECT_ID is automatically provided)
+        client = Client()
+        client.set_endpoint(os.environ.get("APPWRITE_FUNCTION_API_ENDPOINT"))
+        client.set_project(os.environ.get("APPWRITE_FUNCTION_PROJECT_ID"))
+        client.set_key(os.environ.get("APPWRITE_DATABASES_API_KEY"))
+
+        databases = Databases(client)
+        database_id = os.environ.get("APPWRITE_DATABASE_ID")
+
+        now = datetime.now(timezone.utc)
+        purged = 0
+
+        # Deleted keys drop out of the filter, so every page is read from the top
+        while purged < MAX_KEYS_PER_RUN:
+            page = databases.list_documents(
+                database_id=database_id,
+                collection_id="idempotency_keys",
+                queries=[Query.less_than("expiresAt", now.isoformat()), Query.limit(PAGE_SIZE)]
+            )
+            for key in page["documents"]:
+                if purge_if_expired(databases, database_id, key["$id"], now):
+                    purged += 1
+            if len(page["documents"]) < PAGE_SIZE:
+                break
+
+        context.log(f"Purged {purged} expired idempotency keys")
+        return context.res.json({"success": True, "data": {"keysPurged": purged}})
+
+    except Exception as err:
+        context.error(f"Error in purge-idempotency-keys: {str(err)}")
+        return context.res.json({"success": False, "error": str(err)}, 500)
+
+
+def purge_if_expired(databases, database_id, key_id, now):
+    """
+    Delete the key only if it is still expired. A retry can reclaim an expired
+    key (delete and recreate it) between our list and delete, so the document is
+    re-read first to avoid deleting a live claim.
+    """
+    try:
+        key = databases.get_document(
+            database_id=database_id,
+            collection_id="idempotency_keys",
+            document_id=key_id
+        )
+        if datetime.fromisoformat(key["expiresAt"].replace("Z", "+00:00")) > now:
+            return False
+        databases.delete_document(
+            database_id=database_id,
+            collection_id="idempotency_keys",
+            document_id=key_id
+        )
+        return True
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:  # 404: released or purged in the meantime
+            raise e
+        return False
@@ -1,11 +1,18 @@
 import os
 import json
 import uuid
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from appwrite.client import Client
 from appwrite.services.databases import Databases
 from appwrite.query import Query
 from appwrite.exception import AppwriteException
+from .resilience import Resilient, CircuitOpenError, DeadlineExceeded, MAX_CALLS_IN_FLIGHT
+from .quality import quality_bonus as score_quality_bonus
+from .idempotency import idempotent
+from .catalog import get_challenge_document
+from .trace import capture_trace
 
 # Gamification Configuration
 XP_PER_QUESTION = 5
@@ -16,6 +23,117 @@ XP_LENGTH_BONUS_THRESHOLD = 200  # chars per response on average
 XP_LENGTH_BONUS = 3
 XP_PER_LEVEL = 100
 
+# Independent backend reads within one invocation run on this pool. Each task
+# only waits on a resilience call slot, so the pool is sized from those slots:
+# half of them, leaving the rest for the invocation's own sequential calls
+_pool = ThreadPoolExecutor(max_workers=MAX_CALLS_IN_FLIGHT // 2, thread_name_prefix="fan-out")
+
+# When enabled, only the response is written here; user stats, streak, leaderboard
+# and history rollups are applied by the "Process Submission" event worker.
+ASYNC_POST_PROCESSING = os.environ.get("SUBMIT_CHALLENGE_ASYNC", "").lower() in ("1", "true", "yes")
+
+def response_document_id(user_id, challenge_id):
+    """Deterministic response id so a resubmission collides instead of duplicating."""
+    return hashlib.sha256(f"{user_id}:{challenge_id}".encode("utf-8")).hexdigest()[:32]
+
+
+def record_histogram_sample(context, calls, databases, database_id, response_doc):
+    """Append one cohort histogram sample for a first-time submission."""
+    if not response_doc.get("topicID"):
+        return
+    try:
+        calls.write("create histogram sample", lambda: databases.create_document(
+            database_id=database_id,
+            collection_id="histogram_samples",
+            document_id="unique()",
+            data={
+                "topicID": response_doc["topicID"],
+                "thinkingTime": response_doc.get("totalThinkingTime", 0),
+                "xpEarned": response_doc.get("totalXpEarned", 0),
+                "responseId": response_doc["$id"]
+            }
+        ))
+    except (AppwriteException, DeadlineExceeded, CircuitOpenError) as e:
+        # Cohort stats are approximate - never fail a submission over them
+        context.error(f"Failed to record histogram sample: {str(e)}")
+
+
+def submit_async(context, calls, databases, database_id, user_id, challenge_id, response_data, existing_future, summary):
+    """
+    Single durable write path: store the response and return the computed XP.
+
+    The document create fires a responses create event, which the Process Submission
+    worker consumes to apply stats. A resubmission collides on the deterministic id and
+    is written as an update marked postProcessing "revisit", so the worker reschedules
+    the revisit without re-awarding XP.
+    Responses written by the synchronous path have random ids, so the userID/challengeID
+    lookup still runs first and an existing document is updated in place.
+    """
+    doc_id = response_document_id(user_id, challenge_id)
+    is_retry = False
+
+    try:
+        existing = existing_future.result()["documents"]
+    except AppwriteException as e:
+        context.log(f"Query for existing response failed: {str(e)}")
+        existing = []
+
+    if existing and existing[0]["$id"] != doc_id:
+        response_doc = calls.write("update response", lambda: databases.update_document(
+            database_id=database_id,
+            collection_id="responses",
+            document_id=existing[0]["$id"],
+            data={**response_data, "postProcessing": "revisit"}
+        ))
+        context.log(f"Updated existing response document: {response_doc['$id']}")
+        return async_result(context, response_doc, response_data, summary, is_retry=True)
+
+    try:
+        response_doc = calls.write("create response", lambda: databases.create_document(
+            database_id=database_id,
+            collection_id="responses",
+            document_id=doc_id,
+            data={**response_data, "postProcessing": "pending"},
+            permissions=[
+                f'read("user:{user_id}")',
+                f'update("user:{user_id}")',
+                f'delete("user:{user_id}")'
+            ]
+        ))
+        context.log(f"Created response document {doc_id}, stats deferred to worker")
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 409:
+            context.error(f"Failed to create document with ID {doc_id}: {str(e)}")
+            raise e
+        is_retry = True
+        response_doc = calls.write("update response", lambda: databases.update_document(
+            database_id=database_id,
+            collection_id="responses",
+            document_id=doc_id,
+            data={**response_data, "postProcessing": "revisit"}
+        ))
+        context.log(f"Updated existing response document: {doc_id}")
+
+    return async_result(context, response_doc, response_data, summary, is_retry)
+
+
+def async_result(context, response_doc, response_data, summary, is_retry):
+    return context.res.json({
+        "success": True,
+        "data": {
+            "responseId": response_doc["$id"],
+            "isRetry": is_retry,
+            "questionsAnswered": summary["questionsAnswered"],
+            "totalQuestions": summary["totalQuestions"],
+            "totalXpEarned": response_data["totalXpEarned"] if not is_retry else 0,
+            "xpBreakdown": summary["xpBreakdown"],
+            # Level and streak are updated by the worker after this call returns (or,
+            # for a resubmission, left as they were), so neither is reported here
+            "statsPending": not is_retry,
+            "message": "Challenge completed! Great thinking! 🧠✨" if not is_retry else "Challenge responses updated!"
+        }
+    })
+
 
 def main(context):
     """
@@ -55,6 +173,11 @@ def main(context):
         "completedAt": "2025-11-29T12:00:00Z"
     }
     """
+    capture_trace(context, "submit-challenge")
+    return idempotent(context, "submit-challenge", handle_request)
+
+
+def handle_request(context):
     try:
         # Validate environment variables
         required_env = [
@@ -80,6 +203,9 @@ def main(context):
         databases = Databases(client)
         database_id = os.environ["APPWRITE_DATABASE_ID"]
 
+        # Deadlines, read retries and circuit breaker within the 15s function timeout
+        calls = Resilient(context, budget_seconds=12)
+
         # Parse request body
         try:
             data = json.loads(context.req.body) if context.req.body else {}
@@ -109,14 +235,33 @@ def main(context):
 
         context.log(f"Processing challenge submission - User: {user_id}, Challenge: {challenge_id}, Responses: {len(responses)}")
 
-        # Get challenge to validate
-        try:
-            challenge = databases.get_document(
+        # The challenge fetch and the existing-response lookup are independent - run them together
+        challenge_future = _pool.submit(
+            calls.read,
+            "get challenge",
+            lambda: get_challenge_document(databases, database_id, challenge_id),
+            cache_key=f"challenge:{challenge_id}"
+        )
+        existing_future = _pool.submit(
+            calls.read,
+            "find existing response",
+            lambda: databases.list_documents(
                 database_id=database_id,
-                collection_id="challenges",
-                document_id=challenge_id
+                collection_id="responses",
+                queries=[
+                    Query.equal("userID", [user_id]),
+                    Query.equal("challengeID", [challenge_id]),
+                    Query.limit(1)
+                ]
             )
+        )
+
+        # Get challenge to validate
+        try:
+            challenge = challenge_future.result()
         except AppwriteException as e:
+            if getattr(e, "code", None) != 404:
+                raise e
             context.error(f"Challenge not found: {str(e)}")
             return context.res.json({
                 "success": False,
@@ -158,7 +303,12 @@ def main(context):
             length_bonus = XP_LENGTH_BONUS
             context.log(f"Length bonus: +{length_bonus} XP (avg {avg_response_length:.0f} chars)")
 
-        total_xp = base_xp + completion_bonus + time_bonus + length_bonus
+        # Thinking quality bonus (lexical diversity, question engagement, reasoning markers)
+        quality_bonus = score_quality_bonus(question_texts, response_texts)
+        if quality_bonus:
+            context.log(f"Quality bonus: +{quality_bonus} XP")
+
+        total_xp = base_xp + completion_bonus + time_bonus + length_bonus + quality_bonus
         context.log(f"Total XP earned: {total_xp}")
 
         context.log(f"=== SUBMISSION DEBUG ===")
@@ -169,28 +319,36 @@ def main(context):
         response_data = {
             "userID": user_id,
             "challengeID": challenge_id,
+            "topicID": challenge.get("topicID", ""),
             "responses": response_texts,
             "questions": question_texts,
+            "totalQuestions": total_questions,
             "thinkingTimes": thinking_times,
             "totalThinkingTime": total_thinking_time,
             "totalXpEarned": total_xp,
+            "thinkingQualityBonus": quality_bonus,
             "completedAt": datetime.now(timezone.utc).isoformat()
         }
 
+        if ASYNC_POST_PROCESSING:
+            return submit_async(context, calls, databases, database_id, user_id, challenge_id, response_data, existing_future, {
+                "questionsAnswered": len(responses),
+                "totalQuestions": total_questions,
+                "xpBreakdown": {
+                    "base": base_xp,
+                    "completion": completion_bonus,
+                    "time": time_bonus,
+                    "length": length_bonus,
+                    "quality": quality_bonus
+                }
+            })
+
         # Check if user already submitted this challenge by querying
         is_retry = False
         existing_doc = None
         
         try:
-            existing_response = databases.list_documents(
-                database_id=database_id,
-                collection_id="responses",
-                queries=[
-                    Query.equal("userID", [user_id]),
-                    Query.equal("challengeID", [challenge_id]),
-                    Query.limit(1)
-                ]
-            )
+            existing_response = existing_future.result()
             
             if existing_response["documents"] and len(existing_response["documents"]) > 0:
                 existing_doc = existing_response["documents"][0]
@@ -203,12 +361,12 @@ def main(context):
         if is_retry and existing_doc:
             # Update existing document
             try:
-                response_doc = databases.update_document(
+                response_doc = calls.write("update response", lambda: databases.update_document(
                     database_id=database_id,
                     collection_id="responses",
                     document_id=existing_doc["$id"],
-                    data=response_data
-                )
+                    data={**response_data, "postProcessing": "revisit"}
+                ))
                 context.log(f"Updated existing response document: {response_doc['$id']}")
             except AppwriteException as update_err:
                 context.error(f"Failed to update document: {str(update_err)}")
@@ -219,7 +377,9 @@ def main(context):
             context.log(f"Attempting to create document with ID: {unique_doc_id}")
             
             try:
-                response_doc = databases.create_document(
+                # No deadline: an abandoned create can still land, and the client's retry would
+                # then find it and skip the XP award. Waiting keeps the outcome known.
+                response_doc = calls.write("create response", lambda: databases.create_document(
                     database_id=database_id,
                     collection_id="responses",
                     document_id=unique_doc_id,
@@ -229,7 +389,7 @@ def main(context):
                         f'update("user:{user_id}")',
                         f'delete("user:{user_id}")'
                     ]
-                )
+                ), deadline=False)
                 context.log(f"Created new response document: {response_doc['$id']}")
             except AppwriteException as create_err:
                 context.error(f"Failed to create document with ID {unique_doc_id}: {str(create_err)}")
@@ -237,13 +397,18 @@ def main(context):
                 context.error(f"response_data keys: {list(response_data.keys())}")
                 raise create_err
 
+        # Feed the cohort histograms (merged by Compact Histograms)
+        if not is_retry:
+            record_histogram_sample(context, calls, databases, database_id, response_doc)
+
         # Update user stats (only add XP if not a retry, or add difference)
         try:
-            user = databases.get_document(
+            # No cache fallback: a stale user document would lose XP on write-back
+            user = calls.read("get user", lambda: databases.get_document(
                 database_id=database_id,
                 collection_id="users",
                 document_id=user_id
-            )
+            ))
 
             current_xp = user.get("xp", 0)
             current_level = user.get("level", 1)
@@ -265,7 +430,7 @@ def main(context):
             new_level = (new_xp // XP_PER_LEVEL) + 1
             leveled_up = new_level > current_level
 
-            databases.update_document(
+            calls.write("update user", lambda: databases.update_document(
                 database_id=database_id,
                 collection_id="users",
                 document_id=user_id,
@@ -276,14 +441,16 @@ def main(context):
                     "completedChallenges": new_completed,
                     "lastActiveDate": datetime.now(timezone.utc).isoformat()
                 }
-            )
+            ))
 
             context.log(f"User updated - XP: {new_xp}, Level: {new_level}, Streak: {new_streak}")
 
-        except AppwriteException as e:
+        except (AppwriteException, DeadlineExceeded, CircuitOpenError) as e:
             context.error(f"Failed to update user stats: {str(e)}")
             # Don't fail the whole request if user update fails
 
+        calls.log_summary()
+
         return context.res.json({
             "success": True,
             "data": {
@@ -296,7 +463,8 @@ def main(context):
                     "base": base_xp,
                     "completion": completion_bonus,
                     "time": time_bonus,
-                    "length": length_bonus
+                    "length": length_bonus,
+                    "quality": quality_bonus
                 },
                 "level": new_level if 'new_level' in dir() else current_level,
                 "leveledUp": leveled_up if 'leveled_up' in dir() else False,
@@ -305,6 +473,20 @@ def main(context):
             }
         })
 
+    except CircuitOpenError as err:
+        context.error(f"Backend degraded: {str(err)}")
+        return context.res.json({
+            "success": False,
+            "error": "Service temporarily unavailable, please try again shortly"
+        }, 503)
+
+    except DeadlineExceeded as err:
+        context.error(f"Backend timeout: {str(err)}")
+        return context.res.json({
+            "success": False,
+            "error": "Database request timed out"
+        }, 504)
+
     except AppwriteException as err:
         context.error(f"Appwrite error: {str(err)}")
         return context.res.json({
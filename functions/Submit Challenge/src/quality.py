@@ -0,0 +1,90 @@
+"""
+Response quality scoring
+
+CPU-only heuristics for how much thinking a written answer shows. Three
+features, each normalized to [0, 1]:
+
+- lexical diversity: root type-token ratio (distinct words / sqrt(words)),
+  which unlike a plain ratio doesn't punish longer answers
+- question engagement: share of the question's content words the answer uses
+- reasoning markers: connectives such as "because", "however", "therefore"
+
+Only the first MAX_SCORED_CHARS of an answer and the first MAX_SCORED_ANSWERS
+answers are scored, so an oversized submission can't make scoring expensive.
+
+This module has no Appwrite imports so scripts/backfill_quality.py can load it
+and score historical responses with exactly the same definitions.
+"""
+import re
+
+WORD_PATTERN = re.compile(r"[a-z][a-z']*")
+
+REASONING_MARKERS = frozenset({
+    "because", "therefore", "thus", "hence", "so", "since", "however", "although",
+    "though", "but", "whereas", "unless", "if", "then", "consequently", "instead",
+    "otherwise", "assume", "assuming", "suppose", "evidence", "implies", "means",
+    "perhaps", "might", "could", "alternatively", "conversely", "why"
+})
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "is", "are",
+    "was", "were", "be", "it", "this", "that", "you", "your", "what", "how", "do",
+    "does", "would", "can", "at", "by", "as", "from", "about", "there", "their"
+})
+
+# Normalization references: the feature value treated as "full marks"
+DIVERSITY_REFERENCE = 7.0
+REASONING_REFERENCE = 3
+MIN_WORDS = 5
+
+# Scoring input caps; answers are stored up to 10000 characters
+MAX_SCORED_CHARS = 10000
+MAX_SCORED_ANSWERS = 20
+
+FEATURE_WEIGHTS = (0.35, 0.35, 0.30)  # diversity, engagement, reasoning
+MAX_QUALITY_BONUS = 5  # XP
+
+
+def tokenize(text):
+    return WORD_PATTERN.findall((text or "")[:MAX_SCORED_CHARS].lower())
+
+
+def raw_features(question, response):
+    """
+    Unnormalized counts for one answer:
+    (words, distinct words, question content words, content words echoed, reasoning markers)
+    """
+    tokens = tokenize(response)
+    distinct = set(tokens)
+    question_words = {w for w in tokenize(question) if w not in STOPWORDS}
+    return (
+        len(tokens),
+        len(distinct),
+        len(question_words),
+        len(question_words & distinct),
+        sum(1 for t in tokens if t in REASONING_MARKERS)
+    )
+
+
+def score_response(question, response):
+    """Quality score in [0, 1] for one answer."""
+    words, distinct, question_words, echoed, markers = raw_features(question, response)
+    if words < MIN_WORDS:
+        return 0.0
+    diversity = min(distinct / (words ** 0.5) / DIVERSITY_REFERENCE, 1.0)
+    engagement = echoed / question_words if question_words else 0.0
+    reasoning = min(markers / REASONING_REFERENCE, 1.0)
+    w_diversity, w_engagement, w_reasoning = FEATURE_WEIGHTS
+    return w_diversity * diversity + w_engagement * engagement + w_reasoning * reasoning
+
+
+def quality_bonus(questions, responses):
+    """XP bonus (0..MAX_QUALITY_BONUS) from the mean score over all answers."""
+    responses = responses[:MAX_SCORED_ANSWERS]
+    if not responses:
+        return 0
+    scores = [
+        score_response(questions[i] if i < len(questions) else "", response)
+        for i, response in enumerate(responses)
+    ]
+    return int(round(sum(scores) / len(scores) * MAX_QUALITY_BONUS))
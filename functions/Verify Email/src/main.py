@@ -3,12 +3,20 @@ import json
 from appwrite.client import Client
 from appwrite.services.account import Account
 from appwrite.services.databases import Databases
+from .idempotency import idempotent
+from .trace import capture_trace
+
 
 def main(context):
     """
     Verify Email - MVP Version
     Verifies user email with token
     """
+    capture_trace(context, "verify-email")
+    return idempotent(context, "verify-email", handle_request)
+
+
+def handle_request(context):
     try:
         # Validate required environment variables
         required_vars = [
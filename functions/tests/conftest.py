@@ -0,0 +1,47 @@
+import importlib
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import replay_traces  # noqa: E402
+
+# Functions import the Appwrite SDK at module level; tests run against the replay fakes
+replay_traces.install_fakes(replay_traces.FakeBackend(latency_ms=0, challenges=0), llm_latency_ms=0)
+
+
+def load_function_module(function_name, module="main"):
+    """Import functions/<name>/src/<module>.py as a package so relative imports resolve."""
+    package = "test_fn_" + "".join(c if c.isalnum() else "_" for c in function_name.lower())
+    if package not in sys.modules:
+        stub = types.ModuleType(package)
+        stub.__path__ = [str(ROOT / "functions" / function_name / "src")]
+        sys.modules[package] = stub
+    return importlib.import_module(f"{package}.{module}")
+
+
+@pytest.fixture
+def function_module():
+    return load_function_module
+
+
+class RecordingContext(replay_traces.ReplayContext):
+    def __init__(self, body=""):
+        super().__init__(body)
+        self.logs = []
+        self.errors = []
+
+    def log(self, message):
+        self.logs.append(message)
+
+    def error(self, message):
+        self.errors.append(message)
+
+
+@pytest.fixture
+def make_context():
+    return RecordingContext
@@ -0,0 +1,76 @@
+import pytest
+
+import replay_traces
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=0, challenges=3)
+
+
+@pytest.fixture
+def trends(function_module, backend, monkeypatch):
+    module = function_module("Aggregate Trends")
+    monkeypatch.setattr(module, "Databases", replay_traces.make_databases(backend))
+    return module
+
+
+def add_response(backend, response_id, created_at, challenge_id="challenge00000", answers=3, **fields):
+    doc = backend.put("responses", response_id, {
+        "userID": "u1",
+        "challengeID": challenge_id,
+        "topicID": "topic0",
+        "responses": ["answer"] * answers,
+        "totalXpEarned": 10,
+        **fields
+    })
+    doc["$createdAt"] = created_at
+
+
+def test_completion_uses_challenge_question_count_when_response_lacks_it(trends, backend, make_context):
+    add_response(backend, "full", "2026-10-01T10:00:00.000+00:00", totalQuestions=3)
+    add_response(backend, "legacy-full", "2026-10-01T10:00:01.000+00:00")
+    add_response(backend, "legacy-partial", "2026-10-01T10:00:02.000+00:00", answers=1)
+    add_response(backend, "orphan", "2026-10-01T10:00:03.000+00:00", challenge_id="deleted")
+
+    status, body = trends.main(make_context())
+
+    assert status == 200
+    assert body["data"]["responsesSkipped"] == 1
+    stats = backend.collections["challenge_stats"]["challenge00000"]
+    assert (stats["attempts"], stats["completions"]) == (3, 2)
+    assert stats["completionRate"] == round(2 / 3, 4)
+    assert "deleted" not in backend.collections["challenge_stats"]
+
+
+def test_watermark_counts_each_response_once_across_runs(trends, backend, make_context):
+    add_response(backend, "r1", "2026-10-01T10:00:00.000+00:00", totalQuestions=3)
+    trends.main(make_context())
+    add_response(backend, "r2", "2026-10-02T10:00:00.000+00:00", totalQuestions=3)
+    trends.main(make_context())
+    trends.main(make_context())
+
+    assert backend.collections["challenge_stats"]["challenge00000"]["attempts"] == 2
+    assert backend.collections["topic_stats"]["topic0"]["attempts"] == 2
+
+
+def test_tied_timestamps_are_paged_without_loss_or_repeats(trends, backend, monkeypatch):
+    monkeypatch.setattr(trends, "PAGE_SIZE", 4)
+    monkeypatch.setattr(trends, "MAX_DOCUMENTS_PER_RUN", 6)
+    databases = replay_traces.make_databases(backend)(None)
+    # 10 responses share one timestamp, straddling page and run boundaries
+    for i in range(10):
+        add_response(backend, f"tie{i:02d}", "2026-10-01T10:00:00.000+00:00")
+    for i in range(5):
+        add_response(backend, f"later{i:02d}", f"2026-10-01T11:00:0{i}.000+00:00")
+
+    seen = []
+    for _ in range(10):
+        documents, mark = trends.collect_since(databases, "synapse", "responses")
+        if not documents:
+            break
+        seen.extend(d["$id"] for d in documents)
+        trends.save_watermark(databases, "synapse", "responses", mark)
+
+    assert sorted(seen) == sorted(backend.collections["responses"])
+    assert len(seen) == len(set(seen))
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+import build_catalog_snapshot
+import replay_traces
+
+FUNCTIONS = build_catalog_snapshot.SNAPSHOT_FUNCTIONS
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=0, topics=2, challenges=4)
+
+
+@pytest.fixture
+def databases(backend):
+    return replay_traces.make_databases(backend)(None)
+
+
+@pytest.fixture(params=FUNCTIONS)
+def catalog(request, function_module, monkeypatch, tmp_path):
+    module = function_module(request.param, "catalog")
+    monkeypatch.setattr(module, "CATALOG_SNAPSHOT_PATH", str(tmp_path / "catalog.sqlite"))
+    monkeypatch.setattr(module, "_catalog", None)
+    yield module
+    if module._catalog is not None:
+        module._catalog.close()
+
+
+def bundle(catalog, challenges):
+    build_catalog_snapshot.build_snapshot(challenges, Path(catalog.CATALOG_SNAPSHOT_PATH))
+
+
+def test_snapshot_serves_known_ids_without_a_backend_call(catalog, backend, databases):
+    bundle(catalog, backend.collections["challenges"].values())
+    calls = backend.calls
+
+    challenge = catalog.get_challenge_document(databases, "synapse", "challenge00001")
+
+    assert challenge["title"] == "Challenge 1"
+    assert backend.calls == calls
+
+
+def test_id_missing_from_snapshot_falls_back_to_live_read(catalog, backend, databases):
+    bundle(catalog, [backend.collections["challenges"]["challenge00000"]])
+    backend.put("challenges", "added-after-build", {"title": "Fresh", "topicID": "topic0", "difficulty": 1})
+    calls = backend.calls
+
+    challenge = catalog.get_challenge_document(databases, "synapse", "added-after-build")
+
+    assert challenge["title"] == "Fresh"
+    assert backend.calls == calls + 1
+
+
+def test_unknown_id_still_raises_not_found(catalog, backend, databases):
+    bundle(catalog, backend.collections["challenges"].values())
+
+    with pytest.raises(replay_traces.FakeAppwriteException) as error:
+        catalog.get_challenge_document(databases, "synapse", "nope")
+    assert error.value.code == 404
+
+
+def test_without_a_snapshot_every_read_is_live(catalog, backend, databases):
+    assert catalog.snapshot_challenges() is None
+    assert catalog.get_challenge_document(databases, "synapse", "challenge00002")["title"] == "Challenge 2"
+    assert backend.calls == 1
+
+
+def test_snapshot_listing_filters_and_pages(catalog, backend):
+    bundle(catalog, backend.collections["challenges"].values())
+
+    page = catalog.snapshot_challenges(topic_ids=["topic0"], after="challenge00000", limit=5)
+
+    assert [c["$id"] for c in page] == ["challenge00002"]
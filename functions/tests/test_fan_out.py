@@ -0,0 +1,71 @@
+import json
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import replay_traces
+
+LATENCY_MS = 40
+
+
+class SerialPool:
+    """Drop-in for a function's _pool that runs each task inline, i.e. no fan-out."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@pytest.fixture(autouse=True)
+def fixed_latency(monkeypatch):
+    # Every fake backend call takes exactly LATENCY_MS, so timings compare call counts on the critical path
+    monkeypatch.setattr(replay_traces.random, "uniform", lambda low, high: 1.0)
+
+
+def timed(module, monkeypatch, make_context, body, backend, serial):
+    with monkeypatch.context() as patch:
+        patch.setattr(module, "Databases", replay_traces.make_databases(backend))
+        if serial:
+            patch.setattr(module, "_pool", SerialPool())
+        started = time.monotonic()
+        status, _ = module.main(make_context(json.dumps(body)))
+        elapsed = time.monotonic() - started
+    assert status == 200
+    return elapsed
+
+
+def compare(function_name, function_module, make_context, monkeypatch, body):
+    """Best of two runs each way, with a fresh backend per run so caches and writes don't carry over."""
+    module = function_module(function_name)
+    timings = {}
+    for serial in (True, False):
+        timings[serial] = min(
+            timed(module, monkeypatch, make_context, body,
+                  replay_traces.FakeBackend(latency_ms=LATENCY_MS, challenges=5), serial)
+            for _ in range(2)
+        )
+    return timings[True], timings[False]
+
+
+def test_submit_challenge_fans_out_challenge_and_existing_response_reads(function_module, make_context, monkeypatch):
+    body = {
+        "userId": "u1",
+        "challengeId": "challenge00000",
+        "totalThinkingTime": 60,
+        "responses": [{"questionText": "Why?", "responseText": "Because", "thinkingTime": 20}]
+    }
+    serial, fanned_out = compare("Submit Challenge", function_module, make_context, monkeypatch, body)
+    # One backend round trip comes off the critical path
+    assert serial - fanned_out > 0.75 * LATENCY_MS / 1000
+
+
+def test_get_challenge_for_user_fans_out_profile_history_and_catalog(function_module, make_context, monkeypatch):
+    body = {"userId": "u1", "mode": "recommended"}
+    serial, fanned_out = compare("Get Challenge For User", function_module, make_context, monkeypatch, body)
+    # Profile, history and catalog reads overlap: two round trips come off the critical path
+    assert serial - fanned_out > 1.5 * LATENCY_MS / 1000
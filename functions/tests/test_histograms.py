@@ -0,0 +1,114 @@
+import pytest
+
+import replay_traces
+
+
+class Interrupted(Exception):
+    """Stands in for the runtime killing the execution at its timeout."""
+
+
+@pytest.fixture
+def backend():
+    backend = replay_traces.FakeBackend(latency_ms=0, challenges=0)
+    for i in range(30):
+        backend.put("histogram_samples", f"sample{i:03d}", {
+            "topicID": f"topic{i % 3}",
+            "thinkingTime": 10 * i,
+            "xpEarned": i
+        })
+    return backend
+
+
+def install(module, backend, monkeypatch, fail_after=None, fail_on=None):
+    """Point the function at backend, optionally cutting the run off after N calls of one kind."""
+    calls = {"count": 0}
+
+    class Databases(replay_traces.make_databases(backend)):
+        def _maybe_fail(self, method, collection_id):
+            if (method, collection_id) == fail_on:
+                calls["count"] += 1
+                if calls["count"] > fail_after:
+                    raise Interrupted(f"{method} {collection_id}")
+
+        def update_document(self, database_id, collection_id, document_id, data=None, permissions=None):
+            self._maybe_fail("write", collection_id)
+            return super().update_document(database_id, collection_id, document_id, data, permissions)
+
+        def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+            self._maybe_fail("write", collection_id)
+            return super().create_document(database_id, collection_id, document_id, data, permissions)
+
+        def delete_document(self, database_id, collection_id, document_id):
+            self._maybe_fail("delete", collection_id)
+            return super().delete_document(database_id, collection_id, document_id)
+
+    monkeypatch.setattr(module, "Databases", Databases)
+
+
+def totals(backend):
+    return {
+        (doc["topicID"], doc["metric"]): doc["total"]
+        for doc in backend.collections.get("cohort_histograms", {}).values()
+    }
+
+
+EXPECTED = {(f"topic{t}", metric): 10 for t in range(3) for metric in ("thinkingTime", "xp")}
+
+
+def test_bucket_index_edges(function_module):
+    compact = function_module("Compact Histograms")
+    edges = [0, 30, 60]
+    assert compact.bucket_index(edges, -5) == 0
+    assert compact.bucket_index(edges, 29.9) == 0
+    assert compact.bucket_index(edges, 30) == 1
+    assert compact.bucket_index(edges, 10_000) == 2
+    assert compact.cumulative([1, 0, 2]) == [1, 1, 3]
+
+
+def test_histogram_percentile(function_module):
+    analytics = function_module("Get User Analytics")
+    histogram = {"edges": [0, 10, 20], "counts": [2, 2, 4], "cumulative": [2, 4, 8], "total": 8}
+
+    assert analytics.histogram_percentile(histogram, 0) == 0
+    assert analytics.histogram_percentile(histogram, 5) == 12.5  # half of bucket 0
+    assert analytics.histogram_percentile(histogram, 10) == 25
+    assert analytics.histogram_percentile(histogram, 500) == 75  # open bucket counts half
+    assert analytics.histogram_percentile({**histogram, "total": 0}, 5) is None
+    assert analytics.histogram_percentile({**histogram, "cumulative": [2]}, 5) is None
+
+
+def test_compaction_merges_and_deletes_samples(function_module, make_context, backend, monkeypatch):
+    compact = function_module("Compact Histograms")
+    install(compact, backend, monkeypatch)
+
+    status, body = compact.main(make_context())
+    assert status == 200
+    assert body["data"]["samplesMerged"] == 30
+    assert totals(backend) == EXPECTED
+    assert not backend.collections["histogram_samples"]
+    assert not backend.collections["histogram_compactions"]
+
+    status, body = compact.main(make_context())
+    assert body["data"]["samplesMerged"] == 0
+    assert totals(backend) == EXPECTED
+
+
+@pytest.mark.parametrize("fail_on, fail_after", [
+    (("write", "cohort_histograms"), 2),  # cut off between histogram writes
+    (("delete", "histogram_samples"), 12),  # cut off while deleting merged samples
+])
+def test_interrupted_run_is_finished_without_double_counting(function_module, make_context, backend, monkeypatch,
+                                                             fail_on, fail_after):
+    compact = function_module("Compact Histograms")
+    install(compact, backend, monkeypatch, fail_after=fail_after, fail_on=fail_on)
+    status, _ = compact.main(make_context())
+    assert status == 500
+    assert backend.collections["histogram_compactions"]
+
+    install(compact, backend, monkeypatch)
+    status, body = compact.main(make_context())
+
+    assert status == 200
+    assert body["data"]["samplesResumed"] == 30
+    assert totals(backend) == EXPECTED
+    assert not backend.collections["histogram_samples"]
@@ -0,0 +1,104 @@
+import importlib.util
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+import replay_traces
+
+IDEMPOTENCY_PY = Path(__file__).resolve().parent.parent / "Submit Challenge" / "src" / "idempotency.py"
+
+
+def load_runtime(name, databases):
+    """A separate copy of idempotency.py, standing in for one warm function runtime."""
+    spec = importlib.util.spec_from_file_location(f"idempotency_runtime_{name}", IDEMPOTENCY_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module._databases = databases
+    module.PENDING_POLL_SECONDS = 0.01
+    return module
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=2, challenges=0)
+
+
+@pytest.fixture
+def runtimes(backend):
+    databases = replay_traces.make_databases(backend)(None)
+    return [load_runtime(name, databases) for name in ("a", "b")]
+
+
+class CountingHandler:
+    def __init__(self, status_code=200, delay=0.05):
+        self.status_code = status_code
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, context):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        threading.Event().wait(self.delay)
+        return context.res.json({"success": self.status_code < 500, "call": call}, self.status_code)
+
+
+def request(key, **fields):
+    return replay_traces.ReplayContext(json.dumps({"userId": "u1", "idempotencyKey": key, **fields}))
+
+
+def test_concurrent_duplicates_run_the_handler_once(runtimes, backend):
+    handler = CountingHandler()
+    results = []
+    barrier = threading.Barrier(16)
+
+    def deliver(runtime):
+        barrier.wait()
+        results.append(runtime.idempotent(request("key-1", challengeId="c1"), "submit-challenge", handler))
+
+    threads = [threading.Thread(target=deliver, args=(runtimes[i % 2],)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert handler.calls == 1
+    assert len(results) == 16
+    assert all(result == (200, {"success": True, "call": 1}) for result in results)
+    assert backend.collections["idempotency_keys"]
+    assert all(doc["status"] == "done" for doc in backend.collections["idempotency_keys"].values())
+
+
+def test_reused_key_with_different_request_is_rejected(runtimes):
+    handler = CountingHandler(delay=0)
+    runtime_a, runtime_b = runtimes
+
+    assert runtime_a.idempotent(request("key-1", challengeId="c1"), "submit-challenge", handler)[0] == 200
+    # Same runtime answers from memory, the other one from the persistent claim
+    assert runtime_a.idempotent(request("key-1", challengeId="c2"), "submit-challenge", handler)[0] == 422
+    assert runtime_b.idempotent(request("key-1", challengeId="c2"), "submit-challenge", handler)[0] == 422
+    assert handler.calls == 1
+
+
+def test_server_error_releases_the_key_for_a_retry(runtimes, backend):
+    failing = CountingHandler(status_code=503, delay=0)
+    runtime_a, runtime_b = runtimes
+
+    assert runtime_a.idempotent(request("key-1"), "submit-challenge", failing)[0] == 503
+    assert not backend.collections.get("idempotency_keys")
+
+    succeeding = CountingHandler(delay=0)
+    assert runtime_b.idempotent(request("key-1"), "submit-challenge", succeeding)[0] == 200
+    assert succeeding.calls == 1
+
+
+def test_requests_without_a_key_always_run(runtimes):
+    handler = CountingHandler(delay=0)
+    context = replay_traces.ReplayContext(json.dumps({"userId": "u1"}))
+
+    for _ in range(3):
+        runtimes[0].idempotent(context, "submit-challenge", handler)
+    assert handler.calls == 3
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+import replay_traces
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=0, topics=2, challenges=7)
+
+
+@pytest.fixture
+def list_page(function_module, make_context, monkeypatch, backend):
+    module = function_module("Get Challenge For User")
+    monkeypatch.setattr(module, "Databases", replay_traces.make_databases(backend))
+    # Exercise the Appwrite path; the snapshot path is covered in test_catalog.py
+    monkeypatch.setattr(module, "snapshot_challenges", lambda **filters: None)
+
+    def call(**body):
+        status, payload = module.main(make_context(json.dumps({"mode": "list", **body})))
+        return status, payload
+
+    call.module = module
+    return call
+
+
+def test_page_token_round_trips(list_page):
+    module = list_page.module
+    assert module.decode_page_token(module.encode_page_token("challenge00003")) == "challenge00003"
+
+
+def test_pages_cover_every_challenge_once(list_page):
+    seen = []
+    token = None
+    while True:
+        status, payload = list_page(pageSize=3, **({"pageToken": token} if token else {}))
+        assert status == 200
+        seen.extend(item["id"] for item in payload["data"]["items"])
+        token = payload["data"]["nextPageToken"]
+        if token is None:
+            break
+
+    assert seen == [f"challenge{i:05d}" for i in range(7)]
+
+
+def test_page_size_is_capped(list_page, backend):
+    module = list_page.module
+    for i in range(7, module.LIST_MAX_PAGE_SIZE + 10):
+        backend.put("challenges", f"challenge{i:05d}", {"title": f"Challenge {i}", "topicID": "topic0"})
+
+    status, payload = list_page(pageSize=10_000)
+
+    assert status == 200
+    assert len(payload["data"]["items"]) == module.LIST_MAX_PAGE_SIZE
+    assert payload["data"]["nextPageToken"] is not None
+
+
+def test_filters_apply_across_pages(list_page):
+    status, payload = list_page(pageSize=2, topicFilter="topic1")
+    status, rest = list_page(pageSize=2, topicFilter="topic1", pageToken=payload["data"]["nextPageToken"])
+
+    ids = [item["id"] for item in payload["data"]["items"] + rest["data"]["items"]]
+    assert ids == ["challenge00001", "challenge00003", "challenge00005"]
+    assert rest["data"]["nextPageToken"] is None
+
+
+@pytest.mark.parametrize("token", ["not-base64!", "e30", "eyJhZnRlciI6IDF9"])
+def test_bad_page_token_is_rejected(list_page, token):
+    status, payload = list_page(pageToken=token)
+
+    assert status == 400
+    assert payload == {"success": False, "error": "Invalid pageToken"}
+
+
+def test_bad_page_size_is_rejected(list_page):
+    status, _ = list_page(pageSize="many")
+    assert status == 400
@@ -0,0 +1,133 @@
+import json
+import types
+
+import pytest
+
+import replay_traces
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def backend():
+    backend = replay_traces.FakeBackend(latency_ms=0, challenges=0)
+    backend.sessions["session-u1"] = "u1"
+    return backend
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def oauth(function_module, make_context, monkeypatch, backend, clock):
+    module = function_module("OAuth Callback")
+    for var in ("APPWRITE_FUNCTION_API_ENDPOINT", "APPWRITE_DATABASE_ID", "APPWRITE_DATABASES_API_KEY"):
+        monkeypatch.setenv(var, "test")
+    validations = []
+
+    class CountingAccount(replay_traces.make_account(backend)):
+        def get(self):
+            validations.append(self.client.session)
+            return super().get()
+
+    monkeypatch.setattr(module, "Account", CountingAccount)
+    monkeypatch.setattr(module, "Databases", replay_traces.make_databases(backend))
+    monkeypatch.setattr(module, "_session_cache", {})
+    monkeypatch.setattr(module, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+
+    def call(user_id="u1", session="session-u1"):
+        context = make_context(json.dumps({"userId": user_id, "session": session}))
+        status, payload = module.main(context)
+        return status, payload, context
+
+    call.validations = validations
+    return call
+
+
+def test_session_is_validated_once_per_ttl(oauth, clock, function_module):
+    ttl = function_module("OAuth Callback").SESSION_CACHE_TTL_SECONDS
+
+    oauth()
+    clock.now += ttl - 1
+    status, _, context = oauth()
+
+    assert status == 200
+    assert oauth.validations == ["session-u1"]
+    assert "Session validated from cache" in context.logs
+
+    clock.now += 2
+    oauth()
+    assert oauth.validations == ["session-u1", "session-u1"]
+
+
+def test_expired_cache_entry_sees_revoked_session(oauth, clock, backend, function_module):
+    oauth()
+    del backend.sessions["session-u1"]
+    clock.now += function_module("OAuth Callback").SESSION_CACHE_TTL_SECONDS + 1
+
+    status, payload, _ = oauth()
+
+    assert status == 401
+    assert payload["error"] == "Invalid session"
+
+
+def test_new_user_gets_a_created_profile(oauth, backend):
+    status, payload, _ = oauth()
+
+    assert status == 200
+    assert payload["data"]["isNewUser"] is True
+    assert backend.collections["users"]["u1"]["email"] == "u1@example.com"
+    assert payload["data"]["profile"]["onboardingCompleted"] is False
+
+
+def test_existing_profile_is_read_after_create_conflict(oauth, backend):
+    backend.put("users", "u1", {**backend.default_user("u1"), "xp": 420, "username": "Existing"})
+
+    status, payload, _ = oauth()
+
+    assert status == 200
+    assert payload["data"]["isNewUser"] is False
+    assert payload["data"]["profile"]["xp"] == 420
+    assert backend.collections["users"]["u1"]["username"] == "Existing"
+
+
+def test_known_profile_skips_the_create(oauth, backend, monkeypatch, function_module):
+    oauth()
+    databases = replay_traces.make_databases(backend)
+
+    class NoCreates(databases):
+        def create_document(self, *args, **kwargs):
+            raise AssertionError("profile was already known to exist")
+
+    monkeypatch.setattr(function_module("OAuth Callback"), "Databases", NoCreates)
+    status, payload, _ = oauth()
+
+    assert status == 200
+    assert payload["data"]["isNewUser"] is False
+
+
+@pytest.mark.parametrize("warm", [False, True])
+def test_session_for_another_user_is_forbidden(oauth, backend, warm):
+    if warm:
+        oauth()
+
+    status, payload, _ = oauth(user_id="u2")
+
+    assert status == 403
+    assert payload["error"] == "Session does not belong to user"
+    assert "u2" not in backend.collections.get("users", {})
+
+
+def test_missing_session_is_unauthorized(oauth):
+    status, _, _ = oauth(session="")
+    assert status == 401
+    assert oauth.validations == []
+
@@ -0,0 +1,91 @@
+import json
+import threading
+
+import pytest
+
+import replay_traces
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=2, challenges=0)
+
+
+@pytest.fixture
+def worker(function_module, backend, monkeypatch):
+    module = function_module("Process Submission")
+    monkeypatch.setattr(module, "Databases", replay_traces.make_databases(backend))
+    return module
+
+
+def created(make_context, backend, response_id, xp=20):
+    """A responses create event for an async submission, with the document in the store."""
+    doc = {
+        "userID": "u1",
+        "challengeID": f"challenge-{response_id}",
+        "totalXpEarned": xp,
+        "totalThinkingTime": 120,
+        "postProcessing": "pending"
+    }
+    # A redelivery carries the document as it was created
+    stored = backend.collections.get("responses", {}).get(response_id) or backend.put("responses", response_id, doc)
+    context = make_context(json.dumps({**stored, **doc}))
+    context.req.headers["x-appwrite-event"] = f"databases.synapse.collections.responses.documents.{response_id}.create"
+    return context
+
+
+def user(backend):
+    return backend.collections["users"]["u1"]
+
+
+def test_redelivered_event_awards_xp_once(worker, make_context, backend):
+    status, first = worker.main(created(make_context, backend, "resp-1"))
+    assert status == 200
+    assert first["data"]["xp"] == 20
+
+    status, second = worker.main(created(make_context, backend, "resp-1"))
+    assert status == 200
+    assert second["data"]["duplicate"] is True
+    assert (user(backend)["xp"], user(backend)["completedChallenges"]) == (20, 1)
+    assert backend.collections["responses"]["resp-1"]["postProcessing"] == "done"
+
+
+def test_failed_processing_releases_the_claim(worker, make_context, backend, monkeypatch):
+    apply_user_stats = worker.apply_user_stats
+
+    def fail_once(*args):
+        monkeypatch.setattr(worker, "apply_user_stats", apply_user_stats)
+        raise replay_traces.FakeAppwriteException("Server error", 503)
+
+    monkeypatch.setattr(worker, "apply_user_stats", fail_once)
+    status, _ = worker.main(created(make_context, backend, "resp-1"))
+    assert status == 500
+    assert not backend.collections["processed_responses"]
+
+    status, body = worker.main(created(make_context, backend, "resp-1"))
+    assert status == 200
+    assert user(backend)["xp"] == 20
+
+
+def test_concurrent_submissions_by_one_user_keep_all_xp(worker, make_context, backend):
+    contexts = [created(make_context, backend, f"resp-{i}", xp=10 + i) for i in range(8)]
+    threads = [threading.Thread(target=worker.main, args=(context,)) for context in contexts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert user(backend)["xp"] == sum(10 + i for i in range(8))
+    assert user(backend)["completedChallenges"] == 8
+    assert backend.collections["leaderboard"]["u1"]["xp"] == user(backend)["xp"]
+    assert not backend.collections["user_stats_locks"]
+
+
+def test_async_resubmission_reports_no_stats(function_module, make_context):
+    submit = function_module("Submit Challenge")
+    summary = {"questionsAnswered": 3, "totalQuestions": 3, "xpBreakdown": {}}
+
+    for is_retry in (False, True):
+        _, body = submit.async_result(make_context(), {"$id": "resp-1"}, {"totalXpEarned": 20}, summary, is_retry)
+        assert body["data"]["statsPending"] is not is_retry
+        assert not {"level", "streak", "leveledUp"} & set(body["data"])
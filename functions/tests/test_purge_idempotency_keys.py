@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta, timezone
+
+import replay_traces
+
+
+def test_purges_only_keys_that_are_still_expired(function_module):
+    purge = function_module("Purge Idempotency Keys")
+    backend = replay_traces.FakeBackend(latency_ms=0, challenges=0)
+    databases = replay_traces.make_databases(backend)(None)
+    now = datetime.now(timezone.utc)
+    expired = (now - timedelta(minutes=5)).isoformat()
+    live = (now + timedelta(minutes=1)).isoformat()
+
+    databases.create_document("synapse", "idempotency_keys", "stale", {"status": "done", "expiresAt": expired})
+    databases.create_document("synapse", "idempotency_keys", "reclaimed", {"status": "pending", "expiresAt": live})
+
+    assert purge.purge_if_expired(databases, "synapse", "stale", now) is True
+    # A retry reclaimed this key after the purge listed it as expired
+    assert purge.purge_if_expired(databases, "synapse", "reclaimed", now) is False
+    assert purge.purge_if_expired(databases, "synapse", "missing", now) is False
+    assert set(backend.collections["idempotency_keys"]) == {"reclaimed"}
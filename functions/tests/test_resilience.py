@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from functools import partial
+
+import pytest
+
+import replay_traces
+
+FUNCTIONS = ["Submit Challenge", "Get User Analytics"]
+
+
+@pytest.fixture(params=FUNCTIONS)
+def resilience(request, function_module):
+    module = function_module(request.param, "resilience")
+    module.breaker = module.CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+    module._cache.clear()
+    yield module
+    module.breaker = module.CircuitBreaker()
+    module._cache.clear()
+
+
+def unavailable():
+    raise replay_traces.FakeAppwriteException("Service unavailable", 503)
+
+
+def test_breaker_opens_after_consecutive_failures_and_fails_fast(resilience, make_context):
+    calls = resilience.Resilient(make_context(), max_retries=0)
+    for _ in range(3):
+        with pytest.raises(replay_traces.FakeAppwriteException):
+            calls.read("flaky read", unavailable)
+    assert resilience.breaker.state == "open"
+
+    invoked = []
+    with pytest.raises(resilience.CircuitOpenError):
+        calls.read("fast fail", lambda: invoked.append(1))
+    assert not invoked
+
+
+def test_half_open_probe_closes_or_reopens_breaker(resilience, make_context):
+    calls = resilience.Resilient(make_context(), max_retries=0)
+    for _ in range(3):
+        with pytest.raises(replay_traces.FakeAppwriteException):
+            calls.read("flaky read", unavailable)
+
+    time.sleep(0.25)
+    assert resilience.breaker.state == "half_open"
+    with pytest.raises(replay_traces.FakeAppwriteException):
+        calls.read("failed probe", unavailable)
+    assert resilience.breaker.state == "open"
+
+    time.sleep(0.25)
+    assert calls.read("good probe", lambda: "ok") == "ok"
+    assert resilience.breaker.state == "closed"
+
+
+def test_half_open_admits_a_single_probe(resilience, make_context):
+    resilience.breaker.opened_at = time.monotonic() - 1
+    calls = resilience.Resilient(make_context(), max_retries=0)
+    probe_started = threading.Event()
+    results = []
+
+    def slow_probe():
+        probe_started.set()
+        time.sleep(0.1)
+        return "ok"
+
+    probe = threading.Thread(target=lambda: results.append(calls.read("probe", slow_probe)))
+    probe.start()
+    probe_started.wait()
+    invoked = []
+    for _ in range(3):
+        with pytest.raises(resilience.CircuitOpenError):
+            calls.read("concurrent read", lambda: invoked.append(1))
+    probe.join()
+
+    assert results == ["ok"] and not invoked
+    assert resilience.breaker.state == "closed"
+
+
+def test_probe_answered_with_client_error_closes_breaker(resilience, make_context):
+    resilience.breaker.opened_at = time.monotonic() - 1
+    calls = resilience.Resilient(make_context(), max_retries=0)
+
+    def missing():
+        raise replay_traces.FakeAppwriteException("Document not found", 404)
+
+    with pytest.raises(replay_traces.FakeAppwriteException):
+        calls.read("probe", missing)
+    assert resilience.breaker.state == "closed"
+    assert calls.read("next read", lambda: "ok") == "ok"
+
+
+def test_hung_calls_saturate_slots_and_later_calls_fail_fast(resilience, make_context):
+    resilience.breaker = resilience.CircuitBreaker(failure_threshold=100)
+    calls = resilience.Resilient(make_context(), call_timeout=0.05, max_retries=0)
+    release = threading.Event()
+    for i in range(resilience.MAX_CALLS_IN_FLIGHT):
+        with pytest.raises(resilience.DeadlineExceeded):
+            calls.write(f"hung write {i}", release.wait)
+    failures = resilience.breaker.failures
+
+    started = time.monotonic()
+    with pytest.raises(resilience.DeadlineExceeded, match="in flight"):
+        calls.read("read behind hung calls", lambda: "ok")
+    assert time.monotonic() - started < 0.05
+    assert resilience.breaker.failures == failures
+
+    release.set()
+    deadline = time.monotonic() + 1
+    while time.monotonic() < deadline:
+        try:
+            assert calls.read("read after recovery", lambda: "ok") == "ok"
+            break
+        except resilience.DeadlineExceeded:
+            time.sleep(0.01)
+    else:
+        pytest.fail("slots were not released")
+
+
+def test_client_errors_do_not_trip_breaker(resilience, make_context):
+    calls = resilience.Resilient(make_context(), max_retries=0)
+
+    def missing():
+        raise replay_traces.FakeAppwriteException("Document not found", 404)
+
+    for _ in range(5):
+        with pytest.raises(replay_traces.FakeAppwriteException):
+            calls.read("lookup", missing)
+    assert resilience.breaker.state == "closed"
+
+
+def test_reads_retry_transient_failures(resilience, make_context):
+    outcomes = [unavailable, unavailable, lambda: {"xp": 10}]
+    calls = resilience.Resilient(make_context(), max_retries=2)
+    assert calls.read("get user", lambda: outcomes.pop(0)()) == {"xp": 10}
+    assert calls.retries == 2
+
+
+def test_open_breaker_serves_cached_read(resilience, make_context):
+    calls = resilience.Resilient(make_context(), max_retries=0)
+    assert calls.read("get user", lambda: {"xp": 10}, cache_key="user:u1") == {"xp": 10}
+
+    resilience.breaker.opened_at = time.monotonic()
+    assert calls.read("get user", unavailable, cache_key="user:u1") == {"xp": 10}
+    assert calls.cache_hits == 1
+    with pytest.raises(resilience.CircuitOpenError):
+        calls.read("get other user", unavailable, cache_key="user:u2")
+
+
+def test_hung_call_raises_deadline_exceeded(resilience, make_context):
+    calls = resilience.Resilient(make_context(), call_timeout=0.05, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(resilience.DeadlineExceeded):
+        calls.read("hung read", lambda: time.sleep(1))
+    assert time.monotonic() - started < 0.5
+    with pytest.raises(resilience.DeadlineExceeded):
+        calls.write("hung write", lambda: time.sleep(1))
+
+
+def test_write_without_deadline_waits_for_outcome(resilience, make_context):
+    calls = resilience.Resilient(make_context(), call_timeout=0.05)
+    result = calls.write("create response", lambda: time.sleep(0.2) or {"$id": "r1"}, deadline=False)
+    assert result == {"$id": "r1"}
+
+
+def submission(backend):
+    challenge_id = next(iter(backend.collections["challenges"]))
+    return json.dumps({
+        "userId": "u1",
+        "challengeId": challenge_id,
+        "totalThinkingTime": 60,
+        "responses": [{"questionText": "Why?", "responseText": "Because", "thinkingTime": 20}]
+    })
+
+
+def test_submit_maps_hung_backend_to_504(function_module, make_context, monkeypatch):
+    main = function_module("Submit Challenge")
+    resilience = function_module("Submit Challenge", "resilience")
+    monkeypatch.setattr(resilience, "breaker", resilience.CircuitBreaker())
+    monkeypatch.setattr(main, "Resilient", partial(main.Resilient, call_timeout=0.05, max_retries=0))
+    slow = replay_traces.FakeBackend(latency_ms=400, challenges=3)
+    monkeypatch.setattr(main, "Databases", replay_traces.make_databases(slow))
+
+    status, body = main.main(make_context(submission(slow)))
+    assert status == 504
+    assert body["success"] is False
+
+
+def test_submit_maps_open_breaker_to_503(function_module, make_context, monkeypatch):
+    main = function_module("Submit Challenge")
+    resilience = function_module("Submit Challenge", "resilience")
+    monkeypatch.setattr(resilience, "breaker", resilience.CircuitBreaker())
+    resilience.breaker.opened_at = time.monotonic()
+    backend = replay_traces.FakeBackend(latency_ms=0, challenges=3)
+    monkeypatch.setattr(main, "Databases", replay_traces.make_databases(backend))
+
+    status, body = main.main(make_context(submission(backend)))
+    assert status == 503
+    assert not backend.collections.get("responses")
@@ -0,0 +1,146 @@
+import json
+import threading
+
+import pytest
+
+import replay_traces
+
+
+@pytest.fixture
+def backend():
+    return replay_traces.FakeBackend(latency_ms=2, challenges=10)
+
+
+@pytest.fixture
+def databases(backend):
+    return replay_traces.make_databases(backend)(None)
+
+
+def completion(challenge_id, completed_at, response_id="resp-1", xp=30, thinking_time=200):
+    return {
+        "$id": response_id,
+        "userID": "u1",
+        "challengeID": challenge_id,
+        "completedAt": completed_at,
+        "totalXpEarned": xp,
+        "totalThinkingTime": thinking_time
+    }
+
+
+def queue(backend):
+    doc = backend.collections.get("revisit_queues", {}).get("u1")
+    return {entry[1]: entry for entry in json.loads(doc["heap"])} if doc else {}
+
+
+def test_redelivered_completion_does_not_advance_schedule(function_module, backend, databases):
+    worker = function_module("Process Submission")
+    doc = completion("challenge00001", "2026-10-01T10:00:00+00:00")
+
+    assert worker.schedule_revisit(databases, "synapse", "u1", "challenge00001", doc) is True
+    first = queue(backend)["challenge00001"]
+    assert worker.schedule_revisit(databases, "synapse", "u1", "challenge00001", doc) is False
+    assert queue(backend)["challenge00001"] == first
+    assert first[3] == 1
+
+
+def test_revisit_completion_update_grows_interval(function_module, make_context, backend, databases):
+    worker = function_module("Process Submission")
+    recommender = function_module("Get Challenge For User")
+    doc = completion("challenge00001", "2026-10-01T10:00:00+00:00")
+    worker.schedule_revisit(databases, "synapse", "u1", "challenge00001", doc)
+    first_interval = queue(backend)["challenge00001"][2]
+
+    # Make it due, serve it (snoozed a day), then complete it again as an update
+    heap = json.loads(backend.collections["revisit_queues"]["u1"]["heap"])
+    heap[0][0] = 0
+    backend.collections["revisit_queues"]["u1"]["heap"] = json.dumps(heap)
+    topic = backend.collections["challenges"]["challenge00001"]["topicID"]
+    served = recommender.pop_due_revisit(make_context(), databases, "synapse", "u1", [topic])
+    assert served["$id"] == "challenge00001"
+
+    worker.schedule_revisit(databases, "synapse", "u1", "challenge00001",
+                            completion("challenge00001", "2026-10-09T10:00:00+00:00"))
+    entry = queue(backend)["challenge00001"]
+    assert entry[3] == 2
+    assert entry[2] > first_interval
+
+
+def test_concurrent_writers_do_not_lose_entries(function_module, backend, databases):
+    worker = function_module("Process Submission")
+    challenge_ids = [f"challenge{i:05d}" for i in range(8)]
+    threads = [
+        threading.Thread(target=worker.schedule_revisit, args=(
+            databases, "synapse", "u1", challenge_id,
+            completion(challenge_id, "2026-10-01T10:00:00+00:00", response_id=f"resp-{challenge_id}")
+        ))
+        for challenge_id in challenge_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(queue(backend)) == challenge_ids
+    assert not backend.collections.get("revisit_queue_locks")
+
+
+def event(make_context, doc, action):
+    context = make_context(json.dumps(doc))
+    context.req.headers["x-appwrite-event"] = f"databases.synapse.collections.responses.documents.{doc['$id']}.{action}"
+    return context
+
+
+def test_update_event_without_revisit_mark_is_skipped(function_module, make_context, backend, monkeypatch):
+    worker = function_module("Process Submission")
+    monkeypatch.setattr(worker, "Databases", replay_traces.make_databases(backend))
+    doc = completion("challenge00001", "2026-10-01T10:00:00+00:00")
+
+    worker.main(event(make_context, doc, "create"))
+    first = queue(backend)["challenge00001"]
+    calls = backend.calls
+    # The worker's own postProcessing write, and a quality backfill
+    for update in ({**doc, "postProcessing": "done"}, {**doc, "thinkingQualityBonus": 3}):
+        status, body = worker.main(event(make_context, update, "update"))
+        assert body["data"]["skipped"] is True
+    assert backend.calls == calls
+    assert queue(backend)["challenge00001"] == first
+
+
+def test_backfill_update_of_unqueued_response_is_not_scheduled(function_module, make_context, backend, monkeypatch):
+    worker = function_module("Process Submission")
+    monkeypatch.setattr(worker, "Databases", replay_traces.make_databases(backend))
+    historical = {**completion("challenge00001", "2025-01-01T10:00:00+00:00"), "thinkingQualityBonus": 2}
+
+    worker.main(event(make_context, historical, "update"))
+    assert queue(backend) == {}
+
+
+def test_revisit_update_reschedules_and_clears_mark(function_module, make_context, backend, databases, monkeypatch):
+    worker = function_module("Process Submission")
+    monkeypatch.setattr(worker, "Databases", replay_traces.make_databases(backend))
+    doc = completion("challenge00001", "2026-10-01T10:00:00+00:00")
+    backend.put("responses", doc["$id"], doc)
+    worker.main(event(make_context, doc, "create"))
+
+    revisit = {**completion("challenge00001", "2026-10-09T10:00:00+00:00"), "postProcessing": "revisit"}
+    status, body = worker.main(event(make_context, revisit, "update"))
+
+    assert body["data"]["revisit"] is True
+    assert queue(backend)["challenge00001"][3] == 2
+    assert backend.collections["responses"][doc["$id"]]["postProcessing"] == "done"
+    assert "users" not in backend.collections  # no stats for a resubmission
+
+
+def test_expired_writer_does_not_release_the_next_lease(function_module, backend, databases):
+    leases = function_module("Process Submission", "leases")
+    stale = leases.acquire_lease(databases, "synapse", "revisit_queue_locks", "u1", wait_seconds=0)
+    backend.collections["revisit_queue_locks"]["u1"]["expiresAt"] = "2000-01-01T00:00:00+00:00"
+
+    current = leases.acquire_lease(databases, "synapse", "revisit_queue_locks", "u1", wait_seconds=1)
+    assert current != stale
+    # The first writer overran its lease and now cleans up in its finally block
+    leases.release_lease(databases, "synapse", "revisit_queue_locks", "u1", stale)
+    assert backend.collections["revisit_queue_locks"]["u1"]["token"] == current
+
+    leases.release_lease(databases, "synapse", "revisit_queue_locks", "u1", current)
+    assert not backend.collections["revisit_queue_locks"]
@@ -0,0 +1,27 @@
+from collections import defaultdict
+from pathlib import Path
+
+import pytest
+
+FUNCTIONS = Path(__file__).resolve().parent.parent
+
+
+def shared_modules():
+    """Helper modules copied into more than one function's src/ (every module but main.py)."""
+    copies = defaultdict(list)
+    for path in sorted(FUNCTIONS.glob("*/src/*.py")):
+        if path.name != "main.py":
+            copies[path.name].append(path)
+    return {name: paths for name, paths in copies.items() if len(paths) > 1}
+
+
+def test_idempotency_is_shared_by_every_mutating_function():
+    functions = {path.parent.parent.name for path in shared_modules()["idempotency.py"]}
+    assert functions == {"Get Challenge For User", "Submit Challenge", "OAuth Callback", "Password Reset", "Verify Email"}
+
+
+@pytest.mark.parametrize("name", sorted(shared_modules()))
+def test_shared_module_copies_are_identical(name):
+    first, *others = shared_modules()[name]
+    drifted = [str(path.relative_to(FUNCTIONS)) for path in others if path.read_bytes() != first.read_bytes()]
+    assert not drifted, f"{name} differs from {first.relative_to(FUNCTIONS)} in: {', '.join(drifted)}"
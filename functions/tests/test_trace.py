@@ -0,0 +1,68 @@
+import glob
+import hashlib
+from pathlib import Path
+
+import pytest
+
+FUNCTIONS = sorted(Path(p).parent.parent.name for p in glob.glob(str(Path(__file__).resolve().parent.parent / "*" / "src" / "trace.py")))
+
+
+@pytest.fixture(params=FUNCTIONS)
+def trace(request, function_module):
+    return function_module(request.param, "trace")
+
+
+def test_password_reset_confirm_body_is_redacted(trace):
+    body = {
+        "action": "confirm",
+        "userId": "user-1",
+        "secret": "abc123",
+        "password": "hunter22",
+        "passwordConfirm": "hunter22"
+    }
+    sanitized = trace.sanitize_trace(body)
+    assert "hunter22" not in repr(sanitized)
+    assert "abc123" not in repr(sanitized)
+    assert sanitized["action"] == "confirm"
+
+
+@pytest.mark.parametrize("key", ["newPassword", "PASSWORD_AGAIN", "clientSecret", "refreshToken", "resetTokens"])
+def test_keys_containing_sensitive_words_are_redacted(trace, key):
+    assert trace.sanitize_trace({key: "s3cr3t"}) == {key: "[redacted]"}
+    assert trace.sanitize_trace({key: ["s3cr3t"]}) == {key: "[redacted]"}
+
+
+def test_identities_and_text_keep_shape(trace, monkeypatch):
+    monkeypatch.setattr(trace, "TRACE_PSEUDONYM_KEY", "k")
+    sanitized = trace.sanitize_trace({
+        "userId": "user-1",
+        "email": "a@b.co",
+        "responses": [{"responseText": "because"}],
+        "idempotencyKey": "k1"
+    })
+    assert sanitized["userId"].startswith("t") and sanitized["userId"] != "user-1"
+    assert sanitized["email"].endswith("@example.com")
+    assert sanitized["responses"] == [{"responseText": "xxxxxxx"}]
+    assert sanitized["idempotencyKey"] == "k1"
+
+
+def test_pseudonyms_are_keyed(trace, monkeypatch):
+    monkeypatch.setattr(trace, "TRACE_PSEUDONYM_KEY", "key-a")
+    first = trace.sanitize_trace({"userId": "user-1"})["userId"]
+    assert trace.sanitize_trace({"userId": "user-1"})["userId"] == first
+    assert hashlib.sha256(b"user-1").hexdigest()[:20] not in first
+
+    monkeypatch.setattr(trace, "TRACE_PSEUDONYM_KEY", "key-b")
+    assert trace.sanitize_trace({"userId": "user-1"})["userId"] != first
+
+
+def test_nothing_is_captured_without_a_pseudonym_key(trace, monkeypatch, make_context):
+    monkeypatch.setattr(trace, "TRACE_CAPTURE", True)
+    monkeypatch.setattr(trace, "TRACE_PSEUDONYM_KEY", "")
+    context = make_context('{"userId": "user-1"}')
+
+    trace.capture_trace(context, "submit-challenge")
+
+    assert not any(line.startswith("TRACE ") for line in context.logs)
+    assert context.errors
+    assert trace.sanitize_trace({"email": "a@b.co"}) == {"email": "[redacted]"}
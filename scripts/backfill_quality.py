@@ -0,0 +1,189 @@
+"""
+Quality Backfill - score historical responses and fill thinkingQualityBonus
+
+Uses the same feature definitions as Submit Challenge (functions/Submit
+Challenge/src/quality.py). Tokenizing is per answer, but normalization,
+weighting and per-document averaging run as NumPy array operations over a
+whole page of responses at once.
+
+Usage:
+    python scripts/backfill_quality.py --dry-run
+    python scripts/backfill_quality.py --workers 8
+    python scripts/backfill_quality.py --benchmark 20000   # no backend needed
+
+Environment (falls back to appwrite.config.json for endpoint/project):
+    APPWRITE_ENDPOINT, APPWRITE_PROJECT_ID, APPWRITE_API_KEY, APPWRITE_DATABASE_ID
+"""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_SIZE = 100
+
+_spec = importlib.util.spec_from_file_location(
+    "submit_challenge_quality", ROOT / "functions" / "Submit Challenge" / "src" / "quality.py"
+)
+quality = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(quality)
+
+
+def batch_quality_bonus(documents):
+    """
+    Vectorized quality bonus for a batch of response documents. Each document
+    carries parallel "questions" and "responses" lists; returns an int array.
+    """
+    counts = []
+    owners = []
+    for position, document in enumerate(documents):
+        questions = document.get("questions") or []
+        for i, response in enumerate((document.get("responses") or [])[:quality.MAX_SCORED_ANSWERS]):
+            counts.append(quality.raw_features(questions[i] if i < len(questions) else "", response))
+            owners.append(position)
+
+    bonuses = np.zeros(len(documents), dtype=np.int64)
+    if not counts:
+        return bonuses
+
+    features = np.asarray(counts, dtype=np.float64)
+    words, distinct, question_words, echoed, markers = features.T
+
+    safe_words = np.maximum(words, 1.0)
+    diversity = np.minimum(distinct / np.sqrt(safe_words) / quality.DIVERSITY_REFERENCE, 1.0)
+    engagement = np.divide(echoed, question_words, out=np.zeros_like(echoed), where=question_words > 0)
+    reasoning = np.minimum(markers / quality.REASONING_REFERENCE, 1.0)
+
+    scores = np.asarray(quality.FEATURE_WEIGHTS) @ np.vstack([diversity, engagement, reasoning])
+    scores[words < quality.MIN_WORDS] = 0.0
+
+    # Mean score per document, then scaled to XP
+    owners = np.asarray(owners)
+    totals = np.bincount(owners, weights=scores, minlength=len(documents))
+    answered = np.bincount(owners, minlength=len(documents))
+    means = np.divide(totals, answered, out=np.zeros_like(totals), where=answered > 0)
+    # np.round matches Python's round() (half to even), so both paths agree
+    bonuses[:] = np.round(means * quality.MAX_QUALITY_BONUS).astype(np.int64)
+    return bonuses
+
+
+def synthetic_documents(count, seed=7):
+    rng = random.Random(seed)
+    vocabulary = sorted(quality.REASONING_MARKERS) + [f"word{i}" for i in range(400)]
+    question = "Why might a city choose to ban cars from its center, and what would change?"
+    documents = []
+    for _ in range(count):
+        answers = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 120))) for _ in range(3)]
+        documents.append({"questions": [question] * 3, "responses": answers})
+    return documents
+
+
+def benchmark(count):
+    documents = synthetic_documents(count)
+
+    started = time.perf_counter()
+    inline = [quality.quality_bonus(d["questions"], d["responses"]) for d in documents]
+    inline_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = []
+    for start in range(0, count, PAGE_SIZE):
+        batched.extend(batch_quality_bonus(documents[start:start + PAGE_SIZE]).tolist())
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(inline, batched) if a != b)
+    print(f"inline: {count / inline_seconds:,.0f} submissions/s "
+          f"({inline_seconds / count * 1e6:.0f} us each)")
+    print(f"batch:  {count / batch_seconds:,.0f} responses/s in pages of {PAGE_SIZE}")
+    print(f"paths disagree on {mismatches} of {count} documents")
+    return 1 if mismatches else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill thinkingQualityBonus on responses")
+    parser.add_argument("--dry-run", action="store_true", help="score and report without writing")
+    parser.add_argument("--workers", type=int, default=8, help="parallel writes (default 8)")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="benchmark both paths on N synthetic responses")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return benchmark(args.benchmark)
+
+    from appwrite.client import Client
+    from appwrite.services.databases import Databases
+    from appwrite.query import Query
+    from appwrite.exception import AppwriteException
+
+    config = json.loads((ROOT / "appwrite.config.json").read_text(encoding="utf-8"))
+    client = Client()
+    client.set_endpoint(os.environ.get("APPWRITE_ENDPOINT", config["endpoint"]))
+    client.set_project(os.environ.get("APPWRITE_PROJECT_ID", config["projectId"]))
+    if os.environ.get("APPWRITE_API_KEY"):
+        client.set_key(os.environ["APPWRITE_API_KEY"])
+    databases = Databases(client)
+    database_id = os.environ.get("APPWRITE_DATABASE_ID", "synapse")
+
+    scanned = changed = failures = 0
+    cursor = None
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        while True:
+            queries = [
+                Query.select(["questions", "responses", "thinkingQualityBonus"]),
+                Query.order_asc("$id"),
+                Query.limit(PAGE_SIZE)
+            ]
+            if cursor:
+                queries.append(Query.cursor_after(cursor))
+            page = databases.list_documents(database_id=database_id, collection_id="responses", queries=queries)
+            documents = page["documents"]
+            if not documents:
+                break
+
+            bonuses = batch_quality_bonus(documents)
+            scanned += len(documents)
+            updates = [
+                (document["$id"], int(bonus))
+                for document, bonus in zip(documents, bonuses)
+                if document.get("thinkingQualityBonus") != int(bonus)
+            ]
+            changed += len(updates)
+
+            if not args.dry_run:
+                futures = [
+                    pool.submit(
+                        databases.update_document,
+                        database_id=database_id,
+                        collection_id="responses",
+                        document_id=document_id,
+                        data={"thinkingQualityBonus": bonus}
+                    )
+                    for document_id, bonus in updates
+                ]
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except AppwriteException as e:
+                        failures += 1
+                        print(f"  ! update failed: {e}", file=sys.stderr)
+
+            cursor = documents[-1]["$id"]
+            if len(documents) < PAGE_SIZE:
+                break
+
+    elapsed = time.monotonic() - started
+    verb = "would update" if args.dry_run else "updated"
+    print(f"Scanned {scanned} responses, {verb} {changed - failures} in {elapsed:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
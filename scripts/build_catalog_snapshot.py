@@ -0,0 +1,151 @@
+"""
+Catalog Snapshot - bundle the challenges collection into each function deployment
+
+Pages through the challenges collection and writes a compact read-only SQLite
+file (catalog.sqlite) next to the entrypoint of every function that reads the
+catalog. The functions open it locally and only fall back to a live
+get_document for ids missing from the snapshot, so a stale snapshot serves
+stale challenges. scripts/ingest_challenges.py rebuilds the snapshots itself
+whenever they no longer match the stored content hashes; run this directly
+after changing challenges any other way, and before deploying.
+
+Usage:
+    python scripts/build_catalog_snapshot.py
+    python scripts/build_catalog_snapshot.py --output /tmp/catalog.sqlite
+
+Environment (falls back to appwrite.config.json for endpoint/project):
+    APPWRITE_ENDPOINT, APPWRITE_PROJECT_ID, APPWRITE_API_KEY, APPWRITE_DATABASE_ID
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_SIZE = 100
+SNAPSHOT_NAME = "catalog.sqlite"
+
+# Functions that read challenges through the snapshot
+SNAPSHOT_FUNCTIONS = [
+    "Get Challenge For User",
+    "Get AI Hint",
+    "Submit Challenge",
+]
+
+# Appwrite bookkeeping that the functions never read
+DROPPED_FIELDS = {"$permissions", "$databaseId", "$collectionId", "$sequence"}
+
+SCHEMA = """
+CREATE TABLE challenges (
+    id TEXT PRIMARY KEY,
+    topic_id TEXT,
+    difficulty INTEGER,
+    content_hash TEXT,
+    body TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX challenges_topic_idx ON challenges (topic_id, difficulty);
+CREATE INDEX challenges_difficulty_idx ON challenges (difficulty);
+"""
+
+
+def iter_challenges(databases, database_id):
+    cursor = None
+    while True:
+        queries = [Query.order_asc("$id"), Query.limit(PAGE_SIZE)]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+        page = databases.list_documents(database_id=database_id, collection_id="challenges", queries=queries)
+        documents = page["documents"]
+        yield from documents
+        if len(documents) < PAGE_SIZE:
+            return
+        cursor = documents[-1]["$id"]
+
+
+def build_snapshot(challenges, path):
+    """Write challenges into a fresh SQLite file at path and return the row count."""
+    if path.exists():
+        path.unlink()
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        count = 0
+        for challenge in challenges:
+            body = {k: v for k, v in challenge.items() if k not in DROPPED_FIELDS}
+            connection.execute(
+                "INSERT INTO challenges (id, topic_id, difficulty, content_hash, body) VALUES (?, ?, ?, ?, ?)",
+                (
+                    challenge["$id"],
+                    challenge.get("topicID"),
+                    challenge.get("difficulty"),
+                    challenge.get("contentHash"),
+                    json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+                )
+            )
+            count += 1
+        connection.commit()
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return count
+
+
+def snapshot_hashes(path):
+    """Map id -> content hash for a snapshot file, or None if it is missing or predates the column."""
+    if not path.exists():
+        return None
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return dict(connection.execute("SELECT id, content_hash FROM challenges"))
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        connection.close()
+
+
+def snapshot_targets():
+    return [ROOT / "functions" / name / "src" / SNAPSHOT_NAME for name in SNAPSHOT_FUNCTIONS]
+
+
+def write_snapshots(databases, database_id, targets):
+    """Build one snapshot from the live collection and copy it to every target; returns the row count."""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / SNAPSHOT_NAME
+        count = build_snapshot(iter_challenges(databases, database_id), snapshot)
+        for target in targets:
+            shutil.copyfile(snapshot, target)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot the challenge catalog into SQLite")
+    parser.add_argument("--output", type=Path, help="write a single snapshot here instead of into the functions")
+    args = parser.parse_args(argv)
+
+    config = json.loads((ROOT / "appwrite.config.json").read_text(encoding="utf-8"))
+    client = Client()
+    client.set_endpoint(os.environ.get("APPWRITE_ENDPOINT", config["endpoint"]))
+    client.set_project(os.environ.get("APPWRITE_PROJECT_ID", config["projectId"]))
+    if os.environ.get("APPWRITE_API_KEY"):
+        client.set_key(os.environ["APPWRITE_API_KEY"])
+    databases = Databases(client)
+    database_id = os.environ.get("APPWRITE_DATABASE_ID", "synapse")
+
+    targets = [args.output] if args.output else snapshot_targets()
+    count = write_snapshots(databases, database_id, targets)
+    for target in targets:
+        print(f"Wrote {count} challenges to {target}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
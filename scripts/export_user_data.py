@@ -0,0 +1,122 @@
+"""
+User Data Export - streaming NDJSON export of everything stored for one user
+
+Writes the users profile, every responses document and every
+user_challenge_history entry as one JSON object per line. Collections are
+read with cursor pagination and each page is written out before the next is
+fetched, so memory stays flat no matter how much data the user has.
+
+Usage:
+    python scripts/export_user_data.py USER_ID > user.ndjson
+    python scripts/export_user_data.py USER_ID --gzip -o user.ndjson.gz
+
+Environment (falls back to appwrite.config.json for endpoint/project):
+    APPWRITE_ENDPOINT, APPWRITE_PROJECT_ID, APPWRITE_API_KEY, APPWRITE_DATABASE_ID
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGE_SIZE = 100
+
+# (record type, collection, owner attribute) - responses are keyed by userID
+# as written by Submit Challenge, history by userId
+EXPORT_COLLECTIONS = [
+    ("response", "responses", "userID"),
+    ("history", "user_challenge_history", "userId"),
+]
+
+
+def iter_documents(databases, database_id, collection_id, owner_field, user_id):
+    """Yield a user's documents one page at a time using cursor pagination."""
+    cursor = None
+    while True:
+        queries = [
+            Query.equal(owner_field, [user_id]),
+            Query.order_asc("$id"),
+            Query.limit(PAGE_SIZE)
+        ]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id=collection_id,
+            queries=queries
+        )
+        documents = page["documents"]
+        yield from documents
+        if len(documents) < PAGE_SIZE:
+            return
+        cursor = documents[-1]["$id"]
+
+
+def iter_export_records(databases, database_id, user_id):
+    """Yield export records: the profile first, then each exported collection."""
+    try:
+        profile = databases.get_document(
+            database_id=database_id,
+            collection_id="users",
+            document_id=user_id
+        )
+        yield {"type": "profile", "data": profile}
+    except AppwriteException as e:
+        if getattr(e, "code", None) != 404:
+            raise
+
+    for record_type, collection_id, owner_field in EXPORT_COLLECTIONS:
+        for document in iter_documents(databases, database_id, collection_id, owner_field, user_id):
+            yield {"type": record_type, "data": document}
+
+
+def write_ndjson(records, stream):
+    """Write records as NDJSON to a binary stream, returning the number written."""
+    count = 0
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        stream.write(b"\n")
+        count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a user's data as NDJSON")
+    parser.add_argument("user_id")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    args = parser.parse_args(argv)
+
+    config = json.loads((ROOT / "appwrite.config.json").read_text(encoding="utf-8"))
+    client = Client()
+    client.set_endpoint(os.environ.get("APPWRITE_ENDPOINT", config["endpoint"]))
+    client.set_project(os.environ.get("APPWRITE_PROJECT_ID", config["projectId"]))
+    if os.environ.get("APPWRITE_API_KEY"):
+        client.set_key(os.environ["APPWRITE_API_KEY"])
+    databases = Databases(client)
+    database_id = os.environ.get("APPWRITE_DATABASE_ID", "synapse")
+
+    raw = open(args.output, "wb") if args.output else sys.stdout.buffer
+    stream = gzip.GzipFile(fileobj=raw, mode="wb") if args.gzip else raw
+    try:
+        count = write_ndjson(iter_export_records(databases, database_id, args.user_id), stream)
+    finally:
+        if args.gzip:
+            stream.close()
+        if args.output:
+            raw.close()
+
+    print(f"Exported {count} records for {args.user_id}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Index Advisor - checks function queries against appwrite.config.json
+
+Statically extracts every Query.* used in a databases.list_documents call under
+functions/*/src/*.py and compares it with the columns and indexes declared for
+each table. Reports unknown columns and queries no declared index can serve,
+and prints the composite index definitions to add. Calls whose collection_id is
+not a string literal can't be checked; they are reported as unanalyzable, and
+fail --check unless they only touch system attributes.
+
+Usage:
+    python scripts/index_advisor.py            # report
+    python scripts/index_advisor.py --json     # index definitions only
+    python scripts/index_advisor.py --check    # exit 1 on any finding not in the baseline (CI)
+
+Known drift that is accepted for now is listed in scripts/index_advisor_baseline.json
+with the reason it is tolerated. Baselined findings are still reported but don't
+fail --check; entries that no longer match anything are reported so they get removed.
+"""
+import argparse
+import ast
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Query helpers that filter on an attribute, split by how an index can serve them
+EQUALITY_FILTERS = {"equal", "is_null", "is_not_null"}
+RANGE_FILTERS = {
+    "not_equal", "less_than", "less_than_equal", "greater_than", "greater_than_equal",
+    "between", "starts_with", "ends_with", "contains", "search"
+}
+ORDER_METHODS = {"order_asc", "order_desc"}
+
+# Attributes every collection has and indexes internally
+SYSTEM_ATTRIBUTES = {"$id", "$createdAt", "$updatedAt", "$sequence"}
+
+
+class QueryUsage:
+    """One list_documents call and the attributes its queries touch."""
+
+    def __init__(self, path, line, collection, collection_expr=None):
+        self.path = path
+        self.line = line
+        self.collection = collection
+        self.collection_expr = collection_expr  # source of a non-literal collection_id
+        self.equals = []
+        self.ranges = []
+        self.orders = []
+        self.descending = set()
+        self.selects = []
+
+    @property
+    def location(self):
+        path = self.path.relative_to(ROOT) if self.path.is_relative_to(ROOT) else self.path
+        return f"{path}:{self.line}"
+
+    def attributes(self):
+        return self.equals + self.ranges + self.orders + self.selects
+
+    def add(self, method, args, constants):
+        if method == "select":
+            if args:
+                fields = constants.get(args[0].id) if isinstance(args[0], ast.Name) else args[0]
+                if isinstance(fields, ast.List):
+                    self.selects.extend(_constants(fields.elts))
+            return
+        if not args:
+            return
+        attribute = _constant(args[0])
+        if attribute is None:
+            return
+        if method in EQUALITY_FILTERS:
+            _append_unique(self.equals, attribute)
+        elif method in RANGE_FILTERS:
+            _append_unique(self.ranges, attribute)
+        elif method in ORDER_METHODS:
+            _append_unique(self.orders, attribute)
+            if method == "order_desc":
+                self.descending.add(attribute)
+
+    def wanted_index(self):
+        """
+        Split the index that serves this query into its equality prefix and
+        an optional trailing range/sort column. System attributes are dropped.
+        """
+        prefix = [a for a in self.equals if a not in SYSTEM_ATTRIBUTES]
+        # An index can serve one range or sort column after the equality prefix
+        for attribute in self.ranges + self.orders:
+            if attribute not in SYSTEM_ATTRIBUTES and attribute not in prefix:
+                return prefix, attribute
+        return prefix, None
+
+
+def _constant(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _constants(nodes):
+    return [value for value in (_constant(n) for n in nodes) if value is not None]
+
+
+def _append_unique(items, value):
+    if value not in items:
+        items.append(value)
+
+
+def _query_calls(node):
+    """Yield (method, args) for every Query.<method>(...) call under node."""
+    for child in ast.walk(node):
+        if (
+            isinstance(child, ast.Call)
+            and isinstance(child.func, ast.Attribute)
+            and isinstance(child.func.value, ast.Name)
+            and child.func.value.id == "Query"
+        ):
+            yield child.func.attr, child.args
+
+
+def _keyword(call, name, position):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    if len(call.args) > position:
+        return call.args[position]
+    return None
+
+
+def _enclosing_functions(tree):
+    parents = {}
+    for node in ast.walk(tree):
+        for child in ast.iter_child_nodes(node):
+            parents[child] = node
+    return parents
+
+
+def _queries_bound_to(scope, name):
+    """Query calls assigned to or appended onto a local list variable."""
+    for node in ast.walk(scope):
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == name for t in node.targets
+        ):
+            yield from _query_calls(node.value)
+        elif (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in ("append", "extend")
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == name
+        ):
+            for arg in node.args:
+                yield from _query_calls(arg)
+
+
+def _module_constants(tree):
+    """Module-level NAME = [...] assignments, used to resolve Query.select(FIELDS)."""
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value
+    return constants
+
+
+def extract_usages(path):
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    parents = _enclosing_functions(tree)
+    constants = _module_constants(tree)
+    usages = []
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        if isinstance(node.func, ast.Attribute) and node.func.attr == "list_documents":
+            offset = 0
+        elif (
+            # Deferred calls such as pool.submit(databases.list_documents, ...)
+            node.args
+            and isinstance(node.args[0], ast.Attribute)
+            and node.args[0].attr == "list_documents"
+        ):
+            offset = 1
+        else:
+            continue
+
+        collection_node = _keyword(node, "collection_id", 1 + offset)
+        collection = _constant(collection_node)
+        expr = ast.unparse(collection_node) if collection is None and collection_node is not None else None
+        usage = QueryUsage(path, node.lineno, collection, expr)
+        queries = _keyword(node, "queries", 2 + offset)
+        if isinstance(queries, ast.Name):
+            scope = node
+            while scope in parents and not isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                scope = parents[scope]
+            calls = _queries_bound_to(scope, queries.id)
+        elif queries is not None:
+            calls = _query_calls(queries)
+        else:
+            calls = []
+
+        for method, args in calls:
+            usage.add(method, args, constants)
+        usages.append(usage)
+
+    return usages
+
+
+def index_serves(index_columns, prefix, tail):
+    """
+    An index serves a query when its leading columns are the equality
+    attributes (in any order), followed by the range/sort attribute if any.
+    """
+    if set(index_columns[:len(prefix)]) != set(prefix):
+        return False
+    if tail is None:
+        return True
+    return len(index_columns) > len(prefix) and index_columns[len(prefix)] == tail
+
+
+def analyze(config, usages):
+    tables = {t["$id"]: t for t in config.get("tables", [])}
+    findings = []
+    notes = []  # unanalyzable calls that can't need an index
+    suggestions = {}
+
+    for usage in usages:
+        if usage.collection is None:
+            touched = [a for a in dict.fromkeys(usage.attributes()) if a not in SYSTEM_ATTRIBUTES]
+            if touched:
+                findings.append((usage, f"collection is computed ({usage.collection_expr}); "
+                                        f"can't check queries on ({', '.join(touched)})"))
+            else:
+                notes.append((usage, f"collection is computed ({usage.collection_expr}); "
+                                     f"only system attributes are queried"))
+            continue
+
+        table = tables.get(usage.collection)
+        if table is None:
+            findings.append((usage, f"collection '{usage.collection}' is not declared"))
+            continue
+
+        columns = {c["key"] for c in table.get("columns", [])} | SYSTEM_ATTRIBUTES
+        unknown = [a for a in dict.fromkeys(usage.attributes()) if a not in columns]
+        for attribute in unknown:
+            findings.append((usage, f"'{usage.collection}' has no column '{attribute}'"))
+
+        prefix, tail = usage.wanted_index()
+        wanted = prefix + ([tail] if tail else [])
+        if not wanted:
+            continue
+        if any(index_serves(index["columns"], prefix, tail) for index in table.get("indexes", [])):
+            continue
+
+        findings.append((usage, f"no index on '{usage.collection}' serves ({', '.join(wanted)})"))
+        key = "_".join(wanted) + "_index"
+        # Only a descending sort needs explicit orders; Appwrite defaults to ASC
+        orders = []
+        if tail in usage.descending:
+            orders = ["ASC"] * len(prefix) + ["DESC"]
+        suggestions.setdefault(usage.collection, {})[key] = {
+            "key": key,
+            "type": "key",
+            "status": "available",
+            "columns": wanted,
+            "orders": orders
+        }
+
+    return findings, notes, suggestions
+
+
+def load_baseline(path):
+    """Accepted finding messages from the baseline file (empty if there is none)."""
+    if not path.exists():
+        return set()
+    return {entry["finding"] for entry in json.loads(path.read_text(encoding="utf-8"))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--config", default=ROOT / "appwrite.config.json", type=Path)
+    parser.add_argument("--functions", default=ROOT / "functions", type=Path)
+    parser.add_argument("--json", action="store_true", help="print only the index definitions to add")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if anything new is flagged")
+    parser.add_argument("--baseline", default=ROOT / "scripts" / "index_advisor_baseline.json", type=Path,
+                        help="accepted findings that don't fail --check")
+    args = parser.parse_args(argv)
+
+    config = json.loads(args.config.read_text(encoding="utf-8"))
+    usages = []
+    for path in sorted(args.functions.glob("*/src/*.py")):
+        usages.extend(extract_usages(path))
+
+    findings, notes, suggestions = analyze(config, usages)
+    baseline = load_baseline(args.baseline)
+    new_findings = [(usage, message) for usage, message in findings if message not in baseline]
+    stale = sorted(set(baseline) - {message for _, message in findings})
+
+    if args.json:
+        print(json.dumps({k: list(v.values()) for k, v in suggestions.items()}, indent=4))
+    else:
+        print(f"Checked {len(usages)} queries against {args.config.name}")
+        for usage, message in findings:
+            marker = " (baseline)" if message in baseline else ""
+            print(f"  {usage.location}: {message}{marker}")
+        for usage, message in notes:
+            print(f"  {usage.location}: {message} (unanalyzable)")
+        for message in stale:
+            print(f"  baseline entry no longer matches anything, remove it: {message}")
+        for collection, indexes in suggestions.items():
+            print(f"\nIndexes to add to '{collection}':")
+            print(json.dumps(list(indexes.values()), indent=4))
+        if not findings:
+            print("No issues found")
+
+    return 1 if args.check and new_findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
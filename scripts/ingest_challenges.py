@@ -0,0 +1,310 @@
+"""
+Challenge Ingestion - bulk, incremental seeding of the challenges collection
+
+Reads challenge definitions from JSON or YAML files (a list, or an object with
+a "challenges" list), computes a content hash per challenge and only writes the
+ones that are new or changed. Writes run on a bounded thread pool with
+jittered exponential backoff on rate limits and server errors. A create that
+was retried and then reports 409 already landed on an earlier attempt, so it is
+finished as an update. --dry-run prints the changed fields of every write.
+
+After writing, the bundled catalog snapshots (scripts/build_catalog_snapshot.py)
+are rebuilt unless they already hold exactly the stored content hashes, so the
+functions never serve challenges older than the collection.
+
+Each definition needs: title, questions, promptText, topicID, difficulty,
+archetype and mutator. Optional: id (stable document id), topicName,
+estimatedTime, xpReward, type. Without an id, one is derived from topicID+title.
+
+Usage:
+    python scripts/ingest_challenges.py seeds/*.json
+    python scripts/ingest_challenges.py seeds/ --dry-run
+    python scripts/ingest_challenges.py seeds/ --workers 16
+    python scripts/ingest_challenges.py seeds/ --no-snapshot
+
+Environment (falls back to appwrite.config.json for endpoint/project):
+    APPWRITE_ENDPOINT, APPWRITE_PROJECT_ID, APPWRITE_API_KEY, APPWRITE_DATABASE_ID
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from appwrite.client import Client
+from appwrite.services.databases import Databases
+from appwrite.query import Query
+from appwrite.exception import AppwriteException
+
+from build_catalog_snapshot import snapshot_hashes, snapshot_targets, write_snapshots
+
+try:
+    import yaml
+except ImportError:  # YAML input is optional
+    yaml = None
+
+ROOT = Path(__file__).resolve().parent.parent
+COLLECTION_ID = "challenges"
+
+REQUIRED_FIELDS = ["title", "questions", "promptText", "topicID", "difficulty", "archetype", "mutator"]
+OPTIONAL_FIELDS = {"topicName": "", "estimatedTime": 8, "xpReward": 15, "type": "TEXT"}
+
+PAGE_SIZE = 100
+MAX_RETRIES = 5
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+
+class DefinitionError(ValueError):
+    pass
+
+
+def load_definitions(paths):
+    """Yield (source, definition) for every challenge in the given files or directories."""
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.suffix in (".json", ".yaml", ".yml")))
+        else:
+            files.append(path)
+
+    for file in files:
+        text = file.read_text(encoding="utf-8")
+        if file.suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise DefinitionError(f"{file}: PyYAML is required to read YAML files")
+            try:
+                content = yaml.safe_load(text)
+            except yaml.YAMLError as e:
+                raise DefinitionError(f"{file}: invalid YAML: {e}")
+        else:
+            content = json.loads(text)
+
+        if isinstance(content, dict):
+            content = content.get("challenges", [])
+        if not isinstance(content, list):
+            raise DefinitionError(f"{file}: expected a list of challenges")
+
+        for position, definition in enumerate(content):
+            yield f"{file}#{position}", definition
+
+
+def normalize(source, definition):
+    """Validate a definition and return (document_id, data)."""
+    if not isinstance(definition, dict):
+        raise DefinitionError(f"{source}: challenge must be an object")
+    missing = [field for field in REQUIRED_FIELDS if definition.get(field) in (None, "")]
+    if missing:
+        raise DefinitionError(f"{source}: missing {', '.join(missing)}")
+    if not isinstance(definition["questions"], list) or not definition["questions"]:
+        raise DefinitionError(f"{source}: questions must be a non-empty list")
+
+    data = {field: definition[field] for field in REQUIRED_FIELDS}
+    try:
+        data["difficulty"] = int(data["difficulty"])
+    except (TypeError, ValueError):
+        raise DefinitionError(f"{source}: difficulty must be a number, got {data['difficulty']!r}")
+    for field, default in OPTIONAL_FIELDS.items():
+        data[field] = definition.get(field, default)
+
+    document_id = definition.get("id") or hashlib.sha256(
+        f"{data['topicID']}:{data['title']}".encode("utf-8")
+    ).hexdigest()[:32]
+    data["contentHash"] = content_hash(data)
+    return str(document_id), data
+
+
+def content_hash(data):
+    """Stable hash of the challenge content (key order and whitespace independent)."""
+    payload = {k: v for k, v in data.items() if k != "contentHash"}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def fetch_existing_hashes(databases, database_id):
+    """Map document id -> stored contentHash, paging through the projected collection."""
+    hashes = {}
+    cursor = None
+    while True:
+        queries = [Query.select(["contentHash"]), Query.order_asc("$id"), Query.limit(PAGE_SIZE)]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+        page = databases.list_documents(database_id=database_id, collection_id=COLLECTION_ID, queries=queries)
+        documents = page["documents"]
+        for doc in documents:
+            hashes[doc["$id"]] = doc.get("contentHash")
+        if len(documents) < PAGE_SIZE:
+            return hashes
+        cursor = documents[-1]["$id"]
+
+
+def fetch_documents(databases, database_id, document_ids):
+    """Map document id -> stored document for the given ids."""
+    documents = {}
+    ids = list(document_ids)
+    for start in range(0, len(ids), PAGE_SIZE):
+        batch = ids[start:start + PAGE_SIZE]
+        page = databases.list_documents(
+            database_id=database_id,
+            collection_id=COLLECTION_ID,
+            queries=[Query.equal("$id", batch), Query.limit(PAGE_SIZE)]
+        )
+        for doc in page["documents"]:
+            documents[doc["$id"]] = doc
+    return documents
+
+
+def diff_fields(current, data):
+    """(field, stored value, new value) for every content field the write changes."""
+    return [
+        (field, current.get(field), value)
+        for field, value in data.items()
+        if field != "contentHash" and current.get(field) != value
+    ]
+
+
+def _preview(value, width=60):
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= width else text[:width - 3] + "..."
+
+
+def plan(definitions, existing):
+    """Split normalized definitions into create / update / unchanged."""
+    creates, updates, unchanged = [], [], []
+    for document_id, data in definitions.items():
+        if document_id not in existing:
+            creates.append((document_id, data))
+        elif existing[document_id] != data["contentHash"]:
+            updates.append((document_id, data))
+        else:
+            unchanged.append(document_id)
+    return creates, updates, unchanged
+
+
+def with_retry(operation, on_conflict=None):
+    """
+    Run operation, retrying rate limits and server errors with jittered backoff.
+    A failed attempt may still have been applied, so a 409 on a retry is handed
+    to on_conflict when one is given.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return operation()
+        except AppwriteException as e:
+            code = getattr(e, "code", None)
+            if code == 409 and attempt > 0 and on_conflict is not None:
+                return on_conflict()
+            if code not in RETRYABLE_CODES or attempt == MAX_RETRIES:
+                raise
+            time.sleep(min(0.25 * (2 ** attempt), 8) * random.uniform(0.5, 1.5))
+
+
+def write(databases, database_id, action, document_id, data):
+    def create():
+        return databases.create_document(
+            database_id=database_id,
+            collection_id=COLLECTION_ID,
+            document_id=document_id,
+            data=data
+        )
+
+    def update():
+        return databases.update_document(
+            database_id=database_id,
+            collection_id=COLLECTION_ID,
+            document_id=document_id,
+            data=data
+        )
+
+    if action == "create":
+        # Writing the same data again is harmless if the earlier attempt landed
+        return with_retry(create, on_conflict=lambda: with_retry(update))
+    return with_retry(update)
+
+
+def refresh_snapshots(databases, database_id, stored_hashes, targets):
+    """Rebuild every snapshot whose content hashes differ from the collection's; returns those rebuilt."""
+    stale = [target for target in targets if snapshot_hashes(target) != stored_hashes]
+    if stale:
+        write_snapshots(databases, database_id, stale)
+    return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk, incremental challenge ingestion")
+    parser.add_argument("paths", nargs="+", help="JSON/YAML files or directories")
+    parser.add_argument("--dry-run", action="store_true", help="print the diff without writing")
+    parser.add_argument("--workers", type=int, default=8, help="parallel writes (default 8)")
+    parser.add_argument("--no-snapshot", action="store_true", help="don't rebuild the bundled catalog snapshots")
+    args = parser.parse_args(argv)
+
+    definitions = {}
+    try:
+        for source, definition in load_definitions(args.paths):
+            document_id, data = normalize(source, definition)
+            if document_id in definitions:
+                raise DefinitionError(f"{source}: duplicate challenge id '{document_id}'")
+            definitions[document_id] = data
+    except (DefinitionError, json.JSONDecodeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+    config = json.loads((ROOT / "appwrite.config.json").read_text(encoding="utf-8"))
+    client = Client()
+    client.set_endpoint(os.environ.get("APPWRITE_ENDPOINT", config["endpoint"]))
+    client.set_project(os.environ.get("APPWRITE_PROJECT_ID", config["projectId"]))
+    if os.environ.get("APPWRITE_API_KEY"):
+        client.set_key(os.environ["APPWRITE_API_KEY"])
+    databases = Databases(client)
+    database_id = os.environ.get("APPWRITE_DATABASE_ID", "synapse")
+
+    started = time.monotonic()
+    existing = fetch_existing_hashes(databases, database_id)
+    creates, updates, unchanged = plan(definitions, existing)
+
+    print(f"{len(definitions)} challenges: {len(creates)} new, {len(updates)} changed, {len(unchanged)} unchanged")
+    if args.dry_run:
+        for document_id, data in creates:
+            print(f"  + {document_id}  {data['title']}")
+            for field, value in data.items():
+                if field != "contentHash":
+                    print(f"      {field}: {_preview(value)}")
+        current = fetch_documents(databases, database_id, [document_id for document_id, _ in updates])
+        for document_id, data in updates:
+            print(f"  ~ {document_id}  {data['title']}")
+            for field, old, new in diff_fields(current.get(document_id, {}), data):
+                print(f"      {field}: {_preview(old)} -> {_preview(new)}")
+        return 0
+
+    failures = 0
+    stored_hashes = dict(existing)
+    jobs = [("create", *item) for item in creates] + [("update", *item) for item in updates]
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(write, databases, database_id, action, document_id, data): (action, document_id)
+            for action, document_id, data in jobs
+        }
+        for future in as_completed(futures):
+            action, document_id = futures[future]
+            try:
+                future.result()
+                stored_hashes[document_id] = definitions[document_id]["contentHash"]
+            except AppwriteException as e:
+                failures += 1
+                print(f"  ! {action} {document_id} failed: {e}", file=sys.stderr)
+
+    elapsed = time.monotonic() - started
+    print(f"Wrote {len(jobs) - failures}/{len(jobs)} challenges in {elapsed:.1f}s")
+
+    if not args.no_snapshot:
+        for target in refresh_snapshots(databases, database_id, stored_hashes, snapshot_targets()):
+            print(f"Rebuilt catalog snapshot {target.relative_to(ROOT)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
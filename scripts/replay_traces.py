@@ -0,0 +1,432 @@
+"""
+Trace Replay - drive captured request traces against the functions on local fakes
+
+With TRACE_CAPTURE=true a function logs one sanitized "TRACE {...}" line per
+request. Collect those lines from the execution logs into a file (raw log
+lines are fine, anything that is not a trace is skipped) and replay them here.
+Every function runs in-process against an in-memory Appwrite fake with
+configurable latency, so traffic spikes can be reproduced at 1x to Nx speed
+without touching the real backend.
+
+Usage:
+    python scripts/replay_traces.py traces.log
+    python scripts/replay_traces.py traces.log --speed 10 --concurrency 64
+    python scripts/replay_traces.py traces.log --latency-ms 40 --json
+
+Reports throughput, error rates and p50/p95/p99 latency per function. Latency
+is measured from each request's scheduled time, so queueing is included.
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# ---------------------------------------------------------------------------
+# In-memory Appwrite fake
+# ---------------------------------------------------------------------------
+
+class FakeAppwriteException(Exception):
+    def __init__(self, message, code=None, type=None, response=None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.type = type
+        self.response = response
+
+
+def _query(method, attribute=None, values=None):
+    payload = {"method": method}
+    if attribute is not None:
+        payload["attribute"] = attribute
+    if values is not None:
+        payload["values"] = values if isinstance(values, list) else [values]
+    return json.dumps(payload)
+
+
+class FakeQuery:
+    equal = staticmethod(lambda attribute, value: _query("equal", attribute, value))
+    not_equal = staticmethod(lambda attribute, value: _query("notEqual", attribute, value))
+    less_than = staticmethod(lambda attribute, value: _query("lessThan", attribute, value))
+    greater_than = staticmethod(lambda attribute, value: _query("greaterThan", attribute, value))
+    greater_than_equal = staticmethod(lambda attribute, value: _query("greaterThanEqual", attribute, value))
+    limit = staticmethod(lambda limit: _query("limit", values=limit))
+    offset = staticmethod(lambda offset: _query("offset", values=offset))
+    select = staticmethod(lambda attributes: _query("select", values=attributes))
+    order_asc = staticmethod(lambda attribute="": _query("orderAsc", attribute))
+    order_desc = staticmethod(lambda attribute="": _query("orderDesc", attribute))
+    cursor_after = staticmethod(lambda document_id: _query("cursorAfter", values=document_id))
+
+
+class FakeBackend:
+    """Thread-safe document store shared by every fake client."""
+
+    def __init__(self, latency_ms=20.0, topics=5, challenges=200):
+        self.latency = latency_ms / 1000.0
+        self.lock = threading.Lock()
+        self.collections = {}
+        self.sessions = {}
+        self.calls = 0
+        self.topics = [f"topic{i}" for i in range(topics)]
+        for i in range(challenges):
+            self.put("challenges", f"challenge{i:05d}", {
+                "title": f"Challenge {i}",
+                "questions": ["Why?", "How?", "What if not?"],
+                "promptText": "Think it through.",
+                "topicID": self.topics[i % topics],
+                "topicName": self.topics[i % topics].title(),
+                "difficulty": i % 5 + 1,
+                "estimatedTime": 8,
+                "xpReward": 15
+            })
+
+    def wait(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+    def put(self, collection_id, document_id, data):
+        now = datetime.now(timezone.utc).isoformat()
+        document = {**data, "$id": document_id, "$createdAt": now, "$updatedAt": now}
+        self.collections.setdefault(collection_id, {})[document_id] = document
+        return document
+
+    def default_user(self, user_id):
+        return {
+            "email": f"{user_id}@example.com",
+            "username": "Replay User",
+            "selectedTopics": list(self.topics),
+            "xp": 0,
+            "level": 1,
+            "streak": 0,
+            "onboardingCompleted": True
+        }
+
+
+def make_databases(backend):
+    class FakeDatabases:
+        def __init__(self, client):
+            self.client = client
+
+        def get_document(self, database_id, collection_id, document_id, queries=None):
+            backend.wait()
+            with backend.lock:
+                document = backend.collections.get(collection_id, {}).get(document_id)
+                if document is None and collection_id == "users":
+                    # Replayed ids are pseudonyms - provision profiles on first sight
+                    document = backend.put("users", document_id, backend.default_user(document_id))
+                if document is None:
+                    raise FakeAppwriteException("Document not found", 404)
+                return dict(document)
+
+        def list_documents(self, database_id, collection_id, queries=None):
+            backend.wait()
+            with backend.lock:
+                documents = list(backend.collections.get(collection_id, {}).values())
+            limit, offset, cursor = 25, 0, None
+            for raw in queries or []:
+                query = json.loads(raw)
+                method, attribute, values = query["method"], query.get("attribute"), query.get("values", [])
+                if method == "equal":
+                    documents = [d for d in documents if d.get(attribute) in values]
+                elif method == "notEqual":
+                    documents = [d for d in documents if d.get(attribute) not in values]
+                elif method == "lessThan":
+                    documents = [d for d in documents if d.get(attribute) is not None and d[attribute] < values[0]]
+                elif method == "greaterThan":
+                    documents = [d for d in documents if d.get(attribute) is not None and d[attribute] > values[0]]
+                elif method == "greaterThanEqual":
+                    documents = [d for d in documents if d.get(attribute) is not None and d[attribute] >= values[0]]
+                elif method in ("orderAsc", "orderDesc"):
+                    documents.sort(key=lambda d: str(d.get(attribute or "$id", "")), reverse=method == "orderDesc")
+                elif method == "limit":
+                    limit = values[0]
+                elif method == "offset":
+                    offset = values[0]
+                elif method == "cursorAfter":
+                    cursor = values[0]
+            total = len(documents)
+            if cursor is not None:
+                ids = [d["$id"] for d in documents]
+                documents = documents[ids.index(cursor) + 1:] if cursor in ids else []
+            return {"total": total, "documents": [dict(d) for d in documents[offset:offset + limit]]}
+
+        def create_document(self, database_id, collection_id, document_id, data, permissions=None):
+            backend.wait()
+            if document_id == "unique()":
+                document_id = uuid.uuid4().hex[:20]
+            with backend.lock:
+                if document_id in backend.collections.get(collection_id, {}):
+                    raise FakeAppwriteException("Document already exists", 409)
+                return dict(backend.put(collection_id, document_id, data))
+
+        def update_document(self, database_id, collection_id, document_id, data=None, permissions=None):
+            backend.wait()
+            with backend.lock:
+                document = backend.collections.get(collection_id, {}).get(document_id)
+                if document is None:
+                    raise FakeAppwriteException("Document not found", 404)
+                document.update(data or {})
+                document["$updatedAt"] = datetime.now(timezone.utc).isoformat()
+                return dict(document)
+
+        def delete_document(self, database_id, collection_id, document_id):
+            backend.wait()
+            with backend.lock:
+                if backend.collections.get(collection_id, {}).pop(document_id, None) is None:
+                    raise FakeAppwriteException("Document not found", 404)
+            return {}
+
+    return FakeDatabases
+
+
+def make_account(backend):
+    class FakeAccount:
+        def __init__(self, client):
+            self.client = client
+
+        def get(self):
+            backend.wait()
+            user_id = backend.sessions.get(self.client.session)
+            if user_id is None:
+                raise FakeAppwriteException("Invalid session", 401)
+            return {"$id": user_id, "email": f"{user_id}@example.com", "name": "Replay User"}
+
+        def create_recovery(self, email, url):
+            backend.wait()
+            return {}
+
+        def update_recovery(self, user_id, secret, password, *args, **kwargs):
+            backend.wait()
+            return {}
+
+        def update_verification(self, user_id, secret):
+            backend.wait()
+            return {"userId": user_id}
+
+    return FakeAccount
+
+
+class FakeClient:
+    def __init__(self):
+        self.session = None
+
+    def set_endpoint(self, endpoint):
+        return self
+
+    def set_project(self, project):
+        return self
+
+    def set_key(self, key):
+        return self
+
+    def set_session(self, session):
+        self.session = session
+        return self
+
+
+def install_fakes(backend, llm_latency_ms):
+    """Register fake appwrite and google.generativeai modules before any function is imported."""
+    def module(name, **attributes):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attributes)
+        sys.modules[name] = mod
+        return mod
+
+    module("appwrite")
+    module("appwrite.client", Client=FakeClient)
+    module("appwrite.query", Query=FakeQuery)
+    module("appwrite.exception", AppwriteException=FakeAppwriteException)
+    module("appwrite.services")
+    module("appwrite.services.databases", Databases=make_databases(backend))
+    module("appwrite.services.account", Account=make_account(backend))
+
+    class FakeModel:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt):
+            time.sleep(llm_latency_ms / 1000.0 * random.uniform(0.5, 1.5))
+            return types.SimpleNamespace(text="What would change if you questioned your first assumption?")
+
+    module("google")
+    module("google.generativeai", configure=lambda **kwargs: None, GenerativeModel=FakeModel)
+
+    for var in ("APPWRITE_FUNCTION_API_ENDPOINT", "APPWRITE_FUNCTION_PROJECT_ID",
+                "APPWRITE_DATABASE_ID", "APPWRITE_DATABASES_API_KEY", "GEMINI_API_KEY"):
+        os.environ.setdefault(var, "replay")
+
+
+# ---------------------------------------------------------------------------
+# Function loading and invocation
+# ---------------------------------------------------------------------------
+
+class ReplayResponse:
+    def json(self, data, status_code=200, headers=None):
+        return status_code, data
+
+    def send(self, body, status_code=200, headers=None):
+        return status_code, body
+
+
+class ReplayContext:
+    def __init__(self, body):
+        self.req = types.SimpleNamespace(body=body, body_raw=body, method="POST", path="/", headers={})
+        self.res = ReplayResponse()
+
+    def log(self, message):
+        pass
+
+    def error(self, message):
+        pass
+
+
+def load_functions():
+    """Import every function's src/main.py as a package so relative imports resolve."""
+    config = json.loads((ROOT / "appwrite.config.json").read_text(encoding="utf-8"))
+    entrypoints = {}
+    for position, function in enumerate(config.get("functions", [])):
+        src = ROOT / function["path"] / "src"
+        if not (src / "main.py").exists():
+            continue
+        package = f"replay_function_{position}"
+        module = types.ModuleType(package)
+        module.__path__ = [str(src)]
+        sys.modules[package] = module
+        entrypoints[function["$id"]] = importlib.import_module(f"{package}.main").main
+    return entrypoints
+
+
+def load_traces(paths):
+    traces = []
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            start = line.find("TRACE ")
+            payload = line[start + len("TRACE "):] if start >= 0 else line
+            try:
+                trace = json.loads(payload)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(trace, dict) and "function" in trace and "ts" in trace:
+                traces.append(trace)
+    traces.sort(key=lambda t: t["ts"])
+    return traces
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def replay(traces, entrypoints, backend, speed, concurrency):
+    results = []
+    results_lock = threading.Lock()
+
+    def invoke(trace, due):
+        body = trace.get("body") or {}
+        if body.get("session") and body.get("userId"):
+            backend.sessions[body["session"]] = body["userId"]
+        entrypoint = entrypoints.get(trace["function"])
+        try:
+            if entrypoint is None:
+                status = 404
+            else:
+                status, _ = entrypoint(ReplayContext(json.dumps(body)))
+        except Exception:
+            status = 599
+        latency = time.monotonic() - due
+        with results_lock:
+            results.append((trace["function"], status, latency))
+
+    first = traces[0]["ts"]
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for trace in traces:
+            due = started + (trace["ts"] - first) / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(invoke, trace, due)
+    elapsed = time.monotonic() - started
+    return results, elapsed
+
+
+def summarize(results, elapsed, backend):
+    per_function = {}
+    for function_id, status, latency in results:
+        per_function.setdefault(function_id, []).append((status, latency))
+
+    def stats(rows):
+        latencies = sorted(latency * 1000 for _, latency in rows)
+        return {
+            "requests": len(rows),
+            "serverErrorRate": round(sum(1 for s, _ in rows if s >= 500) / len(rows), 4),
+            "clientErrors": sum(1 for s, _ in rows if 400 <= s < 500),
+            "p50Ms": round(percentile(latencies, 50), 1),
+            "p95Ms": round(percentile(latencies, 95), 1),
+            "p99Ms": round(percentile(latencies, 99), 1)
+        }
+
+    return {
+        "requests": len(results),
+        "elapsedSeconds": round(elapsed, 2),
+        "throughputPerSecond": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "backendCalls": backend.calls,
+        "overall": stats([(status, latency) for _, status, latency in results]) if results else {},
+        "functions": {function_id: stats(rows) for function_id, rows in sorted(per_function.items())}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured request traces against local fakes")
+    parser.add_argument("traces", nargs="+", help="files containing TRACE lines or NDJSON traces")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (default 1x)")
+    parser.add_argument("--concurrency", type=int, default=16, help="max in-flight requests (default 16)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="mean fake backend latency per call")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="mean fake Gemini latency")
+    parser.add_argument("--challenges", type=int, default=200, help="synthetic catalog size")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.traces)
+    if not traces:
+        print("No traces found", file=sys.stderr)
+        return 1
+
+    backend = FakeBackend(latency_ms=args.latency_ms, challenges=args.challenges)
+    install_fakes(backend, args.llm_latency_ms)
+    entrypoints = load_functions()
+
+    results, elapsed = replay(traces, entrypoints, backend, max(args.speed, 0.001), max(1, args.concurrency))
+    report = summarize(results, elapsed, backend)
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+        return 0
+
+    print(f"Replayed {report['requests']} requests in {report['elapsedSeconds']}s "
+          f"({report['throughputPerSecond']} req/s, {report['backendCalls']} backend calls)")
+    print(f"{'function':<24}{'requests':>10}{'5xx rate':>10}{'4xx':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for function_id, row in report["functions"].items():
+        print(f"{function_id:<24}{row['requests']:>10}{row['serverErrorRate']:>10.2%}{row['clientErrors']:>7}"
+              f"{row['p50Ms']:>10}{row['p95Ms']:>10}{row['p99Ms']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
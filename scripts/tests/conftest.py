@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS))
+
+import replay_traces  # noqa: E402
+
+# Scripts import the Appwrite SDK at module level; tests run against the replay fakes
+replay_traces.install_fakes(replay_traces.FakeBackend(latency_ms=0, challenges=0), llm_latency_ms=0)
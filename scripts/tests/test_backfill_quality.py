@@ -0,0 +1,45 @@
+import time
+
+import backfill_quality
+
+quality = backfill_quality.quality
+
+
+def inline_bonuses(documents):
+    return [quality.quality_bonus(d.get("questions") or [], d["responses"]) for d in documents]
+
+
+def test_batch_and_inline_scores_agree_on_synthetic_responses():
+    documents = backfill_quality.synthetic_documents(2000, seed=11)
+
+    assert backfill_quality.batch_quality_bonus(documents).tolist() == inline_bonuses(documents)
+
+
+def test_batch_and_inline_scores_agree_on_edge_cases():
+    reasoning = "because however therefore the evidence implies we might instead " * 3
+    documents = [
+        {"questions": [], "responses": []},
+        {"questions": ["Why?"], "responses": ["too short"]},
+        {"questions": ["Why ban cars?"], "responses": [None, "cars because cars however"]},
+        {"questions": ["Only one question"], "responses": [reasoning, reasoning, reasoning]},
+        {"questions": ["Why?"], "responses": ["word " * 50_000]},
+        {"questions": ["Why?"] * 40, "responses": [reasoning] * 10 + ["no"] * 30},
+        {"responses": [reasoning]},
+    ]
+
+    assert backfill_quality.batch_quality_bonus(documents).tolist() == inline_bonuses(documents)
+
+
+def test_inline_scoring_only_reads_the_capped_input():
+    answer = "because the evidence might suggest otherwise " * 200
+    oversized = answer + "however " * 1_000_000
+
+    started = time.perf_counter()
+    score = quality.score_response("Why?", oversized)
+    elapsed = time.perf_counter() - started
+
+    assert score == quality.score_response("Why?", oversized[:quality.MAX_SCORED_CHARS])
+    assert elapsed < 0.05
+    extra = ["no thought"] * 100
+    assert quality.quality_bonus(["Why?"], [answer] * quality.MAX_SCORED_ANSWERS + extra) == \
+        quality.quality_bonus(["Why?"], [answer] * quality.MAX_SCORED_ANSWERS)
@@ -0,0 +1,66 @@
+import json
+import tracemalloc
+
+import export_user_data
+
+RESPONSES = 100_000
+HISTORY = 2_000
+MEMORY_CEILING_BYTES = 2 * 1024 * 1024
+
+
+class SyntheticDatabases:
+    """Generates each page on request, so the fake itself holds no documents."""
+
+    def __init__(self, user_id, counts):
+        self.user_id = user_id
+        self.counts = counts
+
+    def get_document(self, database_id, collection_id, document_id):
+        return {"$id": document_id, "email": f"{document_id}@example.com", "xp": 1234}
+
+    def list_documents(self, database_id, collection_id, queries):
+        queries = [json.loads(q) for q in queries]
+        limit = next(q["values"][0] for q in queries if q["method"] == "limit")
+        cursor = next((q["values"][0] for q in queries if q["method"] == "cursorAfter"), None)
+        start = int(cursor.rsplit("-", 1)[1]) + 1 if cursor else 0
+        total = self.counts[collection_id]
+        documents = [self.document(collection_id, i) for i in range(start, min(start + limit, total))]
+        return {"total": total, "documents": documents}
+
+    def document(self, collection_id, i):
+        return {
+            "$id": f"{collection_id}-{i:08d}",
+            "$createdAt": "2026-01-01T00:00:00.000+00:00",
+            "userID": self.user_id,
+            "challengeID": f"challenge{i % 500:05d}",
+            "responses": ["because the first assumption might not hold " * 4] * 3,
+            "totalXpEarned": 30
+        }
+
+
+class CountingSink:
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.lines += data.count(b"\n")
+
+
+def test_export_of_100k_records_stays_under_memory_ceiling():
+    databases = SyntheticDatabases("user-1", {"responses": RESPONSES, "user_challenge_history": HISTORY})
+    sink = CountingSink()
+
+    tracemalloc.start()
+    try:
+        count = export_user_data.write_ndjson(
+            export_user_data.iter_export_records(databases, "synapse", "user-1"), sink
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 1 + RESPONSES + HISTORY
+    assert sink.lines == count
+    assert peak < MEMORY_CEILING_BYTES, f"peak {peak / 1024:.0f} KiB over {MEMORY_CEILING_BYTES / 1024:.0f} KiB"
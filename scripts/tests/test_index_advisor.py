@@ -0,0 +1,97 @@
+import json
+import textwrap
+
+import index_advisor
+
+
+def write_tree(tmp_path, source, columns, indexes=()):
+    functions = tmp_path / "functions"
+    (functions / "Example" / "src").mkdir(parents=True)
+    (functions / "Example" / "src" / "main.py").write_text(textwrap.dedent(source), encoding="utf-8")
+    config = tmp_path / "appwrite.config.json"
+    config.write_text(json.dumps({"tables": [{
+        "$id": "responses",
+        "columns": [{"key": key} for key in columns],
+        "indexes": [{"key": "_".join(c) + "_index", "columns": list(c)} for c in indexes]
+    }]}), encoding="utf-8")
+    return ["--config", str(config), "--functions", str(functions), "--baseline", str(tmp_path / "baseline.json")]
+
+
+def analyze(tmp_path):
+    config = json.loads((tmp_path / "appwrite.config.json").read_text(encoding="utf-8"))
+    usages = index_advisor.extract_usages(tmp_path / "functions" / "Example" / "src" / "main.py")
+    return index_advisor.analyze(config, usages)
+
+
+LOOKUP = """
+    def lookup(databases, user_id, challenge_id):
+        return databases.list_documents(
+            database_id="synapse",
+            collection_id="responses",
+            queries=[Query.equal("userID", [user_id]), Query.equal("challengeID", [challenge_id])]
+        )
+"""
+
+
+def test_repository_queries_pass_check(capsys):
+    assert index_advisor.main(["--check"]) == 0
+    assert "no column" not in capsys.readouterr().out
+
+
+def test_composite_index_is_suggested(tmp_path):
+    args = write_tree(tmp_path, LOOKUP, columns=["userID", "challengeID"], indexes=[("userID",)])
+    findings, _, suggestions = analyze(tmp_path)
+
+    assert [message for _, message in findings] == ["no index on 'responses' serves (userID, challengeID)"]
+    assert suggestions["responses"]["userID_challengeID_index"]["columns"] == ["userID", "challengeID"]
+    assert index_advisor.main(args + ["--check"]) == 1
+
+
+def test_unknown_column_still_gets_an_index_suggestion(tmp_path):
+    args = write_tree(tmp_path, LOOKUP, columns=["userID"])
+    findings, _, suggestions = analyze(tmp_path)
+
+    messages = [message for _, message in findings]
+    assert "'responses' has no column 'challengeID'" in messages
+    assert "userID_challengeID_index" in suggestions["responses"]
+
+
+def test_declared_index_serves_the_query(tmp_path):
+    args = write_tree(tmp_path, LOOKUP, columns=["userID", "challengeID"], indexes=[("challengeID", "userID")])
+    assert index_advisor.main(args + ["--check"]) == 0
+
+
+def test_computed_collection_is_reported_not_dropped(tmp_path):
+    args = write_tree(tmp_path, """
+        def page(databases, collection_id, watermark):
+            return databases.list_documents(
+                database_id="synapse",
+                collection_id=collection_id,
+                queries=[Query.greater_than_equal("$createdAt", watermark), Query.equal("status", ["open"])]
+            )
+
+        def by_ids(databases, collection_id, ids):
+            return databases.list_documents("synapse", collection_id, [Query.equal("$id", ids)])
+    """, columns=[])
+    findings, notes, _ = analyze(tmp_path)
+
+    assert [message for _, message in findings] == [
+        "collection is computed (collection_id); can't check queries on (status)"
+    ]
+    assert [message for _, message in notes] == [
+        "collection is computed (collection_id); only system attributes are queried"
+    ]
+    assert index_advisor.main(args + ["--check"]) == 1
+
+
+def test_baselined_findings_do_not_fail_check(tmp_path, capsys):
+    args = write_tree(tmp_path, LOOKUP, columns=["userID", "challengeID"])
+    (tmp_path / "baseline.json").write_text(json.dumps([
+        {"finding": "no index on 'responses' serves (userID, challengeID)", "reason": "test"},
+        {"finding": "'responses' has no column 'gone'", "reason": "fixed since"}
+    ]), encoding="utf-8")
+
+    assert index_advisor.main(args + ["--check"]) == 0
+    out = capsys.readouterr().out
+    assert "(baseline)" in out
+    assert "remove it: 'responses' has no column 'gone'" in out
@@ -0,0 +1,125 @@
+import pytest
+
+import ingest_challenges
+import replay_traces
+
+DEFINITION = {
+    "title": "Steelman the other side",
+    "questions": ["Why?", "How?"],
+    "promptText": "Argue the view you disagree with.",
+    "topicID": "ethics",
+    "difficulty": "3",
+    "archetype": "steelman",
+    "mutator": "none"
+}
+
+
+@pytest.fixture
+def databases():
+    backend = replay_traces.FakeBackend(latency_ms=0, topics=1, challenges=0)
+    return replay_traces.make_databases(backend)(None)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(ingest_challenges.time, "sleep", lambda seconds: None)
+
+
+def test_normalize_fills_defaults_and_derives_a_stable_id():
+    document_id, data = ingest_challenges.normalize("seed#0", DEFINITION)
+
+    assert data["difficulty"] == 3
+    assert data["xpReward"] == 15 and data["type"] == "TEXT"
+    assert data["contentHash"] == ingest_challenges.content_hash(data)
+    assert len(document_id) == 32
+    assert ingest_challenges.normalize("seed#1", dict(DEFINITION))[0] == document_id
+    assert ingest_challenges.normalize("seed#2", {**DEFINITION, "id": "fixed"})[0] == "fixed"
+
+
+@pytest.mark.parametrize("change, message", [
+    ({"title": ""}, "missing title"),
+    ({"questions": []}, "questions must be a non-empty list"),
+    ({"difficulty": "hard"}, "difficulty must be a number"),
+])
+def test_normalize_rejects_bad_definitions(change, message):
+    with pytest.raises(ingest_challenges.DefinitionError, match=message):
+        ingest_challenges.normalize("seed#0", {**DEFINITION, **change})
+
+
+def test_content_hash_ignores_key_order_and_its_own_field():
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    reordered = dict(reversed(list(data.items())))
+
+    assert ingest_challenges.content_hash(reordered) == data["contentHash"]
+    assert ingest_challenges.content_hash({**data, "contentHash": "stale"}) == data["contentHash"]
+    assert ingest_challenges.content_hash({**data, "difficulty": 4}) != data["contentHash"]
+
+
+def test_plan_splits_by_stored_hash():
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    definitions = {"new": data, "changed": data, "same": data}
+    existing = {"changed": "old-hash", "same": data["contentHash"], "removed": "x"}
+
+    creates, updates, unchanged = ingest_challenges.plan(definitions, existing)
+
+    assert [document_id for document_id, _ in creates] == ["new"]
+    assert [document_id for document_id, _ in updates] == ["changed"]
+    assert unchanged == ["same"]
+
+
+def test_retried_create_that_already_landed_finishes_as_update(databases):
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    create = databases.create_document
+    attempts = []
+
+    def create_then_lose_response(**kwargs):
+        attempts.append(kwargs["document_id"])
+        if len(attempts) == 1:
+            create(**kwargs)
+            raise replay_traces.FakeAppwriteException("Bad gateway", 502)
+        return create(**kwargs)
+
+    databases.create_document = create_then_lose_response
+    document = ingest_challenges.write(databases, "synapse", "create", "c1", data)
+
+    assert len(attempts) == 2
+    assert document["contentHash"] == data["contentHash"]
+
+
+def test_first_attempt_conflict_is_still_reported(databases):
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    databases.create_document(database_id="synapse", collection_id="challenges", document_id="c1", data=data)
+
+    with pytest.raises(replay_traces.FakeAppwriteException) as error:
+        ingest_challenges.write(databases, "synapse", "create", "c1", data)
+    assert error.value.code == 409
+
+
+def test_dry_run_diff_lists_changed_fields(databases):
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    databases.create_document(database_id="synapse", collection_id="challenges", document_id="c1", data=data)
+    changed = {**data, "difficulty": 4, "questions": ["Why?"]}
+
+    current = ingest_challenges.fetch_documents(databases, "synapse", ["c1", "missing"])
+    diff = ingest_challenges.diff_fields(current["c1"], changed)
+
+    assert set(current) == {"c1"}
+    assert diff == [("questions", ["Why?", "How?"], ["Why?"]), ("difficulty", 3, 4)]
+
+
+def test_ingest_rebuilds_stale_snapshots(databases, tmp_path):
+    _, data = ingest_challenges.normalize("seed#0", DEFINITION)
+    ingest_challenges.write(databases, "synapse", "create", "c1", data)
+    targets = [tmp_path / "a.sqlite", tmp_path / "b.sqlite"]
+    stored = ingest_challenges.fetch_existing_hashes(databases, "synapse")
+
+    assert ingest_challenges.refresh_snapshots(databases, "synapse", stored, targets) == targets
+    assert ingest_challenges.refresh_snapshots(databases, "synapse", stored, targets) == []
+
+    changed = {**data, "difficulty": 4}
+    changed["contentHash"] = ingest_challenges.content_hash(changed)
+    ingest_challenges.write(databases, "synapse", "update", "c1", changed)
+    stored = ingest_challenges.fetch_existing_hashes(databases, "synapse")
+
+    assert ingest_challenges.refresh_snapshots(databases, "synapse", stored, targets) == targets
+    assert ingest_challenges.snapshot_hashes(targets[0]) == {"c1": changed["contentHash"]}